@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+# Compare les deux formulations OR-Tools (coverage / intervals) :
+# taille du modèle, temps de construction, temps jusqu'à la 1re solution.
+#
+#   python -m bench.formulations --week-start 2026-10-19 --time-limit 120
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+from ortools.sat.python import cp_model
+
+from src.loader import load_programs
+from src.preprocess import build_precomputed
+from src.ortools_solver import build_model, FORMULATIONS
+
+
+class _FirstSolution(cp_model.CpSolverSolutionCallback):
+    def __init__(self) -> None:
+        super().__init__()
+        self.t0 = time.perf_counter()
+        self.first_s: float | None = None
+        self.first_objective: int | None = None
+
+    def on_solution_callback(self) -> None:
+        if self.first_s is None:
+            self.first_s = time.perf_counter() - self.t0
+            self.first_objective = int(self.ObjectiveValue())
+
+
+def _model_stats(model: cp_model.CpModel) -> dict:
+    proto = model.Proto()
+    n_terms = 0
+    for c in proto.constraints:
+        if c.has_linear():
+            n_terms += len(c.linear.vars)
+    fd, path = tempfile.mkstemp(suffix=".pb")
+    os.close(fd)
+    try:
+        model.ExportToFile(path)
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "linear_terms": n_terms,
+        "proto_bytes": size,
+    }
+
+
+def run(pre, formulation: str, time_limit_s: float, workers: int) -> dict:
+    t = time.perf_counter()
+    built = build_model(pre, formulation=formulation, log=lambda msg: None)
+    build_s = time.perf_counter() - t
+
+    row = {"formulation": formulation, "build_s": round(build_s, 2), **_model_stats(built.model)}
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit_s)
+    solver.parameters.num_search_workers = workers
+    cb = _FirstSolution()
+    status = solver.Solve(built.model, cb)
+    row.update(
+        status=solver.StatusName(status),
+        first_feasible_s=None if cb.first_s is None else round(cb.first_s, 2),
+        first_objective=cb.first_objective,
+        objective=int(solver.ObjectiveValue()) if cb.first_s is not None else None,
+    )
+    return row
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--programs", default="data/programs.json")
+    ap.add_argument("--week-start", default="2026-10-19", help="YYYY-MM-DD")
+    ap.add_argument("--time-limit", type=float, default=120)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--json", default=None, help="Also write the results to this file")
+    args = ap.parse_args()
+
+    y, m, d = map(int, args.week_start.split("-"))
+    pre = build_precomputed(load_programs(args.programs), date(y, m, d), engine="numpy")
+
+    rows = []
+    for formulation in FORMULATIONS:
+        row = run(pre, formulation, args.time_limit, args.workers)
+        print(json.dumps(row), flush=True)
+        rows.append(row)
+
+    cols = ["formulation", "variables", "constraints", "linear_terms", "proto_bytes", "build_s", "first_feasible_s", "status"]
+    print()
+    print(" | ".join(cols))
+    for row in rows:
+        print(" | ".join(str(row[c]) for c in cols))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+# Chaîne complète sur des catalogues synthétiques de tailles croissantes :
+# load_programs, build_precomputed, build_model (par formulation), puis pour
+# chaque backend le temps jusqu'à la 1re solution et jusqu'à 1 % d'écart.
+# dp_bound (src/daydp.py) et la ligne "lagrangian" donnent l'estimation
+# rapide à comparer à CP-SAT, la ligne "multires" la résolution grossière
+# puis fine de src/multires.py. Avec --aggregate, les programmes
+# interchangeables (--duplicates) sont regroupés (src/aggregate.py) avant
+# build_model.
+# Chaque taille tourne dans un processus neuf (spawn) pour que le pic
+# mémoire (ru_maxrss, relevé après chaque phase) ne dépende que d'elle.
+#
+#   python -m bench.pipeline --sizes 200,1000,5000,20000 --time-limit 120
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+from bench.synthetic import SIZES, generate
+from src.loader import load_programs
+from src.preprocess import build_precomputed
+from src.ortools_solver import FORMULATIONS, build_model, model_stats, solve_built
+from src.minizinc_solver import available_backends, solve_minizinc
+from src.daydp import upper_bound
+from src.lagrangian import solve_lagrangian
+from src.multires import solve_multires
+from src.aggregate import aggregate
+from src.metrics import RunMetrics
+from src.portfolio import MZN_SOLVERS, _profit
+
+
+def _rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _milestones(timeline: List[Dict], target_gap: float) -> Dict:
+    """1re solution et 1er instant où (borne - objectif) <= target_gap * |borne|."""
+    first = within = None
+    objective = bound = None
+    for row in timeline:
+        if "objective" in row:
+            objective = row["objective"]
+            if first is None:
+                first = row["t"]
+        if "bound" in row:
+            bound = row["bound"] if bound is None else min(bound, row["bound"])
+        if within is None and objective is not None and bound is not None and bound - objective <= target_gap * abs(bound):
+            within = row["t"]
+    return {"first_feasible_s": first, "within_gap_s": within, "bound": bound}
+
+
+def run_size(size: int, args: argparse.Namespace) -> List[Dict]:
+    base = {"size": size}
+    rows: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "programs.json")
+        reference = json.load(open(args.reference, encoding="utf-8"))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(generate(size, reference, seed=args.seed, duplicates=args.duplicates), f, ensure_ascii=False)
+
+        t = time.perf_counter()
+        programs = load_programs(path)
+        base.update(load_s=round(time.perf_counter() - t, 3), load_rss_mb=_rss_mb())
+
+        y, m, d = map(int, args.week_start.split("-"))
+        t = time.perf_counter()
+        pre = build_precomputed(programs, date(y, m, d), engine="numpy")
+        base.update(
+            precompute_s=round(time.perf_counter() - t, 3), precompute_rss_mb=_rss_mb(),
+            candidates=len(pre.candidates.prog),
+        )
+        if args.aggregate:
+            t = time.perf_counter()
+            pre = aggregate(pre)
+            base.update(
+                aggregate_s=round(time.perf_counter() - t, 3), candidates=len(pre.candidates.prog),
+                folded_programs=sum(len(ps) - 1 for ps in pre.members.values()),
+            )
+        t = time.perf_counter()
+        base.update(dp_bound=upper_bound(pre), dp_bound_s=round(time.perf_counter() - t, 3))
+
+        bound: Optional[float] = None   # borne CP-SAT, pour l'écart des solutions MiniZinc
+        for formulation in FORMULATIONS:
+            t = time.perf_counter()
+            built = build_model(pre, formulation=formulation, log=lambda msg: None)
+            row = {
+                **base, "backend": f"cp-sat/{formulation}",
+                "build_s": round(time.perf_counter() - t, 3), "build_rss_mb": _rss_mb(),
+                **{k: model_stats(built, pre)[k] for k in ("x_variables", "constraints")},
+            }
+            metrics = RunMetrics()
+            res = solve_built(built, args.time_limit, gap=args.gap, workers=args.workers, metrics=metrics)
+            ms = _milestones(metrics.timeline, args.gap)
+            if ms["bound"] is not None:
+                bound = ms["bound"] if bound is None else min(bound, ms["bound"])
+            row.update(
+                status=res.status, objective=res.objective if res.starts else None,
+                first_feasible_s=ms["first_feasible_s"], within_gap_s=ms["within_gap_s"],
+                solve_rss_mb=_rss_mb(),
+            )
+            rows.append(row)
+            del built
+
+        t = time.perf_counter()
+        res = solve_lagrangian(pre, time_limit_s=args.time_limit, log=lambda msg: None)
+        wall = round(time.perf_counter() - t, 3)
+        within = bool(res.starts) and bound is not None and bound - res.objective <= args.gap * abs(bound)
+        rows.append({
+            **base, "backend": "lagrangian", "status": res.status, "objective": res.objective if res.starts else None,
+            "lagrangian_bound": res.best_bound, "first_feasible_s": wall if res.starts else None,
+            "within_gap_s": wall if within else None, "solve_rss_mb": _rss_mb(),
+        })
+
+        # multires ne remonte que sa grille finale, comme MiniZinc
+        t = time.perf_counter()
+        res = solve_multires(
+            pre, programs, date(y, m, d), time_limit_s=args.time_limit, gap=args.gap, workers=args.workers,
+            log=lambda msg: None,
+        )
+        wall = round(time.perf_counter() - t, 3)
+        within = bool(res.starts) and bound is not None and bound - res.objective <= args.gap * abs(bound)
+        rows.append({
+            **base, "backend": "multires", "status": res.status, "objective": res.objective if res.starts else None,
+            "first_feasible_s": wall if res.starts else None, "within_gap_s": wall if within else None,
+            "solve_rss_mb": _rss_mb(),
+        })
+
+        # MiniZinc ne remonte que la solution finale : 1re solution = durée totale
+        for tag in available_backends(MZN_SOLVERS):
+            t = time.perf_counter()
+            res = solve_minizinc(
+                pre, workdir=os.path.join(tmp, tag),
+                timeout_s=int(args.time_limit), solver=tag, formulation=args.mzn_formulation,
+            )
+            wall = round(time.perf_counter() - t, 3)
+            profit = _profit(pre, res.starts) if res.starts else None
+            within = profit is not None and bound is not None and bound - profit <= args.gap * abs(bound)
+            rows.append({
+                **base, "backend": f"minizinc/{tag}", "status": res.status, "objective": profit,
+                "first_feasible_s": wall if res.starts else None, "within_gap_s": wall if within else None,
+                "solve_rss_mb": _rss_mb(),
+            })
+    return rows
+
+
+def _child(size: int, args: argparse.Namespace, out: mp.Queue) -> None:
+    try:
+        out.put(run_size(size, args))
+    except Exception as e:
+        out.put([{"size": size, "error": repr(e)}])
+
+
+def _collect(p: mp.Process, out: mp.Queue, size: int, poll_s: float = 1.0) -> List[Dict]:
+    """Lignes du processus enfant ; une ligne d'erreur s'il meurt sans rien envoyer (OOM killer, segfault)."""
+    while True:
+        try:
+            return out.get(timeout=poll_s)
+        except queue.Empty:
+            if p.is_alive():
+                continue
+        # mort : ce qu'il aurait envoyé juste avant est encore dans le tube
+        try:
+            return out.get(timeout=poll_s)
+        except queue.Empty:
+            return [{"size": size, "error": f"child process died (exit code {p.exitcode})"}]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reference", default="data/programs.json")
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--duplicates", type=float, default=0.0, help="Share of exact program copies in the synthetic catalogs")
+    ap.add_argument("--aggregate", action="store_true", help="Fold interchangeable programs into classes")
+    ap.add_argument("--week-start", default="2026-10-19", help="YYYY-MM-DD")
+    ap.add_argument("--time-limit", type=float, default=120)
+    ap.add_argument("--gap", type=float, default=0.01, help="Target relative gap")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--mzn-formulation", choices=["sparse", "dense"], default="sparse")
+    ap.add_argument("--json", default=None, help="Also write the results to this file")
+    args = ap.parse_args()
+
+    ctx = mp.get_context("spawn")
+    rows: List[Dict] = []
+    for size in map(int, args.sizes.split(",")):
+        out = ctx.Queue()
+        p = ctx.Process(target=_child, args=(size, args, out))
+        p.start()
+        size_rows = _collect(p, out, size)
+        p.join()
+        for row in size_rows:
+            print(json.dumps(row), flush=True)
+        rows += size_rows
+
+    cols = [
+        "size", "backend", "candidates", "load_s", "precompute_s", "build_s",
+        "first_feasible_s", "within_gap_s", "status", "objective", "dp_bound", "solve_rss_mb", "error",
+    ]
+    print()
+    print(" | ".join(cols))
+    for row in rows:
+        print(" | ".join(str(row.get(c, "")) for c in cols))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+# Catalogues synthétiques de taille arbitraire, tirés des distributions du
+# catalogue de référence (data/programs.json) : pour chaque genre, chaque
+# champ est tiré parmi les valeurs observées pour ce genre (sous-genre et
+# magazine santé ensemble, fenêtres de droits en bloc avec un décalage
+# aléatoire), les coûts et audiences à ±15 % près. Les séries sont générées
+# par saisons d'épisodes chaînés (previous_episode) ; les programmes à
+# horaire fixe (JT) sont repris tels quels, une seule fois. --duplicates
+# ajoute une part de copies exactes (seuls l'id et le titre changent), comme
+# les déclinaisons d'un même programme d'un vrai catalogue.
+#
+#   python -m bench.synthetic --size 5000 --out data/synthetic_5000.json
+
+import argparse
+import json
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+
+SIZES = (200, 1000, 5000, 20000)
+
+_SAMPLED = (
+    "origin", "year", "age_rating", "target_audience", "independent", "is_new", "is_exclusive",
+    "in_production", "min_rerun_days", "preferred_slots", "forbidden_slots",
+    "compatible_genres", "incompatible_genres",
+)
+
+
+def _shift(d: str, days: int) -> str:
+    return (date.fromisoformat(d) + timedelta(days=days)).isoformat()
+
+
+def _jitter(rng: random.Random, v: int) -> int:
+    return max(1, int(v * rng.uniform(0.85, 1.15)))
+
+
+def generate(size: int, reference: List[Dict], seed: int = 0, duplicates: float = 0.0) -> List[Dict]:
+    rng = random.Random(seed)
+    fixed = [p for p in reference if p.get("fixed_time")]
+    by_genre: Dict[str, List[Dict]] = defaultdict(list)
+    for p in reference:
+        if not p.get("fixed_time"):
+            by_genre[p["genre"]].append(p)
+    genres = sorted(by_genre)
+    weights = [len(by_genre[g]) for g in genres]
+
+    out: List[Dict] = [dict(p) for p in fixed[:size]]
+    series: Dict[str, Dict] = {}   # titre de série -> saison en cours
+    k = 0
+    while len(out) < size:
+        k += 1
+        if len(out) > len(fixed) and rng.random() < duplicates:
+            p = dict(rng.choice(out[len(fixed):]))
+            p["id"], p["title"] = f"S{k:06d}", f"{p['title']} ({k})"
+            out.append(p)
+            continue
+        g = rng.choices(genres, weights)[0]
+        pool = by_genre[g]
+        tmpl = rng.choice(pool)
+        p: Dict = {
+            "id": f"S{k:06d}",
+            "title": tmpl["title"],
+            "genre": g,
+            "duration_minutes": rng.choice(pool)["duration_minutes"],
+            "cost": _jitter(rng, rng.choice(pool)["cost"]),
+            "base_audience": _jitter(rng, rng.choice(pool)["base_audience"]),
+        }
+        sub = rng.choice(pool)
+        p["subgenre"] = sub["subgenre"]
+        if sub.get("health_magazine") is not None:
+            p["health_magazine"] = sub["health_magazine"]
+        for f in _SAMPLED:
+            p[f] = rng.choice(pool)[f]
+        rights = rng.choice(pool)
+        offset = rng.randint(-60, 60)
+        p["rights_start"] = _shift(rights["rights_start"], offset)
+        p["rights_end"] = _shift(rights["rights_end"], offset)
+        last = rng.choice(pool).get("last_broadcast_date")
+        if last:
+            p["last_broadcast_date"] = _shift(last, rng.randint(-180, 180))
+
+        if g == "Série":
+            name = tmpl["title"].split(" S")[0]
+            cur = series.get(name)
+            if cur is None or cur["episode"] >= cur["total"] or rng.random() < 0.1:
+                # nouvelle saison (ou nouvelle série homonyme numérotée)
+                n = sum(1 for s in series if s == name or s.startswith(f"{name} ("))
+                name = name if cur is None else f"{name} ({n + 1})"
+                cur = series[name] = {"season": rng.randint(1, 5), "episode": 0, "total": tmpl["total_episodes"], "prev": None}
+            cur["episode"] += 1
+            p["title"] = f"{name} S{cur['season']:02d}E{cur['episode']:02d}"
+            p.update(season=cur["season"], episode=cur["episode"], total_episodes=cur["total"], max_episodes_per_week=1)
+            if cur["prev"]:
+                p["previous_episode"] = cur["prev"]
+            cur["prev"] = p["id"]
+            habit = rng.choice(pool)
+            if habit.get("usual_time"):
+                p["usual_day"], p["usual_time"] = habit["usual_day"], habit["usual_time"]
+        else:
+            p["title"] = f"{tmpl['title']} ({k})"
+        out.append(p)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reference", default="data/programs.json")
+    ap.add_argument("--size", type=int, required=True)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--duplicates", type=float, default=0.0, help="Share of exact copies of earlier programs (new id and title)")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    reference = json.load(open(args.reference, encoding="utf-8"))
+    programs = generate(args.size, reference, seed=args.seed, duplicates=args.duplicates)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(programs, f, ensure_ascii=False, indent=1)
+    print(f"Written: {args.out} ({len(programs)} programs)")
+
+
+if __name__ == "__main__":
+    main()
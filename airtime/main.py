@@ -2,13 +2,30 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import time
 from datetime import date, timedelta
 
 from src.loader import load_programs
+from src.catalog import load_catalog, compile_catalog
+from src.batch import run_weeks
 from src.preprocess import build_precomputed
-from src.ortools_solver import solve_ortools
+from src.cache import cached_precomputed, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_DAYS
+from src.ortools_solver import solve_ortools, FORMULATIONS
+from src.decompose import solve_decomposed
+from src.lns import solve_lns
+from src.portfolio import solve_portfolio, default_members
 from src.minizinc_solver import solve_minizinc
+from src.greedy import solve_greedy
+from src.lagrangian import solve_lagrangian
+from src.multires import solve_multires, COARSE_MINUTES
+from src.repair import load_disruption, solve_repair
+from src.daydp import upper_bound
+from src.aggregate import aggregate
 from src.export import starts_to_schedule
+from src.streaming import ProgressWriter, atomic_write_json
+from src.metrics import RunMetrics
+from src.timeutils import slots_per_day
 
 
 def next_monday(d: date) -> date:
@@ -17,18 +34,63 @@ def next_monday(d: date) -> date:
 
 def main() -> None:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--programs", default="data/programs.json")
-    ap.add_argument("--solver", choices=["ortools", "minizinc"], default="ortools")
+    ap.add_argument("--programs", default="data/programs.json", help="Catalog: JSON, or .npz compiled with `python -m src.catalog`")
+    ap.add_argument("--solver", choices=["ortools", "decompose", "lns", "portfolio", "minizinc", "greedy", "lagrangian", "multires", "repair"], default="ortools")
     ap.add_argument("--time-limit", type=int, default=600)
     ap.add_argument("--hint", default="schedule.json", help="Path to previous schedule.json for warm-start (auto-skipped if missing)")
+    ap.add_argument("--no-greedy-hint", action="store_true", help="ortools/lns: without a feasible --hint, start CP-SAT cold instead of from the greedy schedule")
+    ap.add_argument("--formulation", choices=FORMULATIONS, default="coverage", help="OR-Tools coverage model: per-slot equalities, or optional intervals + NoOverlap")
+    ap.add_argument("--processes", type=int, default=None, help="decompose: day subproblems solved in parallel (default: min(7, CPUs))")
+    ap.add_argument("--lns-sub-time", type=float, default=10.0, help="lns: time limit of each neighborhood re-optimization (s)")
+    ap.add_argument("--portfolio-members", default=None, help="portfolio: comma-separated member names (default: all CP-SAT configs + installed MiniZinc solvers)")
+    ap.add_argument("--coarse-minutes", type=int, default=COARSE_MINUTES, help="multires: slot length of the coarse first phase (a multiple of 5 dividing 60)")
+    ap.add_argument("--multires-radius", type=int, default=None, help="multires: fine-phase window half-width around each coarse start, in 5-min slots (default: one coarse slot)")
+    ap.add_argument("--disruption", default=None, help="JSON disruption spec (removed programs, reserved slot blocks, cost changes) applied to the catalog; --solver repair re-solves the --hint schedule around it")
+    ap.add_argument("--repair-window", type=int, default=60, help="repair: minutes re-optimized on each side of the affected placements (doubled until feasible)")
+    ap.add_argument("--mzn-formulation", choices=["sparse", "dense"], default="dense", help="minizinc/portfolio: the D×S×P model maximizing audience (dense, default), or one variable per candidate start maximizing profit like CP-SAT (sparse)")
     ap.add_argument("--gap", type=float, default=0.001, help="Relative optimality gap (e.g. 0.01 = 1%%)")
     ap.add_argument("--week-start", default=None, help="YYYY-MM-DD (défaut: lundi prochain)")
     ap.add_argument("--out", default="schedule.json")
+    ap.add_argument("--stream", action="store_true", help="ortools/lns: write every improving solution to --out (atomically) while solving")
+    ap.add_argument("--progress", default=None, help="--stream: JSON-lines progress log (default: <out>.progress.jsonl)")
+    ap.add_argument("--stream-versions", action="store_true", help="--stream: also keep each incumbent as <out>.<n>.json")
+    ap.add_argument("--report", default=None, help="JSON run report: phase durations, model and solver statistics, objective/bound timeline")
+    ap.add_argument("--prom", default=None, help="Also write the run metrics as a Prometheus textfile (node_exporter)")
+    ap.add_argument("--weeks", type=int, default=1, help="Batch: number of consecutive weeks from --week-start")
+    ap.add_argument("--out-dir", default="schedules", help="Batch: schedule_<week>.json per week (also its warm-start) + index.json")
+    ap.add_argument("--week-processes", type=int, default=None, help="Batch: weeks solved in parallel (default: min(weeks, CPUs))")
+    ap.add_argument("--engine", choices=["numpy", "python"], default="numpy", help="Precompute engine (numpy: vectorized, python: reference loop)")
+    ap.add_argument("--cache-dir", default="precompute_cache", help="On-disk cache of precomputed weeks")
+    ap.add_argument("--model-cache-dir", default="model_cache", help="ortools/lns: on-disk cache of built CP-SAT models (replay with `python replay.py`)")
+    ap.add_argument("--fzn-cache-dir", default="fzn_cache", help="minizinc/portfolio: on-disk cache of compiled FlatZinc, reruns skip flattening")
+    ap.add_argument("--mzn-data", choices=["instance", "dzn"], default="instance", help="minizinc --mzn-formulation sparse: data passed through the Instance API (JSON) or written as .dzn")
+    ap.add_argument("--aggregate", action="store_true", help="Fold interchangeable programs (same coefficients, cost and candidate starts, in practice copies of a series) into one model variable per class")
+    ap.add_argument("--no-cache", action="store_true", help="Always rebuild the precomputed week, the CP-SAT model and the FlatZinc")
+    ap.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    ap.add_argument("--cache-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+    ap.add_argument("--quiet", action="store_true", help="No progress messages on the console (they still go to --report)")
     args = ap.parse_args()
+    if args.solver == "repair" and not args.disruption:
+        ap.error("--solver repair requires --disruption")
+    try:
+        slots_per_day(args.coarse_minutes)
+    except ValueError as e:
+        ap.error(f"--coarse-minutes: {e}")
 
-    print("[1] Loading programs...", flush=True)
-    programs = load_programs(args.programs)
-    print(f"    {len(programs)} programs loaded.", flush=True)
+    say = (lambda msg: None) if args.quiet else (lambda msg: print(msg, flush=True))
+    say("[1] Loading programs...")
+    t_load = time.perf_counter()
+    catalog = None
+    if args.programs.endswith(".npz"):
+        catalog = load_catalog(args.programs)
+        programs = catalog.to_programs()
+    else:
+        programs = load_programs(args.programs)
+    if args.disruption:
+        # le catalogue colonnaire ne reflète plus les programmes modifiés
+        programs, catalog = load_disruption(args.disruption).apply(programs), None
+    load_s = time.perf_counter() - t_load
+    say(f"    {len(programs)} programs loaded.")
 
     if args.week_start:
         y, m, d = map(int, args.week_start.split("-"))
@@ -36,28 +98,155 @@ def main() -> None:
     else:
         ws = next_monday(date.today())
 
-    print(f"[2] Building precomputed (week_start={ws})...", flush=True)
-    pre = build_precomputed(programs, ws)
-    print(f"    {len(pre.allowed_starts)} allowed-start slots, {sum(len(v) for v in pre.allowed_starts.values())} total entries.", flush=True)
+    if args.weeks == 1:
+        run_week(catalog, programs, ws, args, load_s=load_s)
+        return
+
+    # batch : catalogue compilé une fois, partagé entre les processus du pool
+    weeks = [ws + timedelta(weeks=k) for k in range(args.weeks)]
+    if catalog is None:
+        catalog = compile_catalog(programs)
+    os.makedirs(args.out_dir, exist_ok=True)
+    say(f"[batch] {len(weeks)} weeks from {weeks[0]} to {weeks[-1]}")
+    rows = run_weeks(
+        catalog, weeks, run_week, args, processes=args.week_processes,
+        on_done=lambda row: say(f"[batch] {row['week_start']}: {row['status']} objective={row['objective']}"),
+    )
+    index_path = os.path.join(args.out_dir, "index.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    say(f"Written: {index_path}")
+
+
+def _week_path(path: str, ws: date) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}_{ws}{ext}"
+
+
+def run_week(
+    catalog, programs, ws: date, args: argparse.Namespace, load_s: float | None = None, workers: int | None = None,
+) -> dict:
+    """
+    Précalcul, résolution et écriture d'une semaine ; retourne sa ligne
+    d'index. workers : threads de la semaine en batch (run_weeks divise les
+    CPUs entre les semaines) ; sans, chaque solveur garde son défaut.
+    """
+    cpsat_workers = workers or 8
+    t0 = time.perf_counter()
+    out, hint = args.out, args.hint
+    report, prom = args.report, args.prom
+    if args.weeks > 1:
+        # en batch, chaque semaine repart de sa propre grille précédente
+        out = hint = os.path.join(args.out_dir, f"schedule_{ws}.json")
+        report = report and os.path.join(args.out_dir, f"report_{ws}.json")
+        prom = prom and _week_path(prom, ws)
+
+    metrics = RunMetrics({"solver": args.solver, "formulation": args.formulation, "week_start": str(ws)}, echo=not args.quiet)
+    log = metrics.log
+    if load_s is not None:
+        metrics.add_phase("load", load_s)
+
+    log(f"[2] Building precomputed (week_start={ws}, engine={args.engine})...")
+    with metrics.phase("precompute"):
+        if args.no_cache:
+            pre = build_precomputed(programs, ws, engine=args.engine, catalog=catalog)
+        else:
+            pre = cached_precomputed(
+                programs, ws, args.cache_dir, engine=args.engine,
+                max_bytes=args.cache_max_mb * 1024 * 1024, max_age_days=args.cache_max_age_days,
+                catalog=catalog,
+            )
+    if args.aggregate:
+        with metrics.phase("aggregate"):
+            pre = aggregate(pre)
+        if pre.members:
+            n = sum(len(ps) - 1 for ps in pre.members.values())
+            log(f"    {n} interchangeable programs folded into {len(pre.members)} classes.")
+    log(f"    {len(pre.allowed_starts)} allowed-start slots, {len(pre.candidates)} total entries.")
+    with metrics.phase("dp_bound"):
+        dp_bound = upper_bound(pre)
+    log(f"    Upper bound (each day at its best, no weekly constraint): {dp_bound}")
 
-    print(f"[3] Solving with {args.solver} (limit={args.time_limit}s)...", flush=True)
+    model_cache_dir = None if args.no_cache else args.model_cache_dir
+    fzn_cache_dir = None if args.no_cache else args.fzn_cache_dir
+    progress = None
+    if args.stream:
+        progress = ProgressWriter(
+            pre, out, {"solver": args.solver, "formulation": args.formulation, "week_start": str(ws)},
+            progress_path=args.progress or f"{out}.progress.jsonl", versioned=args.stream_versions,
+        )
+
+    log(f"[3] Solving with {args.solver} (limit={args.time_limit}s)...")
+    t_solve = time.perf_counter()
     if args.solver == "ortools":
-        res = solve_ortools(pre, time_limit_s=args.time_limit, hint_file=args.hint, gap=args.gap)
+        res = solve_ortools(pre, time_limit_s=args.time_limit, hint_file=hint, gap=args.gap, formulation=args.formulation, model_cache_dir=model_cache_dir, progress=progress, metrics=metrics, greedy_hint=not args.no_greedy_hint, workers=cpsat_workers, log=log)
+        starts = res.starts
+        meta = {"solver": "ortools", "formulation": args.formulation, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+    elif args.solver == "decompose":
+        res = solve_decomposed(pre, time_limit_s=args.time_limit, hint_file=hint, gap=args.gap, formulation=args.formulation, processes=args.processes, cpus=workers, log=log)
+        starts = res.starts
+        meta = {"solver": "decompose", "formulation": args.formulation, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+    elif args.solver == "lns":
+        res = solve_lns(pre, time_limit_s=args.time_limit, hint_file=hint, formulation=args.formulation, sub_time_s=args.lns_sub_time, model_cache_dir=model_cache_dir, progress=progress, metrics=metrics, greedy_hint=not args.no_greedy_hint, workers=cpsat_workers, log=log)
+        starts = res.starts
+        meta = {"solver": "lns", "formulation": args.formulation, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+    elif args.solver == "portfolio":
+        members = default_members()
+        if args.portfolio_members:
+            wanted = args.portfolio_members.split(",")
+            members = [m for m in members if m.name in wanted]
+        res = solve_portfolio(pre, time_limit_s=args.time_limit, hint_file=hint, gap=args.gap, members=members, model_cache_dir=model_cache_dir, mzn_formulation=args.mzn_formulation, fzn_cache_dir=fzn_cache_dir, mzn_data=args.mzn_data, cpus=workers, log=log)
+        starts = res.starts
+        meta = {"solver": "portfolio", "winner": res.winner, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+    elif args.solver == "multires":
+        res = solve_multires(
+            pre, programs, ws, time_limit_s=args.time_limit, coarse_minutes=args.coarse_minutes,
+            radius=args.multires_radius, gap=args.gap, formulation=args.formulation, workers=cpsat_workers, engine=args.engine,
+            metrics=metrics, log=log,
+        )
+        starts = res.starts
+        meta = {"solver": "multires", "coarse_minutes": args.coarse_minutes, "formulation": args.formulation, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+    elif args.solver == "repair":
+        res = solve_repair(
+            pre, hint, load_disruption(args.disruption), window_minutes=args.repair_window, time_limit_s=args.time_limit,
+            gap=args.gap, formulation=args.formulation, workers=cpsat_workers, model_cache_dir=model_cache_dir, metrics=metrics,
+            log=log,
+        )
+        starts = res.starts
+        meta = {"solver": "repair", "formulation": args.formulation, "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws), "repair": res.changes}
+    elif args.solver == "greedy":
+        res = solve_greedy(pre, time_limit_s=args.time_limit, log=log)
+        starts = res.starts
+        meta = {"solver": "greedy", "status": res.status, "objective": res.objective, "week_start": str(ws)}
+    elif args.solver == "lagrangian":
+        res = solve_lagrangian(pre, time_limit_s=args.time_limit, log=log)
         starts = res.starts
-        meta = {"solver": "ortools", "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
+        meta = {"solver": "lagrangian", "status": res.status, "objective": res.objective, "best_bound": res.best_bound, "week_start": str(ws)}
     else:
-        res = solve_minizinc(pre, model_path="src/minizinc_model.mzn", workdir="mzn_work", timeout_s=args.time_limit)
+        res = solve_minizinc(
+            pre, workdir="mzn_work", timeout_s=args.time_limit, formulation=args.mzn_formulation,
+            data_mode=args.mzn_data, fzn_cache_dir=fzn_cache_dir, log=log,
+        )
         starts = res.starts
         meta = {"solver": "minizinc", "status": res.status, "objective": res.objective, "week_start": str(ws)}
 
-    sched = starts_to_schedule(pre, starts)
-    sched["meta"] = meta
+    metrics.add_phase("solve", time.perf_counter() - t_solve)
+    meta["dp_bound"] = dp_bound
+    metrics.set("result", **{k: v for k, v in meta.items() if k in ("status", "objective", "best_bound", "dp_bound")}, starts=len(starts))
 
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(sched, f, ensure_ascii=False, indent=2)
+    with metrics.phase("export"):
+        sched = starts_to_schedule(pre, starts)
+        sched["meta"] = meta
+        atomic_write_json(out, sched)
 
-    print(f"Written: {args.out}")
-    print(meta)
+    log(f"Written: {out}")
+    log(str(meta))
+    if report:
+        metrics.write_json(report)
+        log(f"Report: {report}")
+    if prom:
+        metrics.write_prometheus(prom)
+    return {**meta, "file": out, "elapsed_s": round(time.perf_counter() - t0, 1)}
 
 
 if __name__ == "__main__":
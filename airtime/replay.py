@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+# Résout un modèle CP-SAT sauvegardé par main.py (--model-cache-dir) sans
+# catalogue ni précalcul : pour régler les paramètres hors ligne.
+#
+#   python replay.py --list
+#   python replay.py model_cache/<clé> --time-limit 60 --hint schedule.json \
+#       --params "linearization_level:2"
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from src.model_cache import load_model, as_build
+from src.ortools_solver import solve_built, hints_from_schedule
+
+
+def _list(cache_dir: str) -> None:
+    root = Path(cache_dir)
+    entries = sorted(
+        (e for e in root.iterdir() if e.is_dir() and not e.name.startswith(".tmp-")),
+        key=lambda e: e.stat().st_mtime, reverse=True,
+    ) if root.is_dir() else []
+    for e in entries:
+        try:
+            meta = json.loads((e / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        print(f"{e}  formulation={meta.get('formulation')}  x={meta.get('n_x')}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("entry", nargs="?", help="Model cache entry directory")
+    ap.add_argument("--list", action="store_true", help="List the entries of --model-cache-dir")
+    ap.add_argument("--model-cache-dir", default="model_cache")
+    ap.add_argument("--time-limit", type=float, default=60)
+    ap.add_argument("--gap", type=float, default=0.0)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--hint", default=None, help="schedule.json to use as warm-start")
+    ap.add_argument("--params", default=None, help="Extra SatParameters, text format")
+    ap.add_argument("--json", default=None, help="Append the result to this JSON-lines file")
+    args = ap.parse_args()
+
+    if args.list or not args.entry:
+        _list(args.model_cache_dir)
+        return
+
+    t = time.perf_counter()
+    loaded = load_model(Path(args.entry))
+    if loaded is None:
+        raise SystemExit(f"No valid model in {args.entry}")
+    model, keys, program_ids = loaded
+    built = as_build(model, keys)
+    load_s = time.perf_counter() - t
+    print(f"Loaded {len(built.xs)} x-variables in {load_s:.2f}s", flush=True)
+
+    hints = hints_from_schedule(program_ids, args.hint)
+    t = time.perf_counter()
+    res = solve_built(
+        built, args.time_limit, gap=args.gap, workers=args.workers, hints=hints, params=args.params,
+    )
+    row = {
+        "entry": args.entry,
+        "time_limit": args.time_limit,
+        "gap": args.gap,
+        "workers": args.workers,
+        "hint": args.hint,
+        "params": args.params,
+        "status": res.status,
+        "objective": res.objective,
+        "best_bound": res.best_bound,
+        "load_s": round(load_s, 2),
+        "solve_s": round(time.perf_counter() - t, 2),
+    }
+    print(row)
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .preprocess import Precomputed, _dominance_classes, _program_tables
+
+
+# Regroupement des programmes interchangeables : même classe de dominance
+# (mêmes coefficients dans toutes les contraintes), même coût, et mêmes
+# entrées candidates avec la même audience et le même profit. Le modèle n'en
+# garde qu'un, le représentant (plus petit indice). Pas de variable entière
+# de comptage par (jour, slot, classe) : la couverture ne laisse partir
+# qu'un programme par slot, le booléen x du représentant est déjà ce compte.
+# Seule la règle des séries (C.6, une diffusion par semaine) distingue
+# encore les membres : elle devient « au plus pre.copies(p) départs du
+# représentant ». Après résolution, assign_members rend à chaque départ un
+# programme concret.
+#
+# Les copies exactes hors séries sont déjà retirées par la réduction par
+# dominance (preprocess._drop_dominated) : il ne reste à regrouper que des
+# épisodes de séries identiques, rares dans un vrai catalogue (aucun dans
+# data/programs.json). Le regroupement est donc optionnel (main.py
+# --aggregate).
+
+
+def aggregate(pre: Precomputed) -> Precomputed:
+    """pre où chaque classe de programmes interchangeables n'a plus d'entrées que pour son représentant."""
+    cand = pre.candidates
+    if not len(cand):
+        return pre
+    key = cand.slot_keys()
+    order = np.lexsort((key, cand.prog))      # par programme, puis slot
+    prog = cand.prog[order]
+    bounds = np.flatnonzero(np.r_[True, prog[1:] != prog[:-1], True])
+    cls, limited = _dominance_classes(pre.programs, _program_tables(pre.programs, pre.slot_minutes))
+
+    classes: Dict[tuple, List[int]] = {}
+    for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        p, rows = int(prog[a]), order[a:b]
+        sig = (
+            cls[p], int(pre.programs[p].cost), limited[p],
+            key[rows].tobytes(), cand.audience[rows].tobytes(), cand.profit[rows].tobytes(),
+        )
+        classes.setdefault(sig, []).append(p)
+
+    # idempotent : deux représentants n'ont jamais la même signature
+    members = {ps[0]: ps for ps in classes.values() if len(ps) > 1}
+    if not members:
+        return pre
+    dropped = np.zeros(len(pre.programs), dtype=bool)
+    for rep, ps in members.items():
+        dropped[ps] = True
+        dropped[rep] = False
+    return dataclasses.replace(pre, candidates=cand.select(~dropped[cand.prog]), members=members)
+
+
+def assign_members(pre: Precomputed, starts: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """
+    Départs du représentant répartis sur les membres de sa classe, dans
+    l'ordre chronologique : chaque membre au plus une fois tant qu'il en
+    reste (une série n'a jamais plus de départs que de membres).
+    """
+    if not pre.members:
+        return list(starts)
+    used: Dict[int, int] = {}
+    out = []
+    for d, s, p in sorted(starts):
+        ps = pre.members.get(p)
+        if ps is not None:
+            k = used.get(p, 0)
+            used[p] = k + 1
+            p = ps[k % len(ps)]
+        out.append((d, s, p))
+    return out
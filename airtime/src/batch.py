@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog import Catalog
+from .loader import Program
+
+
+# Planification de plusieurs semaines : le catalogue colonnaire est compilé
+# une fois puis publié dans un segment de mémoire partagée ; chaque processus
+# du pool y attache des vues numpy en lecture seule au lieu de recevoir une
+# copie picklée du catalogue par tâche.
+
+# (colonne|table, nom, dtype, forme, offset dans le segment)
+_Layout = List[Tuple[str, str, str, Tuple[int, ...], int]]
+
+_ALIGN = 64
+
+
+class SharedCatalog:
+    """Catalogue copié dans un segment partagé ; handle() est picklable."""
+
+    def __init__(self, catalog: Catalog) -> None:
+        arrays = [("col", k, v) for k, v in catalog.columns.items()]
+        arrays += [("tab", k, v) for k, v in catalog.tables.items()]
+        layout: _Layout = []
+        size = 0
+        for kind, name, arr in arrays:
+            layout.append((kind, name, arr.dtype.str, arr.shape, size))
+            size += -(-arr.nbytes // _ALIGN) * _ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (kind, name, arr), (_, _, dtype, shape, offset) in zip(arrays, layout):
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            view[...] = arr
+        self.layout = layout
+
+    def handle(self) -> Tuple[str, _Layout]:
+        return self.shm.name, self.layout
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+# segment et catalogue attachés, par processus du pool
+_shm: Optional[shared_memory.SharedMemory] = None
+_catalog: Optional[Catalog] = None
+_programs: Optional[List[Program]] = None
+
+
+def attach_catalog(handle: Tuple[str, _Layout]) -> Catalog:
+    global _shm, _catalog, _programs
+    name, layout = handle
+    # le segment appartient au processus parent, qui le libère (close())
+    _shm = shared_memory.SharedMemory(name=name)
+    columns: Dict[str, np.ndarray] = {}
+    tables: Dict[str, np.ndarray] = {}
+    for kind, key, dtype, shape, offset in layout:
+        view = np.ndarray(shape, dtype=dtype, buffer=_shm.buf, offset=offset)
+        view.flags.writeable = False
+        (columns if kind == "col" else tables)[key] = view
+    _catalog = Catalog(columns=columns, tables=tables)
+    _programs = _catalog.to_programs()
+    return _catalog
+
+
+def _run(fn: Callable[..., Dict[str, Any]], ws: date, args: Any, workers: int) -> Dict[str, Any]:
+    return fn(_catalog, _programs, ws, args, workers=workers)
+
+
+def run_weeks(
+    catalog: Catalog,
+    weeks: List[date],
+    fn: Callable[..., Dict[str, Any]],
+    args: Any,
+    processes: Optional[int] = None,
+    on_done: Callable[[Dict[str, Any]], None] = lambda row: None,
+) -> List[Dict[str, Any]]:
+    """
+    fn(catalog, programs, week_start, args, workers=...) pour chaque semaine,
+    dans un pool de `processes` processus (défaut : min(semaines, CPUs)) ;
+    workers : les CPUs divisés entre les processus, à passer aux solveurs.
+    fn et args doivent être picklables. Résultats dans l'ordre de weeks.
+    """
+    cpus = os.cpu_count() or 1
+    processes = processes or min(len(weeks), cpus)
+    workers = max(1, cpus // processes)
+    shared = SharedCatalog(catalog)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=attach_catalog, initargs=(shared.handle(),),
+        ) as pool:
+            futures = [pool.submit(_run, fn, ws, args, workers) for ws in weeks]
+            rows = []
+            for f in futures:
+                rows.append(f.result())
+                on_done(rows[-1])
+            return rows
+    finally:
+        shared.close()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from . import config
+from .candidates import CandidateTable
+from .catalog import Catalog
+from .loader import Program
+from .preprocess import Precomputed, build_precomputed, _with_fixed_blocks, _program_tables, _assemble
+from .incremental import update_precomputed
+
+
+# À incrémenter si le format ou la sémantique du précalcul change
+CACHE_FORMAT = 4
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+_ARRAYS = ("offsets", "prog", "audience", "profit")
+_FIELDS = [f.name for f in dataclasses.fields(Program)]
+
+
+def catalog_digest(programs: List[Program]) -> str:
+    """Empreinte du contenu du catalogue (tous les champs de chaque programme)."""
+    h = hashlib.sha256()
+    for p in programs:
+        h.update(repr(p).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def config_digest() -> str:
+    """Empreinte des constantes de src/config.py utilisées par le précalcul."""
+    f = config.ad_breaks_for_program.__code__
+    relevant = (
+        config.DAYS_FR, config.SLOT_MINUTES, config.SLOTS_PER_DAY, config.SCHEDULE_START,
+        config.TIME_BANDS, sorted(config.DAY_COEFF.items()), sorted(config.AGE_MIN_TIME.items()),
+        sorted(config.EUROPE_ORIGINS), sorted(config.FICTION_GENRES), config.JT_BLOCKS,
+        config.MAX_CANDIDATES_PER_SLOT, config.AD_BREAK_MINUTES,
+        f.co_code, f.co_consts,
+    )
+    return hashlib.sha256(repr(relevant).encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    programs: List[Program], week_start: date, catalog: Optional[Catalog] = None, slot_minutes: int = config.SLOT_MINUTES,
+) -> str:
+    # le catalogue colonnaire, s'il est fourni, s'empreinte plus vite que les objets Program
+    content = catalog.digest() if catalog is not None else catalog_digest(programs)
+    h = hashlib.sha256()
+    for part in (str(CACHE_FORMAT), content, str(week_start), str(slot_minutes), config_digest()):
+        h.update(part.encode("utf-8"))
+        h.update(b"|")
+    return h.hexdigest()[:32]
+
+
+def _save(entry: Path, candidates: CandidateTable, programs: List[Program], week_start: date, slot_minutes: int) -> None:
+    # écriture dans un répertoire temporaire puis renommage atomique
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+    try:
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(candidates, name))
+        meta = {
+            "format": CACHE_FORMAT,
+            "n_days": candidates.n_days,
+            "slots_per_day": candidates.slots_per_day,
+            "week_start": str(week_start),
+            "slot_minutes": slot_minutes,
+            "config": config_digest(),
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        # catalogue source, pour les mises à jour incrémentales (cf. _previous)
+        rows = [[getattr(p, f) for f in _FIELDS] for p in programs]
+        (tmp / "programs.json").write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, entry)
+    except OSError:
+        # une autre exécution a pu écrire la même entrée entre-temps
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _load(entry: Path) -> Optional[CandidateTable]:
+    try:
+        meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format") != CACHE_FORMAT:
+            return None
+        arrays = {name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+    except (OSError, ValueError):
+        return None
+    os.utime(entry)  # date d'accès pour l'éviction LRU
+    return CandidateTable(n_days=meta["n_days"], slots_per_day=meta["slots_per_day"], **arrays)
+
+
+def _previous(cache_dir: str, week_start: date) -> Optional[Precomputed]:
+    """
+    Entrée la plus récente pour la même semaine et la même configuration,
+    sur la grille de base, avec le catalogue qui l'a produite : point de
+    départ d'une mise à jour incrémentale quand seuls quelques programmes
+    ont changé.
+    """
+    root = Path(cache_dir)
+    if not root.is_dir():
+        return None
+    entries = sorted(
+        (e for e in root.iterdir() if e.is_dir() and not e.name.startswith(".tmp-")),
+        key=lambda e: e.stat().st_mtime, reverse=True,
+    )
+    for e in entries:
+        try:
+            meta = json.loads((e / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if (meta.get("week_start"), meta.get("slot_minutes"), meta.get("config")) != (
+            str(week_start), config.SLOT_MINUTES, config_digest(),
+        ):
+            continue
+        candidates = _load(e)
+        if candidates is None:
+            continue
+        try:
+            rows = json.loads((e / "programs.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        full = _with_fixed_blocks([Program(*r) for r in rows])
+        return _assemble(full, _program_tables(full), candidates)
+    return None
+
+
+def _entry_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+
+def evict(cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> int:
+    """
+    Supprime les entrées plus vieilles que max_age_days, puis les moins
+    récemment utilisées jusqu'à passer sous max_bytes. Retourne le nombre
+    d'entrées supprimées.
+    """
+    root = Path(cache_dir)
+    if not root.is_dir():
+        return 0
+    now = time.time()
+    entries = []
+    for e in root.iterdir():
+        if not e.is_dir() or e.name.startswith(".tmp-"):
+            continue
+        entries.append((e.stat().st_mtime, _entry_size(e), e))
+    entries.sort()  # les plus anciennes d'abord
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, e in entries:
+        if now - mtime > max_age_days * 86400 or total > max_bytes:
+            shutil.rmtree(e, ignore_errors=True)
+            total -= size
+            removed += 1
+    return removed
+
+
+def cached_precomputed(
+    programs: List[Program],
+    week_start: date,
+    cache_dir: str,
+    engine: str = "numpy",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    catalog: Optional[Catalog] = None,
+    slot_minutes: int = config.SLOT_MINUTES,
+) -> Precomputed:
+    """
+    build_precomputed avec cache disque. Les candidats sont stockés en .npy
+    et rechargés en mmap ; les attributs par programme sont recalculés
+    (coût négligeable) à partir du catalogue. En l'absence d'entrée exacte,
+    la dernière entrée de la même semaine est mise à jour incrémentalement
+    (moteur numpy et grille de base uniquement).
+    """
+    entry = Path(cache_dir) / cache_key(programs, week_start, catalog, slot_minutes)
+    candidates = _load(entry)
+    if candidates is not None:
+        full = _with_fixed_blocks(programs)
+        return _assemble(full, _program_tables(full, slot_minutes), candidates, slot_minutes)
+
+    prev = None
+    if engine == "numpy" and slot_minutes == config.SLOT_MINUTES:
+        prev = _previous(cache_dir, week_start)
+    if prev is not None:
+        pre = update_precomputed(prev, programs, week_start, catalog=catalog)
+    else:
+        pre = build_precomputed(programs, week_start, engine=engine, catalog=catalog, slot_minutes=slot_minutes)
+    _save(entry, pre.candidates, programs, week_start, slot_minutes)
+    evict(cache_dir, max_bytes=max_bytes, max_age_days=max_age_days)
+    return pre
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CandidateTable:
+    """
+    Candidats (jour, slot, programme) au format CSR.
+
+    Les entrées du slot (d, s) occupent [offsets[k], offsets[k+1]) avec
+    k = d * slots_per_day + s, triées par programme croissant. audience et
+    profit sont alignés sur prog : un seul tableau plat par coefficient au lieu
+    de dicts indexés par tuples.
+    """
+    n_days: int
+    slots_per_day: int
+    offsets: np.ndarray   # int64, n_days * slots_per_day + 1
+    prog: np.ndarray      # int32
+    audience: np.ndarray  # int64
+    profit: np.ndarray    # int64
+
+    def __len__(self) -> int:
+        return len(self.prog)
+
+    def span(self, d: int, s: int) -> Tuple[int, int]:
+        k = d * self.slots_per_day + s
+        return int(self.offsets[k]), int(self.offsets[k + 1])
+
+    def slot_keys(self) -> np.ndarray:
+        """d * slots_per_day + s de chaque entrée."""
+        n_keys = self.n_days * self.slots_per_day
+        return np.repeat(np.arange(n_keys, dtype=np.int64), np.diff(self.offsets))
+
+    def entries(self) -> Tuple[List[int], List[int], List[int]]:
+        """Listes (jours, slots, programmes) alignées sur les entrées."""
+        key = self.slot_keys()
+        return (
+            (key // self.slots_per_day).tolist(),
+            (key % self.slots_per_day).tolist(),
+            self.prog.tolist(),
+        )
+
+    def find(self, d: int, s: int, p: int) -> int:
+        """Indice de l'entrée (d, s, p), ou -1 si p n'est pas candidat en (d, s)."""
+        if not (0 <= d < self.n_days and 0 <= s < self.slots_per_day):
+            return -1
+        a, b = self.span(d, s)
+        j = a + int(np.searchsorted(self.prog[a:b], p))
+        if j < b and self.prog[j] == p:
+            return j
+        return -1
+
+    def select(self, keep: np.ndarray) -> "CandidateTable":
+        """Sous-table des entrées où keep (booléen, aligné sur prog) est vrai."""
+        return CandidateTable.from_arrays(
+            self.n_days, self.slots_per_day,
+            self.slot_keys()[keep], self.prog[keep], self.audience[keep], self.profit[keep],
+        )
+
+    @classmethod
+    def from_arrays(
+        cls, n_days: int, slots_per_day: int,
+        slot_key: np.ndarray, prog: np.ndarray, audience: np.ndarray, profit: np.ndarray,
+    ) -> "CandidateTable":
+        """slot_key / prog doivent être triés par (slot_key, prog)."""
+        offsets = np.searchsorted(slot_key, np.arange(n_days * slots_per_day + 1)).astype(np.int64)
+        return cls(
+            n_days=n_days,
+            slots_per_day=slots_per_day,
+            offsets=offsets,
+            prog=np.ascontiguousarray(prog, dtype=np.int32),
+            audience=np.ascontiguousarray(audience, dtype=np.int64),
+            profit=np.ascontiguousarray(profit, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_dicts(
+        cls, n_days: int, slots_per_day: int,
+        allowed_starts: Dict[Tuple[int, int], List[int]],
+        audience: Dict[Tuple[int, int, int], int],
+        profit: Dict[Tuple[int, int, int], int],
+    ) -> "CandidateTable":
+        keys: List[int] = []
+        progs: List[int] = []
+        for d in range(n_days):
+            for s in range(slots_per_day):
+                plist = sorted(allowed_starts.get((d, s), []))
+                keys += [d * slots_per_day + s] * len(plist)
+                progs += plist
+        key_arr = np.asarray(keys, dtype=np.int64)
+        aud = [audience[(k // slots_per_day, k % slots_per_day, p)] for k, p in zip(keys, progs)]
+        prof = [profit[(k // slots_per_day, k % slots_per_day, p)] for k, p in zip(keys, progs)]
+        return cls.from_arrays(
+            n_days, slots_per_day, key_arr,
+            np.asarray(progs, dtype=np.int32),
+            np.asarray(aud, dtype=np.int64),
+            np.asarray(prof, dtype=np.int64),
+        )
+
+
+class AllowedStartsView(Mapping):
+    """Vue compatible avec l'ancien dict (d, s) -> [p, ...]."""
+
+    def __init__(self, table: CandidateTable) -> None:
+        self._t = table
+
+    def __getitem__(self, key: Tuple[int, int]) -> List[int]:
+        d, s = key
+        if not (0 <= d < self._t.n_days and 0 <= s < self._t.slots_per_day):
+            raise KeyError(key)
+        a, b = self._t.span(d, s)
+        return self._t.prog[a:b].tolist()
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for d in range(self._t.n_days):
+            for s in range(self._t.slots_per_day):
+                yield (d, s)
+
+    def __len__(self) -> int:
+        return self._t.n_days * self._t.slots_per_day
+
+
+class CoefficientView(Mapping):
+    """Vue compatible avec l'ancien dict (d, s, p) -> coefficient."""
+
+    def __init__(self, table: CandidateTable, values: np.ndarray) -> None:
+        self._t = table
+        self._v = values
+
+    def __getitem__(self, key: Tuple[int, int, int]) -> int:
+        j = self._t.find(*key)
+        if j < 0:
+            raise KeyError(key)
+        return int(self._v[j])
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        days, slots, progs = self._t.entries()
+        return iter(zip(days, slots, progs))
+
+    def __len__(self) -> int:
+        return len(self._t)
+
+    def items(self):
+        days, slots, progs = self._t.entries()
+        return list(zip(zip(days, slots, progs), self._v.tolist()))
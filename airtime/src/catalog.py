@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .loader import Program, load_programs
+from .preprocess import _parse_date, _rerun_days, _start_bounds
+
+
+# Catalogue colonnaire : une colonne numpy par champ de Program.
+# - chaînes (genre, origine, dates, ...) : codes int32 + table internée, -1 = None
+# - listes (fixed_days, preferred_slots, ...) : même chose sur leur JSON
+# - entiers optionnels : int64, INT_NONE = None
+# - booléens optionnels : int8, -1 = None
+# Colonnes dérivées (calculées une fois à la compilation) :
+# - dates en ordinaux (0 = absente, -1 = illisible)
+# - rerun_days : délai de rediffusion effectif (0 = pas de règle)
+# - start_lo / start_hi / start_day : bornes de départ indépendantes de la semaine
+
+INT_NONE = np.iinfo(np.int64).min
+
+_STR_FIELDS = {
+    "id", "title", "genre", "subgenre", "origin", "age_rating",
+    "rights_start", "rights_end", "last_broadcast_date",
+    "usual_day", "usual_time", "fixed_time", "previous_episode",
+}
+_LIST_FIELDS = {
+    "fixed_days", "target_audience", "preferred_slots", "forbidden_slots",
+    "compatible_genres", "incompatible_genres",
+}
+_BOOL_FIELDS = {
+    "independent", "in_production", "is_new", "is_exclusive",
+    "first_broadcast", "health_magazine",
+}
+FIELDS = [f.name for f in dataclasses.fields(Program)]
+_INT_FIELDS = set(FIELDS) - _STR_FIELDS - _LIST_FIELDS - _BOOL_FIELDS
+
+
+def _intern(values: List) -> Tuple[np.ndarray, np.ndarray]:
+    table: Dict[str, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        codes[i] = -1 if v is None else table.setdefault(v, len(table))
+    return codes, np.array(list(table), dtype=np.str_)
+
+
+def _date_ordinal(s, strict: bool) -> int:
+    if not s:
+        return 0
+    try:
+        return _parse_date(s).toordinal()
+    except ValueError:
+        if strict:
+            raise
+        return -1
+
+
+@dataclass(frozen=True)
+class Catalog:
+    columns: Dict[str, np.ndarray]
+    tables: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def values(self, field: str) -> List:
+        """Valeurs Python d'un champ, comme dans Program."""
+        col = self.columns[field]
+        if field in self.tables:
+            table = self.tables[field].tolist()
+            if field in _LIST_FIELDS:
+                table = [json.loads(t) for t in table]
+            return [None if c < 0 else table[c] for c in col.tolist()]
+        if field in _BOOL_FIELDS:
+            return [None if v < 0 else bool(v) for v in col.tolist()]
+        return [None if v == INT_NONE else v for v in col.tolist()]
+
+    def to_programs(self) -> List[Program]:
+        return [Program(*vals) for vals in zip(*(self.values(f) for f in FIELDS))]
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        for name in sorted(self.columns):
+            h.update(name.encode("utf-8"))
+            h.update(np.ascontiguousarray(self.columns[name]).tobytes())
+        for name in sorted(self.tables):
+            h.update(name.encode("utf-8"))
+            h.update("\x00".join(self.tables[name].tolist()).encode("utf-8"))
+        return h.hexdigest()
+
+    def week_eligible(self, week_start: date) -> np.ndarray:
+        """Disponibilité (C.14), rerun (C.6) et exclusivité (C.7), vectorisés."""
+        c = self.columns
+        w = week_start.toordinal()
+        ok = c["in_production"] != 1
+        ok &= (c["rights_start_ord"] == 0) | (w >= c["rights_start_ord"])
+        ok &= (c["rights_end_ord"] == 0) | (w <= c["rights_end_ord"])
+        last = c["last_broadcast_ord"]
+        since = w - last
+        known = last > 0
+        ok &= ~(known & (c["rerun_days"] > 0) & (since < c["rerun_days"]))
+        ok &= ~(known & (c["is_exclusive"] == 1) & (since < 180))
+        return ok
+
+
+def compile_catalog(programs: List[Program]) -> Catalog:
+    columns: Dict[str, np.ndarray] = {}
+    tables: Dict[str, np.ndarray] = {}
+    for f in FIELDS:
+        vals = [getattr(p, f) for p in programs]
+        if f in _STR_FIELDS:
+            columns[f], tables[f] = _intern(vals)
+        elif f in _LIST_FIELDS:
+            columns[f], tables[f] = _intern([None if v is None else json.dumps(v, ensure_ascii=False) for v in vals])
+        elif f in _BOOL_FIELDS:
+            columns[f] = np.array([-1 if v is None else int(bool(v)) for v in vals], dtype=np.int8)
+        else:
+            columns[f] = np.array([INT_NONE if v is None else int(v) for v in vals], dtype=np.int64)
+
+    # colonnes dérivées : dates et règles parsées une seule fois
+    columns["rights_start_ord"] = np.array([_date_ordinal(p.rights_start, True) for p in programs], dtype=np.int64)
+    columns["rights_end_ord"] = np.array([_date_ordinal(p.rights_end, True) for p in programs], dtype=np.int64)
+    columns["last_broadcast_ord"] = np.array([_date_ordinal(p.last_broadcast_date, False) for p in programs], dtype=np.int64)
+    columns["rerun_days"] = np.array([_rerun_days(p) for p in programs], dtype=np.int64)
+    bounds = [_start_bounds(p) for p in programs]
+    columns["start_lo"] = np.array([b[0] for b in bounds], dtype=np.int64)
+    columns["start_hi"] = np.array([b[1] for b in bounds], dtype=np.int64)
+    columns["start_day"] = np.array([-1 if b[2] is None else b[2] for b in bounds], dtype=np.int64)
+    return Catalog(columns=columns, tables=tables)
+
+
+def save_catalog(catalog: Catalog, path: str) -> None:
+    arrays = {f"col:{k}": v for k, v in catalog.columns.items()}
+    arrays.update({f"tab:{k}": v for k, v in catalog.tables.items()})
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_catalog(path: str) -> Catalog:
+    columns: Dict[str, np.ndarray] = {}
+    tables: Dict[str, np.ndarray] = {}
+    with np.load(path) as z:
+        for key in z.files:
+            kind, name = key.split(":", 1)
+            (columns if kind == "col" else tables)[name] = z[key]
+    return Catalog(columns=columns, tables=tables)
+
+
+if __name__ == "__main__":
+    # python -m src.catalog data/programs.json data/programs.npz
+    src, dst = sys.argv[1], sys.argv[2]
+    save_catalog(compile_catalog(load_programs(src)), dst)
+    print(f"Written: {dst}")
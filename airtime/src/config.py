@@ -92,8 +92,11 @@ JT_BLOCKS = [
 ]
 
 # Réduction de la taille du modèle
-# Nombre max de programmes candidats par créneau (slot).
-# Limiter ce nombre réduit drastiquement les variables du solveur.
+# Les candidats dominés (même classe, profit <= et coût >= ; voir
+# preprocess._drop_dominated) sont toujours retirés, sans perte. Ensuite,
+# nombre max de programmes candidats par créneau (slot) : limiter ce nombre
+# réduit drastiquement les variables du solveur mais peut écarter la
+# solution optimale. None : pas de plafond.
 MAX_CANDIDATES_PER_SLOT = 25
 
 # Publicité (C.12) – approx
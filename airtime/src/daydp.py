@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .preprocess import Precomputed
+
+
+# Une journée est une suite de départs sans chevauchement qui couvre ses
+# SLOTS_PER_DAY slots : sa meilleure grille est un plus long chemin sur les
+# slots (arc s -> s + durée pour chaque entrée de pre.candidates au slot s).
+# Sans les contraintes hebdomadaires (budget, quotas, séries...), la somme
+# des meilleurs jours majore l'objectif CP-SAT ; avec des poids modifiés
+# (prix lagrangiens, pénalités), c'est le cœur de src/lagrangian.py et de
+# src/greedy.py.
+
+
+class DayDP:
+    """Pavages optimaux d'un jour sur les entrées de pre.candidates."""
+
+    def __init__(self, pre: Precomputed) -> None:
+        cand = self.cand = pre.candidates
+        S = self.S = cand.slots_per_day
+        self.D = cand.n_days
+        key = cand.slot_keys()
+        self.day, self.slot = key // S, key % S
+        dur = np.asarray(pre.duration_slots, dtype=np.int64)[cand.prog]
+        self.end = np.minimum(self.slot + dur, S)
+
+        # une entrée ne peut pas recouvrir un départ fixe, et au slot d'un
+        # départ fixe seul le programme imposé est possible
+        next_fixed = np.empty(self.D * S, dtype=np.int64)
+        fixed_at = np.full(self.D * S, -1, dtype=np.int64)
+        for (d, s), p in pre.fixed_start.items():
+            fixed_at[d * S + s] = p
+        for d in range(self.D):
+            nxt = S
+            for s in range(S - 1, -1, -1):
+                next_fixed[d * S + s] = nxt
+                if fixed_at[d * S + s] >= 0:
+                    nxt = s
+        prog = cand.prog.astype(np.int64)
+        self.valid = (self.end <= next_fixed[key]) & ((fixed_at[key] < 0) | (fixed_at[key] == prog))
+
+    def day_range(self, d: int) -> Tuple[int, int]:
+        """Entrées [lo, hi) du jour d (pre.candidates est trié par jour puis slot)."""
+        return self.cand.span(d, 0)[0], self.cand.span(d, self.S - 1)[1]
+
+    def tile(
+        self, d: int, w: np.ndarray, a: int = 0, b: Optional[int] = None, off: int = 0,
+    ) -> Tuple[float, Optional[List[int]]]:
+        """
+        (poids, entrées) du meilleur pavage de [a, b) du jour d, ou (-inf, None).
+        w[j - off] : poids de l'entrée j (-inf : interdite) ; valid n'est pas
+        appliqué ici.
+        """
+        b = self.S if b is None else b
+        best = np.full(b + 1, -np.inf)
+        best[b] = 0.0
+        choice = np.full(b, -1, dtype=np.int64)
+        for s in range(b - 1, a - 1, -1):
+            lo, hi = self.cand.span(d, s)
+            if lo == hi:
+                continue
+            end = self.end[lo:hi]
+            v = w[lo - off:hi - off] + np.where(end <= b, best[np.minimum(end, b)], -np.inf)
+            i = int(np.argmax(v))
+            if v[i] > -np.inf:
+                best[s], choice[s] = v[i], lo + i
+        if choice[a] < 0:
+            return -np.inf, None
+        out, s = [], a
+        while s < b:
+            j = int(choice[s])
+            out.append(j)
+            s = int(self.end[j])
+        return float(best[a]), out
+
+    def week(self, w: np.ndarray) -> Tuple[float, List[Optional[List[int]]]]:
+        """Somme des meilleurs jours pour les poids w (un par entrée) et leurs pavages."""
+        w = np.where(self.valid, w, -np.inf)
+        total, days = 0.0, []
+        for d in range(self.D):
+            lo, hi = self.day_range(d)
+            value, entries = self.tile(d, w[lo:hi], off=lo)
+            total += value
+            days.append(entries)
+        return total, days
+
+
+def upper_bound(pre: Precomputed) -> Optional[int]:
+    """Majorant de l'objectif (profit) : chaque jour à son meilleur, sans contrainte hebdo ; None si un jour n'a aucun pavage."""
+    value, _ = DayDP(pre).week(pre.candidates.profit.astype(np.float64))
+    return int(value) if value > -np.inf else None
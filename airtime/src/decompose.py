@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import DAYS_FR, SLOTS_PER_DAY, SLOT_MINUTES, TOTAL_WEEKLY_BUDGET, GENRE_GROUPS
+from .preprocess import Precomputed
+from .ortools_solver import (
+    SolveResult, Targets, SERIES_GENRES, SOCIETY_SUBGENRES,
+    build_model, solve_built, load_hints, genre_bounds,
+)
+from .greedy import full_hint, hint_result
+
+
+# Décomposition par jour : les jours ne sont couplés que par le budget, les
+# quotas (EU/FR/indépendant, genres), le magazine de société hebdomadaire et
+# la règle « une fois par semaine » des séries. On les répartit en cibles
+# journalières telles que 7 solutions journalières réalisables forment une
+# semaine réalisable, on résout les 7 jours en parallèle, puis une courte
+# résolution hebdomadaire part de leur assemblage.
+
+
+def _series_days(pre: Precomputed) -> Dict[int, int]:
+    """Jour attribué à chaque série candidate : le moins chargé parmi ses jours possibles."""
+    cand = pre.candidates
+    day = cand.slot_keys() // cand.slots_per_day
+    load = [0] * len(DAYS_FR)
+    assigned: Dict[int, int] = {}
+    for p in sorted(set(cand.prog.tolist())):
+        if pre.programs[p].genre not in SERIES_GENRES:
+            continue
+        options = sorted(set(day[cand.prog == p].tolist()))
+        d = min(options, key=lambda dd: (load[dd], dd))
+        assigned[p] = d
+        load[d] += 1
+    return assigned
+
+
+def _magazine_day(pre: Precomputed) -> Optional[int]:
+    """Jour qui portera le magazine de société : celui qui en propose le plus."""
+    cand = pre.candidates
+    day = cand.slot_keys() // cand.slots_per_day
+    counts = [0] * len(DAYS_FR)
+    for d, p in zip(day.tolist(), cand.prog.tolist()):
+        prog = pre.programs[p]
+        if prog.genre == "Magazine" and (prog.subgenre or "").lower() in SOCIETY_SUBGENRES:
+            counts[d] += 1
+    if not any(counts):
+        return None
+    return max(range(len(DAYS_FR)), key=lambda d: (counts[d], -d))
+
+
+def _split(total: int, weights: List[int], round_up: bool) -> List[int]:
+    """total réparti au prorata de weights ; arrondi vers le haut (somme >= total) ou le bas (<=)."""
+    w = sum(weights)
+    if not w:
+        return [0] * len(weights)
+    if round_up:
+        return [-(-total * wd // w) for wd in weights]
+    return [total * wd // w for wd in weights]
+
+
+def _genre_capacity(day_pres: List[Precomputed]) -> Dict[str, List[int]]:
+    """
+    Minutes qu'un groupe de genres peut occuper chaque jour : la journée entière
+    s'il y a un candidat rediffusable, sinon la durée cumulée de ses séries
+    (une diffusion par semaine).
+    """
+    day_minutes = SLOTS_PER_DAY * SLOT_MINUTES
+    cap: Dict[str, List[int]] = {}
+    for group, genres_in in GENRE_GROUPS.items():
+        row = []
+        for sub in day_pres:
+            progs = {p for p in sub.candidates.prog.tolist() if sub.programs[p].genre in genres_in}
+            if any(sub.programs[p].genre not in SERIES_GENRES for p in progs):
+                row.append(day_minutes)
+            else:
+                row.append(min(day_minutes, sum(int(sub.programs[p].duration_minutes) for p in progs)))
+        cap[group] = row
+    return cap
+
+
+def day_subproblems(pre: Precomputed) -> List[Tuple[Precomputed, Targets]]:
+    """Un Precomputed restreint et ses cibles pour chaque jour."""
+    D = len(DAYS_FR)
+    cand = pre.candidates
+    day = cand.slot_keys() // cand.slots_per_day
+    series = _series_days(pre)
+    series_day = np.full(len(pre.programs), -1, dtype=np.int64)
+    for p, d in series.items():
+        series_day[p] = d
+    entry_series_day = series_day[cand.prog]
+    mag_day = _magazine_day(pre)
+
+    day_pres = [
+        dataclasses.replace(pre, candidates=cand.select((day == d) & ((entry_series_day < 0) | (entry_series_day == d))))
+        for d in range(D)
+    ]
+
+    # quotas de genres : bornes hebdomadaires réparties au prorata de la
+    # capacité de chaque jour (les séries ne sont disponibles que leur jour)
+    cap = _genre_capacity(day_pres)
+    per_day: List[Dict[str, Tuple[int, int]]] = [{} for _ in range(D)]
+    for group, (lo, hi) in genre_bounds(Targets().minutes).items():
+        los = _split(lo, cap[group], round_up=True)
+        his = _split(hi, cap[group], round_up=False)
+        for d in range(D):
+            per_day[d][group] = (los[d], his[d])
+
+    return [
+        (day_pres[d], Targets(
+            budget=TOTAL_WEEKLY_BUDGET // D,
+            minutes=Targets().minutes // D,
+            genres=per_day[d],
+            society_magazine=(d == mag_day),
+        ))
+        for d in range(D)
+    ]
+
+
+def _meets_genre_minima(pre: Precomputed, starts: List[Tuple[int, int, int]]) -> bool:
+    """Les minima hebdomadaires de genres sont-ils atteints par ces départs ?"""
+    minutes: Dict[str, int] = {}
+    for _, _, p in starts:
+        prog = pre.programs[p]
+        for group, genres_in in GENRE_GROUPS.items():
+            if prog.genre in genres_in:
+                minutes[group] = minutes.get(group, 0) + int(prog.duration_minutes)
+    return all(
+        minutes.get(group, 0) * 100 >= lo
+        for group, (lo, _) in genre_bounds(Targets().minutes).items()
+    )
+
+
+def _solve_day(
+    pre: Precomputed, d: int, targets: Targets, formulation: str,
+    time_limit_s: float, workers: int, gap: float, hints: Optional[Set[Tuple[int, int, int]]],
+) -> Tuple[int, SolveResult, bool]:
+    """
+    Résout le jour d ; sans solution, réessaie sans les minima de genres du
+    jour (la résolution hebdomadaire devra alors les rétablir).
+    """
+    t0 = _time.perf_counter()
+    built = build_model(pre, formulation=formulation, days=[d], targets=targets, log=lambda msg: None)
+    res = solve_built(built, time_limit_s / 2, gap=gap, workers=workers, hints=hints)
+    if res.starts:
+        return d, res, False
+
+    relaxed = dataclasses.replace(targets, genres={g: (0, hi) for g, (lo, hi) in targets.genres.items()})
+    built = build_model(pre, formulation=formulation, days=[d], targets=relaxed, log=lambda msg: None)
+    remaining = max(1.0, time_limit_s - (_time.perf_counter() - t0))
+    return d, solve_built(built, remaining, gap=gap, workers=workers, hints=hints), True
+
+
+def solve_decomposed(
+    pre: Precomputed,
+    time_limit_s: int = 900,
+    hint_file: str | None = None,
+    gap: float = 0.0,
+    formulation: str = "coverage",
+    processes: Optional[int] = None,
+    repair_fraction: float = 0.3,
+    cpus: Optional[int] = None,
+    log: Callable[[str], None] = print,
+) -> SolveResult:
+    """
+    Résolution en trois temps :
+    1. budget et quotas répartis en cibles journalières ;
+    2. les 7 jours résolus dans un pool de processus ;
+    3. résolution hebdomadaire (le temps restant, au moins
+       time_limit_s * repair_fraction) partant des solutions journalières.
+    cpus : threads à répartir (défaut : tous les CPUs).
+    """
+    D = len(DAYS_FR)
+    cpus = cpus or os.cpu_count() or 1
+    processes = processes or min(D, cpus)
+    workers = max(1, cpus // processes)
+    deadline = _time.perf_counter() + time_limit_s
+    # jours résolus par vagues de `processes`
+    rounds = -(-D // processes)
+    day_time_s = time_limit_s * (1 - repair_fraction) / rounds
+
+    _t0 = _time.perf_counter()
+    def _elapsed(): return f"{_time.perf_counter()-_t0:.1f}s"
+
+    try:
+        hints = load_hints(pre, hint_file)
+    except Exception as e:
+        log(f"    [{_elapsed()}] Warning: could not load hints: {e}")
+        hints = None
+
+    subproblems = day_subproblems(pre)
+    log(f"    [{_elapsed()}] {D} day subproblems, {processes} processes x {workers} workers")
+
+    day_results: Dict[int, SolveResult] = {}
+    relaxed_days: List[int] = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_solve_day, sub, d, targets, formulation, day_time_s, workers, gap, hints)
+            for d, (sub, targets) in enumerate(subproblems)
+        ]
+        for f in futures:
+            d, res, relaxed = f.result()
+            day_results[d] = res
+            if relaxed:
+                relaxed_days.append(d)
+            log(f"    [{_elapsed()}] day {DAYS_FR[d]}: {res.status} objective={res.objective}"
+                + (" (genre minima relaxed)" if relaxed else ""))
+
+    combined = sorted(st for res in day_results.values() for st in res.starts)
+    # tous les jours résolus : les cibles garantissent budget, quotas légaux,
+    # maxima de genres, séries et magazine ; seuls les minima de genres des
+    # jours relâchés restent à vérifier
+    combined_feasible = all(res.starts for res in day_results.values()) and (
+        not relaxed_days or _meets_genre_minima(pre, combined)
+    )
+
+    weekly = set(combined)
+    if not combined_feasible:
+        # jours incomplets ou minima de genres manquants : la grille gloutonne, si elle est faisable
+        weekly = full_hint(
+            pre, weekly or hints, log=log, time_limit_s=max(1.0, 0.05 * time_limit_s),
+        )
+    fallback = hint_result(pre, weekly)
+
+    log(f"    [{_elapsed()}] Weekly repair from {len(weekly or ())} starts...")
+    built = build_model(pre, formulation=formulation, log=lambda msg: None)
+    repair_s = max(1.0, deadline - _time.perf_counter())
+    res = solve_built(
+        built, repair_s, gap=gap, workers=cpus,
+        hints=weekly, repair_hint=fallback is None,
+    )
+    log(f"    [{_elapsed()}] Weekly repair: {res.status} objective={res.objective}")
+
+    if not res.starts and fallback is not None:
+        return fallback
+    return res
@@ -2,23 +2,24 @@ from __future__ import annotations
 
 from typing import Dict, List, Tuple
 
-from .config import DAYS_FR, SLOT_MINUTES, TIME_BANDS, DAY_COEFF, AD_BREAK_MINUTES, ad_breaks_for_program
+from .config import DAYS_FR, DAY_COEFF, AD_BREAK_MINUTES, ad_breaks_for_program
+from .aggregate import assign_members
 from .preprocess import Precomputed
-from .timeutils import time_from_slot_index, slot_index_from_time
+from .timeline import Timeline, timeline
 
 
-def _band_for_slot(slot: int) -> Dict:
-    for b in TIME_BANDS:
-        s = slot_index_from_time(b["start"])
-        e = slot_index_from_time(b["end"])
-        if s <= slot < e:
-            return b
-    return TIME_BANDS[0]
+def _ad_revenue(pre: Precomputed, d: int, s: int, p: int) -> int:
+    """Recette pub d'un départ : profit précalculé + coût (p : programme ou représentant)."""
+    j = pre.candidates.find(d, s, p)
+    if j >= 0:
+        return int(pre.candidates.profit[j]) + int(pre.programs[p].cost)
+    # départ absent des candidats (grille d'un autre précalcul) : même formule
+    return _estimate_ad_revenue(pre.programs[p], s, DAYS_FR[d], timeline(pre.slot_minutes))
 
 
-def _estimate_ad_revenue(prog, start_slot: int, day_name: str) -> int:
+def _estimate_ad_revenue(prog, start_slot: int, day_name: str, tl: Timeline) -> int:
     """Estimate ad revenue for a program based on audience and CPM."""
-    band = _band_for_slot(start_slot)
+    band = tl.band_of(start_slot)
     cpm = band["cpm"]  # cost per mille (per 1000 viewers)
     day_coeff = DAY_COEFF.get(day_name, 1.0)
     audience = int(prog.base_audience * band["aud_mult"] * day_coeff)
@@ -32,9 +33,13 @@ def _estimate_ad_revenue(prog, start_slot: int, day_name: str) -> int:
 def starts_to_schedule(pre: Precomputed, starts: List[Tuple[int, int, int]]) -> Dict:
     out = {"days": []}
 
+    # départs d'un représentant (src/aggregate.py) -> programmes concrets ;
+    # la recette se lit sur l'entrée du représentant
+    tl = timeline(pre.slot_minutes)
     starts_by_day = {d: [] for d in range(7)}
-    for d, s, p in starts:
-        starts_by_day[d].append((s, p))
+    rep = pre.representative()
+    for d, s, p in assign_members(pre, starts):
+        starts_by_day[d].append((s, p, _ad_revenue(pre, d, s, rep.get(p, p))))
 
     weekly_cost = 0
     weekly_revenue = 0
@@ -44,19 +49,18 @@ def starts_to_schedule(pre: Precomputed, starts: List[Tuple[int, int, int]]) ->
         day_cost = 0
         day_revenue = 0
         day_name = DAYS_FR[d]
-        for s, p in sorted(starts_by_day[d]):
+        for s, p, revenue in sorted(starts_by_day[d]):
             prog = pre.programs[p]
             dur = int(prog.duration_minutes)
             end_slot = s + pre.duration_slots[p]
             cost = int(prog.cost)
-            revenue = _estimate_ad_revenue(prog, s, day_name)
             day_cost += cost
             day_revenue += revenue
             items.append({
                 "start_slot": s,
                 "end_slot": end_slot,
-                "start_time": time_from_slot_index(s),
-                "end_time": time_from_slot_index(end_slot),
+                "start_time": tl.time[s],
+                "end_time": tl.time[end_slot],
                 "program_id": prog.id,
                 "title": prog.title,
                 "genre": prog.genre,
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import minizinc
+import numpy as np
+
+from .cache import evict, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_DAYS
+
+
+# Cache disque de la FlatZinc compilée (modèle + données, pour un solveur
+# donné : la compilation dépend de sa bibliothèque globale). Une entrée :
+# - model.fzn : le modèle aplati
+# - model.ozn : le modèle de sortie (solutions au format JSON)
+# - meta.json : solveur, temps de compilation
+# Une relance avec un autre --time-limit passe directement au solveur.
+
+# À incrémenter si le contenu d'une entrée change
+FZN_FORMAT = 1
+
+# options de compilation : sorties JSON avec l'objectif, lues par _parse_output
+_COMPILE_FLAGS = {"output-mode": "json", "output-objective": True}
+
+
+def fzn_key(model_path: str, backend: minizinc.Solver, data: Iterable[Tuple[str, Any]]) -> str:
+    """Empreinte : format, version de MiniZinc et du solveur, modèle, données (nom, valeur)."""
+    h = hashlib.sha256()
+    driver = minizinc.default_driver
+    for part in (str(FZN_FORMAT), driver.minizinc_version if driver else "", backend.id, backend.version):
+        h.update(part.encode("utf-8"))
+        h.update(b"|")
+    h.update(Path(model_path).read_bytes())
+    for name, value in data:
+        h.update(name.encode("utf-8"))
+        if isinstance(value, np.ndarray):
+            h.update(np.ascontiguousarray(value, dtype=np.int64).tobytes())
+        elif isinstance(value, Path):
+            h.update(value.read_bytes())
+        else:
+            h.update(repr(sorted(value) if isinstance(value, (set, frozenset)) else value).encode("utf-8"))
+        h.update(b"|")
+    return h.hexdigest()[:32]
+
+
+def cached_flatzinc(
+    inst: minizinc.Instance,
+    entry: Path,
+    log=print,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+) -> Path:
+    """Répertoire de l'entrée, compilée depuis inst si elle est absente."""
+    if (entry / "meta.json").exists():
+        os.utime(entry)  # date d'accès pour l'éviction LRU
+        log(f"    FlatZinc loaded from {entry}")
+        return entry
+    t = time.perf_counter()
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+    try:
+        with inst.flat(**_COMPILE_FLAGS) as (fzn, ozn, stats):
+            shutil.copyfile(fzn.name, tmp / "model.fzn")
+            shutil.copyfile(ozn.name, tmp / "model.ozn")
+        meta = {"format": FZN_FORMAT, "compile_s": round(time.perf_counter() - t, 3), "statistics": stats}
+        (tmp / "meta.json").write_text(json.dumps(meta, default=str), encoding="utf-8")
+        os.replace(tmp, entry)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    log(f"    FlatZinc compiled in {time.perf_counter() - t:.1f}s -> {entry}")
+    evict(str(entry.parent), max_bytes=max_bytes, max_age_days=max_age_days)
+    return entry
+
+
+def solve_flatzinc(entry: Path, backend: minizinc.Solver, timeout_s: int) -> Tuple[str, int, Optional[Dict]]:
+    """(statut, objectif, dernière solution {variable: valeur} ou None)."""
+    cmd = [
+        str(minizinc.default_driver.executable), "--solver", backend.id,
+        "--time-limit", str(int(timeout_s * 1000)),
+        "--ozn-file", str(entry / "model.ozn"), str(entry / "model.fzn"),
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"minizinc failed ({proc.returncode}): {proc.stderr.strip()}")
+    return _parse_output(proc.stdout)
+
+
+def _parse_output(text: str) -> Tuple[str, int, Optional[Dict]]:
+    # solutions JSON séparées par "----------", puis éventuellement une ligne de statut
+    status, last, buf = "UNKNOWN", None, []
+    for line in text.splitlines():
+        if line.startswith("%"):
+            continue
+        if line == "----------":
+            last = json.loads("\n".join(buf))
+            buf = []
+            status = "SATISFIED"
+        elif line == "==========":
+            status = "OPTIMAL_SOLUTION"
+        elif line.startswith("=====") and line.endswith("====="):
+            status = line.strip("=")
+        elif line.strip():
+            buf.append(line)
+    objective = int(last.get("_objective", 0)) if last else 0
+    return status, objective, last
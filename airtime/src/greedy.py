@@ -0,0 +1,465 @@
+from __future__ import annotations
+
+import random
+import time as _time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import (
+    DAYS_FR, GENRE_GROUPS, MAX_AD_MIN_PER_HOUR,
+    LEGAL_MIN_EURO_PERCENT, LEGAL_MIN_FR_PERCENT, LEGAL_MIN_INDEP_PERCENT,
+)
+from .daydp import DayDP
+from .ortools_solver import SERIES_GENRES, SOCIETY_SUBGENRES, ModelIndex, SolveResult, Targets, ad_terms, genre_bounds
+from .metrics import RunMetrics
+from .preprocess import Precomputed
+from .timeline import timeline
+
+
+# Construction rapide d'une grille complète, sans CP-SAT :
+# 1. chaque jour est pavé de gauche à droite par programmation dynamique sur
+#    les départs candidats (les blocs JT fixes sont imposés, un programme ne
+#    peut pas les chevaucher) ; quelques passes ajustent des multiplicateurs
+#    sur le budget et les quotas pour partir d'une grille proche du faisable ;
+# 2. réparation : une fenêtre de quelques programmes consécutifs est repavée
+#    (même DP, poids = profit + effet sur les contraintes violées) et le
+#    changement est gardé s'il réduit les violations, ou le profit à
+#    violations égales. Le pavage du reste de la semaine ne bouge pas.
+# Les âges, droits et horaires habituels sont déjà dans pre.candidates.
+# check() vérifie une grille quelconque avec les mêmes règles que build_model.
+
+HINT_MOVES = 3000     # mouvements d'une tentative gloutonne de full_hint
+POLISH_MOVES = 100    # polish en mouvements, avec max_moves
+BIG_MAX = 1e6         # poids maximal d'une violation dans _repair, en profits médians
+
+
+def _c1_table() -> List[Tuple[int, int, int]]:
+    # état (v, run) -> bit 3 * v + run - 1 ; run <= 3. Un slot libre (kind -1)
+    # prend l'un ou l'autre type. Entrée [masque][kind] : masque suivant ;
+    # le masque 64 est l'état initial (aucun départ).
+    table = []
+    for mask in range(64):
+        row = []
+        for values in ((0,), (1,), (0, 1)):
+            nxt = 0
+            for v in values:
+                for last in (0, 1):
+                    for run in (1, 2, 3):
+                        if mask >> (3 * last + run - 1) & 1:
+                            r = run + 1 if v == last else 1
+                            if r <= 3:
+                                nxt |= 1 << (3 * v + r - 1)
+            row.append(nxt)
+        table.append(tuple(row))   # index -1 : slot libre
+    table.append(tuple(sum(1 << 3 * v for v in values) for values in ((0,), (1,), (0, 1))))
+    return table
+
+
+_C1_NEXT = _c1_table()
+_C1_START = 64
+
+
+class _Rules:
+    """Coefficients par entrée de pre.candidates et évaluation d'une grille."""
+
+    def __init__(self, pre: Precomputed, targets: Targets = Targets()) -> None:
+        self.pre, self.targets = pre, targets
+        cand = pre.candidates
+        S = self.S = cand.slots_per_day
+        self.D = len(DAYS_FR)
+        idx = self.idx = ModelIndex.build(pre, with_covers=False)
+        self.n = len(cand)
+        self.end = idx.slot + idx.length   # = DayDP.end
+        def per_prog(values) -> np.ndarray:
+            return np.asarray(values, dtype=np.int64)[idx.prog]
+
+        self.minutes = per_prog([int(p.duration_minutes) for p in pre.programs])
+        self.cost = per_prog([int(p.cost) for p in pre.programs])
+        self.profit = cand.profit.astype(np.int64)
+        self.fiction = per_prog(pre.is_fiction)
+        self.genre = per_prog(pre.genre_id)
+        self.G = max(pre.genre_id, default=0) + 1
+        names = {g: pre.programs[p].genre for p, g in reversed(list(enumerate(pre.genre_id)))}
+        self.doc = np.isin(self.genre, [g for g, name in names.items() if name == "Documentaire"])
+        progs = pre.programs
+        self.soc = np.array([
+            targets.society_magazine and progs[p].genre == "Magazine"
+            and (progs[p].subgenre or "").lower() in SOCIETY_SUBGENRES
+            for p in idx.prog.tolist()
+        ], dtype=bool)
+        self.series = np.array([progs[p].genre in SERIES_GENRES for p in range(len(progs))], dtype=bool)[idx.prog]
+        self.series_progs = np.unique(idx.prog[self.series])
+        # diffusions permises par programme de série (> 1 : classe regroupée, src/aggregate.py)
+        self.copies = np.array([pre.copies(p) for p in range(len(progs))], dtype=np.int64)
+
+        # contraintes hebdomadaires linéaires : colonne k de coef, bornes en
+        # centièmes de minute pour les quotas (comme build_model)
+        total = targets.minutes
+        columns: List[np.ndarray] = [self.cost]
+        self.bounds: List[Tuple[str, Optional[int], Optional[int], int]] = [("budget", None, targets.budget, 1)]
+        for name, flags, pct in (
+            ("EU", pre.is_european, LEGAL_MIN_EURO_PERCENT),
+            ("FR", pre.is_french, LEGAL_MIN_FR_PERCENT),
+            ("Indep", pre.is_independent, LEGAL_MIN_INDEP_PERCENT),
+        ):
+            if pct > 0:
+                columns.append(self.minutes * per_prog(flags))
+                self.bounds.append((f"quota {name}", int(pct * 100) * total, None, 100))
+        genres = targets.genres if targets.genres is not None else genre_bounds(total)
+        for group, (lo, hi) in genres.items():
+            inq = np.isin(self.genre, [g for g, name in names.items() if name in GENRE_GROUPS[group]])
+            columns.append(self.minutes * inq)
+            self.bounds.append((f"quota {group}", lo, hi, 100))
+        if self.soc.any():
+            columns.append(self.soc.astype(np.int64))
+            self.bounds.append(("magazine de société", 1, None, 1))
+        self.coef = np.stack(columns, axis=1)
+
+        self.dp = DayDP(pre)
+        self.valid = self.dp.valid
+
+        # C.1 : slots de départ de chaque jour (hors nuit) et type imposé
+        # quand tous les candidats du slot sont du même type (-1 : libre)
+        nuit_start = timeline(pre.slot_minutes).night_start
+        self.c1_slots: List[List[Tuple[int, int]]] = []
+        for d in range(self.D):
+            day_slots = []
+            for s in range(nuit_start):
+                a, b = cand.span(d, s)
+                if a < b:
+                    fic = self.fiction[a:b]
+                    day_slots.append((s, int(fic[0]) if (fic == fic[0]).all() else -1))
+            self.c1_slots.append(day_slots)
+
+        # C.12 : termes (entrée, coefficient) de chaque heure
+        j_ad, coef, by_hour = ad_terms(pre, idx)
+        self.ad_terms: Dict[int, Dict[int, int]] = {}   # entrée -> {clé d*S+heure: coefficient}
+        for k, pos in by_hour.items():
+            for j, c in zip(j_ad[pos].tolist(), coef[pos].tolist()):
+                self.ad_terms.setdefault(j, {})[k] = c
+        self.ad_limit = MAX_AD_MIN_PER_HOUR * 1000
+
+    # ---------------------------------------------------------------- évaluation
+
+    def weekly(self, totals: np.ndarray) -> Dict[str, float]:
+        """Violations normalisées des contraintes hebdomadaires linéaires."""
+        out: Dict[str, float] = {}
+        for (name, lo, hi, scale), v in zip(self.bounds, totals.tolist()):
+            v *= scale
+            if lo is not None and v < lo:
+                out[f"{name} min" if hi is not None else name] = (lo - v) / max(lo, 1)
+            if hi is not None and v > hi:
+                out[f"{name} max" if lo is not None else name] = (v - hi) / max(hi, 1)
+        return out
+
+    def daily(self, d: int, entries: List[int]) -> Dict[str, float]:
+        """Violations du jour d : variété, documentaire, C.1, publicité."""
+        out: Dict[str, float] = {}
+        e = np.asarray(entries, dtype=np.int64)
+        n_genres = len(np.unique(self.genre[e]))
+        if n_genres < 4:
+            out[f"genres {DAYS_FR[d]}"] = (4 - n_genres) / 4
+        if not self.doc[e].any():
+            out[f"documentaire {DAYS_FR[d]}"] = 1.0
+        c1 = self.c1_blame(d, entries)
+        if c1:
+            out[f"C.1 {DAYS_FR[d]}"] = float(len(c1))
+        ads = self.ad_blame(entries)
+        if ads:
+            out[f"pub {DAYS_FR[d]}"] = float(len(ads))
+        return out
+
+    def series_dups(self, chosen: np.ndarray) -> int:
+        count = np.bincount(self.idx.prog[chosen[self.series[chosen]]], minlength=len(self.copies))
+        return int(np.maximum(count - self.copies, 0).sum())
+
+    def violations(self, chosen: np.ndarray) -> Dict[str, float]:
+        """Violations normalisées des contraintes non garanties par le pavage (vide : faisable)."""
+        out = self.weekly(self.coef[chosen].sum(axis=0))
+        day = self.idx.day[chosen]
+        for d in range(self.D):
+            out.update(self.daily(d, chosen[day == d].tolist()))
+        dups = self.series_dups(chosen)
+        if dups:
+            out["séries"] = float(dups)
+        return out
+
+    def c1_blame(self, d: int, entries: List[int]) -> List[int]:
+        """Entrées du jour d en cause dans une suite de 4 départs de même type."""
+        started = {int(self.idx.slot[j]): j for j in entries}
+        blame: List[int] = []
+        # masque des états (type, longueur de la suite) atteignables
+        states = _C1_START
+        recent: List[int] = []
+        for s, kind in self.c1_slots[d]:
+            j = started.get(s)
+            if j is not None:
+                kind = int(self.fiction[j])
+                recent = (recent + [j])[-4:]
+            nxt = _C1_NEXT[states][kind]
+            if not nxt:
+                blame += recent
+                nxt = _C1_NEXT[_C1_START][kind]
+            states = nxt
+        return blame
+
+    def ad_blame(self, entries: List[int]) -> List[int]:
+        """Dans chaque heure trop chargée en pub, l'entrée qui y contribue le plus."""
+        load: Dict[int, int] = {}
+        top: Dict[int, Tuple[int, int]] = {}
+        for j in entries:
+            for k, c in self.ad_terms.get(j, {}).items():
+                load[k] = load.get(k, 0) + c
+                if c > top.get(k, (0, -1))[0]:
+                    top[k] = (c, j)
+        return [top[k][1] for k, v in load.items() if v > self.ad_limit]
+
+
+def solve_greedy(
+    pre: Precomputed,
+    targets: Targets = Targets(),
+    time_limit_s: float = 1.0,
+    polish_s: float = 0.1,
+    seed: int = 0,
+    log: Callable[[str], None] = print,
+    max_moves: Optional[int] = None,
+) -> SolveResult:
+    """
+    Grille complète. FEASIBLE si elle respecte toutes les contraintes du
+    modèle CP-SAT, UNKNOWN sinon (grille la moins fautive, utilisable comme
+    hint). polish_s : réparation prolongée pour le profit une fois faisable.
+    max_moves : la réparation s'arrête après ce nombre de mouvements (dont
+    POLISH_MOVES de polish) au lieu de time_limit_s ; le résultat ne dépend
+    alors que de seed, pas de la charge de la machine.
+    """
+    t0 = _time.perf_counter()
+    deadline = t0 + time_limit_s
+    rules = _Rules(pre, targets)
+    days = _initial(rules)
+    days, rounds = _repair(rules, days, random.Random(seed), deadline, polish_s, max_moves)
+
+    chosen = np.array(sorted(j for day in days for j in day), dtype=np.int64)
+    v = rules.violations(chosen)
+    objective = int(rules.profit[chosen].sum())
+    status = "UNKNOWN" if v else "FEASIBLE"
+    log(
+        f"    Greedy: {status} objective={objective} in {_time.perf_counter() - t0:.2f}s ({rounds} repair moves)"
+        + (f", violations: {', '.join(sorted(v))}" if v else "")
+    )
+    idx = rules.idx
+    starts = sorted(zip(idx.day[chosen].tolist(), idx.slot[chosen].tolist(), idx.prog[chosen].tolist()))
+    return SolveResult(status=status, objective=objective, best_bound=0, starts=starts)
+
+
+def _initial(rules: _Rules, rounds: int = 4) -> List[List[int]]:
+    """Meilleure de quelques semaines pavées jour par jour, multiplicateurs ajustés entre deux passes."""
+    base = np.where(rules.valid, rules.profit.astype(np.float64), -np.inf)
+    scale = float(np.median(np.abs(rules.profit) / np.maximum(rules.minutes, 1)))
+    lam = np.zeros(rules.coef.shape[1])   # > 0 : encourager (borne basse), < 0 : freiner
+    best: Optional[Tuple[float, List[List[int]]]] = None
+    for _ in range(rounds):
+        w = base + rules.coef @ lam
+        days: List[List[int]] = []
+        used = np.zeros(len(rules.pre.programs), dtype=np.int64)
+        for d in range(rules.D):
+            # un épisode déjà diffusé (toute sa classe, si regroupé) est exclu des jours suivants
+            wd = np.where(rules.series & (used >= rules.copies)[rules.idx.prog], -np.inf, w)
+            _, day = rules.dp.tile(d, wd)
+            if day is None:
+                raise RuntimeError(f"No complete tiling for {DAYS_FR[d]}")
+            days.append(day)
+            np.add.at(used, rules.idx.prog[day], 1)
+        chosen = np.array([j for day in days for j in day], dtype=np.int64)
+        v = sum(rules.violations(chosen).values())
+        if best is None or v < best[0]:
+            best = (v, days)
+        totals = rules.coef[chosen].sum(axis=0)
+        for k, (_, lo, hi, s) in enumerate(rules.bounds):
+            step = 0.2 if k == 0 else 0.2 * scale / s   # budget : par euro, quotas : par minute
+            if lo is not None and totals[k] * s < lo:
+                lam[k] += step
+            elif hi is not None and totals[k] * s > hi:
+                lam[k] -= step
+            else:
+                lam[k] *= 0.5
+    return best[1]
+
+
+def _repair(
+    rules: _Rules, days: List[List[int]], rng: random.Random, deadline: float, polish_s: float,
+    max_moves: Optional[int] = None,
+) -> Tuple[List[List[int]], int]:
+    """
+    Repavage de fenêtres tant que la grille viole une contrainte (puis
+    polish_s pour le profit), jusqu'à deadline ; avec max_moves, jusqu'à
+    max_moves mouvements (polish : POLISH_MOVES), sans regarder l'horloge.
+    """
+    idx = rules.idx
+    days = [list(day) for day in days]
+    totals = rules.coef[[j for day in days for j in day]].sum(axis=0)
+    daily = [rules.daily(d, day) for d, day in enumerate(days)]
+    prog_count = np.bincount(idx.prog[[j for day in days for j in day]], minlength=len(rules.pre.programs))
+    def penalty(tot, dly, pc) -> float:
+        dups = int(np.maximum(pc[rules.series_progs] - rules.copies[rules.series_progs], 0).sum())
+        return sum(rules.weekly(tot).values()) + sum(sum(x.values()) for x in dly) + dups
+    current = penalty(totals, daily, prog_count)
+    profit = int(sum(rules.profit[day].sum() for day in days))
+    # poids d'une unité de violation, doublé quand la réparation piétine :
+    # d'abord des réparations peu coûteuses en profit, puis à tout prix
+    # (plafonné : au-delà, les poids des entrées ne sont plus des flottants finis)
+    scale = max(float(np.median(np.abs(rules.profit))), 1.0)
+    big, big_max = scale * 100, scale * BIG_MAX
+    stalled = 0
+    ranges = [rules.dp.day_range(d) for d in range(rules.D)]
+    ratio = scale / max(float(np.median(rules.cost)), 1.0)
+    prices = [0.0, 0.5 * ratio, ratio, 2 * ratio, 4 * ratio]
+
+    polish_until = None
+    moves = 0
+    while moves < max_moves if max_moves is not None else _time.perf_counter() < deadline:
+        if current == 0:
+            if max_moves is not None:
+                polish_until = polish_until or moves + POLISH_MOVES
+                if moves >= polish_until:
+                    break
+            else:
+                polish_until = polish_until or _time.perf_counter() + polish_s
+                if _time.perf_counter() > polish_until:
+                    break
+        d = rng.randrange(rules.D)
+        day = days[d]
+        i = rng.randrange(len(day))
+        k = min(len(day) - i, rng.randint(1, 4))
+        old = day[i:i + k]
+        a, b = int(idx.slot[old[0]]), int(rules.end[old[-1]])
+
+        # poids des entrées du jour : profit + effet linéaire sur les violations du reste
+        lo, hi = ranges[d]
+        rest_tot = totals - rules.coef[old].sum(axis=0)
+        rest_day = day[:i] + day[i + k:]
+        grad = np.zeros(rules.coef.shape[1])
+        for c, (_, qlo, qhi, s) in enumerate(rules.bounds):
+            v = rest_tot[c] * s
+            if qlo is not None and v < qlo:
+                grad[c] = s / max(qlo, 1)
+            elif qhi is not None and v + rules.coef[old, c].sum() * s > qhi:
+                grad[c] = -s / max(qhi, 1)
+        # prix tiré au hasard sur le coût : sans lui, le meilleur repavage
+        # sature le budget et le changement est presque toujours refusé
+        grad[0] -= rng.choice(prices) / big
+        w = rules.profit[lo:hi] + big * (rules.coef[lo:hi] @ grad)
+        if not rules.doc[rest_day].any():
+            w += big * rules.doc[lo:hi]
+        present = np.unique(rules.genre[rest_day])
+        if len(present) < 4:
+            w += big * 0.25 * ~np.isin(rules.genre[lo:hi], present)
+        rest_count = prog_count.copy()
+        np.subtract.at(rest_count, idx.prog[old], 1)
+        banned = rules.series[lo:hi] & (rest_count[idx.prog[lo:hi]] >= rules.copies[idx.prog[lo:hi]])
+        w = np.where(rules.valid[lo:hi] & ~banned, w, -np.inf)
+        _, new = rules.dp.tile(d, w, a, b, off=lo)
+        moves += 1
+        if new is None or new == old:
+            stalled += 1
+            continue
+
+        cand_day = day[:i] + new + day[i + k:]
+        cand_tot = rest_tot + rules.coef[new].sum(axis=0)
+        cand_daily = daily[:d] + [rules.daily(d, cand_day)] + daily[d + 1:]
+        cand_count = rest_count.copy()
+        np.add.at(cand_count, idx.prog[new], 1)
+        cand_pen = penalty(cand_tot, cand_daily, cand_count)
+        cand_profit = profit - int(rules.profit[old].sum()) + int(rules.profit[new].sum())
+        if current == 0:
+            better = cand_pen == 0 and cand_profit > profit
+        else:
+            better = cand_profit - big * cand_pen > profit - big * current
+        if better:
+            days[d], totals, daily, prog_count = cand_day, cand_tot, cand_daily, cand_count
+            current, profit, stalled = cand_pen, cand_profit, 0
+        else:
+            stalled += 1
+            if stalled >= 30 and current > 0:
+                big, stalled = min(big * 2, big_max), 0
+    return days, moves
+
+
+def greedy_restarts(
+    pre: Precomputed, budget_s: float, seed: int = 0, max_moves: Optional[int] = None,
+    log: Callable[[str], None] = lambda msg: None,
+) -> Optional[SolveResult]:
+    """
+    Première grille gloutonne faisable, en relançant avec la graine suivante
+    tant que budget_s n'est pas écoulé (une tentative au moins) ; None sinon.
+    Sans max_moves, chaque tentative dure au plus une seconde.
+    """
+    deadline = _time.perf_counter() + budget_s
+    while True:
+        res = solve_greedy(pre, time_limit_s=min(1.0, budget_s), seed=seed, log=log, max_moves=max_moves)
+        if res.status == "FEASIBLE":
+            return res
+        seed += 1
+        if _time.perf_counter() >= deadline:
+            return None
+
+
+def full_hint(
+    pre: Precomputed,
+    hints: Optional[Set[Tuple[int, int, int]]],
+    log: Callable[[str], None] = print,
+    metrics: Optional[RunMetrics] = None,
+    time_limit_s: float = 5.0,
+) -> Optional[Set[Tuple[int, int, int]]]:
+    """
+    hints s'il forme une grille faisable ; sinon (absent, périmé, incomplet)
+    la grille gloutonne si elle est faisable, à défaut hints tel quel.
+    time_limit_s : relances gloutonnes (HINT_MOVES mouvements chacune, une
+    graine de plus à chaque fois) tant qu'aucune n'est faisable.
+    """
+    t = _time.perf_counter()
+    problems = check(pre, hints) if hints is not None else ["no hint"]
+    if not problems:
+        return hints
+    res = greedy_restarts(pre, time_limit_s, max_moves=HINT_MOVES, log=log)
+    if metrics is not None:
+        metrics.add_phase("greedy_hint", _time.perf_counter() - t)
+    if res is None:
+        return hints
+    log(f"    Warm-start: greedy schedule ({problems[0]}{'...' if len(problems) > 1 else ''} in previous hint)"
+        if hints is not None else "    Warm-start: greedy schedule")
+    return set(res.starts)
+
+
+def hint_result(pre: Precomputed, hints: Optional[Set[Tuple[int, int, int]]]) -> Optional[SolveResult]:
+    """hints comme résultat FEASIBLE (profit, borne 0) s'il passe check(), None sinon."""
+    if not hints or check(pre, hints):
+        return None
+    cand = pre.candidates
+    rep = pre.representative()
+    starts = sorted((d, s, rep.get(p, p)) for d, s, p in hints)
+    objective = int(sum(int(cand.profit[cand.find(d, s, p)]) for d, s, p in starts))
+    return SolveResult(status="FEASIBLE", objective=objective, best_bound=0, starts=starts)
+
+
+def check(pre: Precomputed, starts: Iterable[Tuple[int, int, int]], targets: Targets = Targets()) -> List[str]:
+    """Contraintes du modèle CP-SAT violées par la grille starts (vide : faisable)."""
+    rules = _Rules(pre, targets)
+    cand = pre.candidates
+    rep = pre.representative()
+    starts = [(d, s, rep.get(p, p)) for d, s, p in starts]
+    js = [cand.find(d, s, p) for d, s, p in starts]
+    problems = [f"not a candidate: {st}" for st, j in zip(starts, js) if j < 0]
+    chosen = np.array(sorted(j for j in js if j >= 0), dtype=np.int64)
+    cover = np.zeros((rules.D, rules.S), dtype=np.int64)
+    for j in chosen.tolist():
+        cover[rules.idx.day[j], rules.idx.slot[j]:rules.end[j]] += 1
+    bad = np.argwhere(cover != 1)
+    if len(bad):
+        problems.append(f"coverage: {len(bad)} slots not covered exactly once")
+    chosen_set = set(chosen.tolist())
+    missing = [k for k, p in pre.fixed_start.items() if cand.find(k[0], k[1], p) not in chosen_set]
+    if missing:
+        problems.append(f"fixed starts missing: {len(missing)}")
+    problems += sorted(rules.violations(chosen))
+    return problems
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from .candidates import CandidateTable
+from .config import DAYS_FR, SLOTS_PER_DAY, JT_BLOCKS
+from .loader import Program
+from .preprocess import Precomputed, build_precomputed, _with_fixed_blocks, _program_tables, _assemble
+from .preprocess_numpy import _rule_vectors, _mask_rows, _coefficients, _reduce, _entries
+
+if TYPE_CHECKING:
+    from .catalog import Catalog
+
+
+def diff_programs(old: List[Program], new: List[Program]) -> Optional[List[int]]:
+    """
+    Indices des programmes modifiés entre deux versions du catalogue.
+    None si les identifiants ou leur ordre diffèrent (ajout, suppression,
+    réordonnancement) : les indices de Precomputed ne sont alors plus valides.
+    """
+    if len(old) != len(new) or any(a.id != b.id for a, b in zip(old, new)):
+        return None
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+
+def update_precomputed(
+    pre: Precomputed, programs: List[Program], week_start: date, catalog: Optional[Catalog] = None,
+) -> Precomputed:
+    """
+    Met à jour `pre` (construit pour la même semaine) après modification de
+    quelques programmes du catalogue. Seuls les slots où un programme modifié
+    était ou devient éligible sont recalculés (un programme modifié peut en
+    dominer ou en libérer d'autres : la sélection d'un slot touché se refait
+    entièrement). Le résultat est identique à un build_precomputed complet,
+    vers lequel on se replie si la liste des identifiants a changé.
+    catalog : forme colonnaire de `programs`, optionnelle.
+    """
+    old = pre.programs[:len(pre.programs) - len(JT_BLOCKS)]
+    changed = diff_programs(old, programs)
+    if changed is None:
+        return build_precomputed(programs, week_start, engine="numpy", catalog=catalog)
+
+    full = _with_fixed_blocks(programs)
+    tables = _program_tables(full)
+    if not changed:
+        return _assemble(full, tables, pre.candidates)
+
+    D, S = len(DAYS_FR), SLOTS_PER_DAY
+    days, slots = np.divmod(np.arange(D * S), S)
+    was = _mask_rows(_rule_vectors([old[i] for i in changed], week_start), days, slots)
+    now = _mask_rows(_rule_vectors([programs[i] for i in changed], week_start), days, slots)
+    touched = np.flatnonzero((was | now).any(axis=1))
+    if not len(touched):
+        return _assemble(full, tables, pre.candidates)
+
+    # éligibilité complète des slots touchés, puis même sélection qu'un build complet
+    mask = np.zeros((D, S, len(full)), dtype=bool)
+    mask[days[touched], slots[touched]] = _mask_rows(_rule_vectors(full, week_start, catalog), days[touched], slots[touched])
+    co = _coefficients(full, tables.genre_id)
+    new_key, new_prog, new_aud, new_prof = _entries(_reduce(mask, co, full, tables), co)
+
+    # fusion : entrées des slots non recalculés + slots recalculés
+    recomputed = np.zeros(D * S, dtype=bool)
+    recomputed[touched] = True
+    cand = pre.candidates
+    old_key = cand.slot_keys()
+    stay = ~recomputed[old_key]
+    key = np.concatenate([old_key[stay], new_key])
+    order = np.argsort(key, kind="stable")  # clés disjointes, prog déjà croissant par slot
+    candidates = CandidateTable.from_arrays(
+        D, S,
+        key[order],
+        np.concatenate([cand.prog[stay], new_prog])[order],
+        np.concatenate([cand.audience[stay], new_aud])[order],
+        np.concatenate([cand.profit[stay], new_prof])[order],
+    )
+    return _assemble(full, tables, candidates)
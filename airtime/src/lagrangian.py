@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import math
+import random
+import time as _time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .greedy import _Rules, _initial, _repair
+from .ortools_solver import SolveResult, Targets
+from .preprocess import Precomputed
+
+
+# Relaxation lagrangienne des contraintes hebdomadaires linéaires (budget,
+# quotas EU/FR/indep, quotas de genres, magazine de société) : elles passent
+# dans les poids du DP par jour (src/daydp.py) avec un prix par borne, les
+# autres contraintes (variété, C.1, séries, pub) sont simplement relâchées.
+# Pour tout prix >= 0,
+#     L = somme des meilleurs jours (profit + prix · ligne) - prix · borne
+# majore l'objectif CP-SAT ; les prix suivent un sous-gradient (pas de
+# Polyak vers la meilleure grille faisable). Les pavages de chaque
+# itération sont des grilles complètes : la moins fautive est réparée par
+# src/greedy.py, ce qui donne aussi une solution.
+
+
+def solve_lagrangian(
+    pre: Precomputed,
+    targets: Targets = Targets(),
+    iterations: int = 200,
+    time_limit_s: float = 10.0,
+    seed: int = 0,
+    log: Callable[[str], None] = print,
+) -> SolveResult:
+    """
+    best_bound : meilleure borne lagrangienne (arrondie au-dessus), valable
+    même si aucune grille faisable n'est trouvée (statut UNKNOWN).
+    """
+    t0 = _time.perf_counter()
+    deadline = t0 + time_limit_s
+    dual_deadline = deadline - min(1.0, time_limit_s / 5)   # le reste pour réparer la grille
+    rules = _Rules(pre, targets)
+    rng = random.Random(seed)
+
+    # lignes normalisées : contrainte lo <= ligne·x devient ligne·x / lo >= 1
+    rows, rhs_sign = [], []
+    for k, (_, lo, hi, scale) in enumerate(rules.bounds):
+        col = rules.coef[:, k].astype(np.float64) * scale
+        if lo is not None and lo > 0:
+            rows.append(col / lo)
+            rhs_sign.append(1.0)    # prix > 0 : encourage
+        if hi is not None and hi > 0:
+            rows.append(col / hi)
+            rhs_sign.append(-1.0)   # prix > 0 : freine
+    A = np.stack(rows)              # (contraintes, entrées)
+    sign = np.array(rhs_sign)
+    price = np.zeros(len(rows))
+    profit = rules.profit.astype(np.float64)
+
+    # grille de départ (gloutonne) : cible du pas de Polyak
+    days, _ = _repair(rules, _initial(rules), rng, min(dual_deadline, _time.perf_counter() + 1.0), 0.0)
+    best = _evaluate(rules, days)
+    bound, theta, stall = math.inf, 2.0, 0
+    primal: Optional[Tuple[float, int, List[List[int]]]] = None   # (violation, -profit, jours)
+    it = 0
+    while it < iterations and _time.perf_counter() < dual_deadline:
+        it += 1
+        value, tiling = rules.dp.week(profit + (sign * price) @ A)
+        if any(day is None for day in tiling):
+            log("    Lagrangian: a day has no complete tiling")
+            break
+        value -= float(sign @ price)
+        if value < bound - 1e-6:
+            bound, stall = value, 0
+        else:
+            stall += 1
+            if stall >= 5:
+                theta, stall = theta / 2, 0
+        chosen = np.array([j for day in tiling for j in day], dtype=np.int64)
+        key = (sum(rules.violations(chosen).values()), -int(rules.profit[chosen].sum()))
+        if primal is None or key < primal[:2]:
+            primal = (*key, tiling)
+        # ligne·x - 1 pour les bornes basses, 1 - ligne·x pour les hautes : >= 0 si respectée
+        slack = sign * (A[:, chosen].sum(axis=1) - 1.0)
+        grad = np.where((price > 0) | (slack < 0), slack, 0.0)
+        norm = float(grad @ grad)
+        if norm == 0 or (best is not None and value - best[0] <= 0.5) or theta < 1e-4:
+            break   # prix optimaux pour cette relaxation, ou borne atteinte
+        target = best[0] if best is not None else 0.9 * value
+        price = np.maximum(price - theta * (value - target) / norm * grad, 0.0)
+
+    # bound : la plus petite des bornes vues ; la 1re itération (prix nuls)
+    # donne la borne sans contrainte de src/daydp.py
+    if primal is not None and _time.perf_counter() < deadline:
+        repaired, _ = _repair(rules, primal[2], rng, deadline, 0.1)
+        cand = _evaluate(rules, repaired)
+        if cand is not None and (best is None or cand[0] > best[0]):
+            best = cand
+
+    best_bound = math.ceil(bound) if bound < math.inf else 0
+    if best is None:
+        status, objective, starts = "UNKNOWN", 0, []
+    else:
+        objective, starts = best
+        status = "OPTIMAL" if objective >= best_bound else "FEASIBLE"
+    log(
+        f"    Lagrangian: {status} objective={objective} bound={best_bound} "
+        f"({it} iterations, {_time.perf_counter() - t0:.2f}s)"
+    )
+    return SolveResult(status=status, objective=objective, best_bound=best_bound, starts=starts)
+
+
+def _evaluate(rules: _Rules, days: List[List[int]]) -> Optional[Tuple[int, List[Tuple[int, int, int]]]]:
+    """(objectif, départs) si la grille est faisable, sinon None."""
+    chosen = np.array(sorted(j for day in days for j in day), dtype=np.int64)
+    if rules.violations(chosen):
+        return None
+    idx = rules.idx
+    starts = sorted(zip(idx.day[chosen].tolist(), idx.slot[chosen].tolist(), idx.prog[chosen].tolist()))
+    return int(rules.profit[chosen].sum()), starts
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+import time as _time
+from typing import Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import DAYS_FR, TIME_BANDS
+from .preprocess import Precomputed
+from .timeline import timeline
+from .ortools_solver import ModelBuild, SolveResult, build_model, solve_built, load_hints
+from .model_cache import cached_model
+from .metrics import RunMetrics
+from .greedy import full_hint
+
+
+# Large Neighborhood Search : on fige la meilleure grille connue sauf un
+# voisinage (un jour, une tranche horaire sur la semaine, ou les placements
+# d'un genre) que CP-SAT ré-optimise en quelques secondes, hint compris.
+
+
+@dataclasses.dataclass(frozen=True)
+class Neighborhood:
+    name: str
+    kind: str          # "day" | "band" | "genre"
+    key: int
+
+
+def neighborhoods(pre: Precomputed) -> List[Neighborhood]:
+    out = [Neighborhood(f"day {DAYS_FR[d]}", "day", d) for d in range(len(DAYS_FR))]
+    out += [Neighborhood(f"band {b['name']}", "band", k) for k, b in enumerate(TIME_BANDS)]
+    genres = sorted({(g, pre.genre_name[p]) for p, g in enumerate(pre.genre_id)})
+    out += [Neighborhood(f"genre {name}", "genre", g) for g, name in genres]
+    return out
+
+
+def _free_entries(built: ModelBuild, pre: Precomputed, nb: Neighborhood, current: np.ndarray) -> np.ndarray:
+    """Entrées laissées libres pour ce voisinage (les autres sont figées)."""
+    idx = built.index
+    if nb.kind == "day":
+        return idx.day == nb.key
+    if nb.kind == "band":
+        return timeline(pre.slot_minutes).band[idx.slot] == nb.key
+    # genre : ses entrées, plus celles qui partent des slots qu'il occupe
+    # actuellement, pour qu'un autre genre puisse prendre sa place
+    of_genre = np.asarray(pre.genre_id)[idx.prog] == nb.key
+    S = pre.candidates.slots_per_day
+    placed = np.flatnonzero(current & of_genre)
+    occupied = np.zeros(len(DAYS_FR) * S, dtype=bool)
+    for j in placed.tolist():
+        start = idx.day[j] * S + idx.slot[j]
+        occupied[start:start + idx.length[j]] = True
+    return of_genre | occupied[idx.day * S + idx.slot]
+
+
+def _fixed_model(built: ModelBuild, free: np.ndarray, current: np.ndarray) -> ModelBuild:
+    """Copie du modèle où les x hors voisinage sont fixés à leur valeur courante."""
+    model = built.model.Clone()
+    variables = model.Proto().variables
+    for j in np.flatnonzero(~free).tolist():
+        dom = variables[built.xs[j].Index()].domain
+        dom[0] = dom[1] = int(current[j])
+    return dataclasses.replace(built, model=model)
+
+
+def _as_mask(built: ModelBuild, starts: Set[Tuple[int, int, int]]) -> np.ndarray:
+    return np.array([key in starts for key in built.x], dtype=bool)
+
+
+def solve_lns(
+    pre: Precomputed,
+    time_limit_s: int = 600,
+    hint_file: str | None = None,
+    formulation: str = "coverage",
+    sub_time_s: float = 10.0,
+    workers: int = 8,
+    seed: int = 0,
+    model_cache_dir: str | None = None,
+    progress=None,
+    metrics: Optional[RunMetrics] = None,
+    greedy_hint: bool = True,
+    log: Callable[[str], None] = print,
+) -> SolveResult:
+    """
+    Solution initiale (premier point réalisable, depuis le hint s'il y en a
+    un, ou la grille gloutonne si greedy_hint), puis ré-optimisations successives de voisinages de sub_time_s
+    secondes jusqu'à time_limit_s. Chaque amélioration est affichée, et
+    transmise à progress (ProgressWriter) s'il est fourni.
+    """
+    t0 = _time.perf_counter()
+    deadline = t0 + time_limit_s
+    def _elapsed(): return f"{_time.perf_counter()-t0:.1f}s"
+    def _remaining(): return deadline - _time.perf_counter()
+
+    if model_cache_dir:
+        built = cached_model(pre, formulation, model_cache_dir, log=lambda msg: None, metrics=metrics)
+    else:
+        built = build_model(pre, formulation=formulation, log=lambda msg: None, metrics=metrics)
+    log(f"    [{_elapsed()}] Model built ({len(built.xs)} x-variables)")
+
+    try:
+        hints = load_hints(pre, hint_file)
+    except Exception as e:
+        log(f"    [{_elapsed()}] Warning: could not load hints: {e}")
+        hints = None
+    if greedy_hint:
+        hints = full_hint(
+            pre, hints, log=log, metrics=metrics, time_limit_s=max(1.0, 0.05 * time_limit_s),
+        )
+
+    best = None
+    if hints is not None:
+        # un hint complet se vérifie en figeant tous les x : pas de presolve
+        # du modèle entier, réponse quasi immédiate (son « optimum » et sa
+        # borne ne valent que pour ce modèle figé)
+        hinted = _as_mask(built, hints)
+        res = solve_built(_fixed_model(built, np.zeros_like(hinted), hinted), _remaining(), workers=workers)
+        if res.starts:
+            best = dataclasses.replace(res, status="FEASIBLE", best_bound=0)
+            log(f"    [{_elapsed()}] Initial solution from hint: objective={best.objective}")
+        else:
+            log(f"    [{_elapsed()}] Hint not feasible as is, searching from it")
+    if best is None:
+        whole = dataclasses.replace(built, model=built.model.Clone())
+        best = solve_built(whole, _remaining(), workers=workers, hints=hints, first_solution=True)
+        if not best.starts or best.status == "OPTIMAL":
+            log(f"    [{_elapsed()}] Initial solve: {best.status} objective={best.objective}")
+            return best
+        log(f"    [{_elapsed()}] Initial solution: objective={best.objective}")
+    # seule la résolution complète borne le problème ; les sous-problèmes
+    # ne bornent que leur voisinage
+    best_bound = best.best_bound
+    if progress is not None:
+        progress.write(best.starts, best.objective, best_bound)
+    if metrics is not None:
+        metrics.point(best.objective)
+
+    rng = random.Random(seed)
+    pool = neighborhoods(pre)
+    order: List[Neighborhood] = []
+    n_iter = n_improved = 0
+    while _remaining() > 1.0:
+        if not order:
+            order = pool[:]
+            rng.shuffle(order)
+        nb = order.pop()
+        current = _as_mask(built, set(best.starts))
+        free = _free_entries(built, pre, nb, current)
+        sub = _fixed_model(built, free, current)
+        res = solve_built(sub, min(sub_time_s, _remaining()), workers=workers, hints=set(best.starts))
+        n_iter += 1
+        if res.starts and res.objective > best.objective:
+            n_improved += 1
+            log(f"    [{_elapsed()}] {nb.name}: {best.objective} -> {res.objective}")
+            best = dataclasses.replace(res, best_bound=best_bound)
+            if progress is not None:
+                progress.write(best.starts, best.objective, best_bound)
+            if metrics is not None:
+                metrics.point(best.objective)
+
+    log(f"    [{_elapsed()}] LNS done: {n_iter} neighborhoods, {n_improved} improvements")
+    if metrics is not None:
+        metrics.set("lns", neighborhoods=n_iter, improvements=n_improved, sub_time_s=sub_time_s)
+    return dataclasses.replace(best, status="FEASIBLE")
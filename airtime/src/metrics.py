@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+import stat
+import tempfile
+import time as _time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from ortools.sat.python import cp_model
+
+
+# Rapport d'exécution : durées par phase, statistiques du modèle et du
+# solveur, objectif et borne au cours du temps, messages de progression.
+# Sérialisé en JSON et, optionnellement, au format textfile Prometheus
+# (node_exporter) pour suivre les régressions d'une nuit à l'autre. Les
+# solveurs écrivent leurs messages via un paramètre log ; main.py leur passe
+# RunMetrics.log, qui les consigne dans le rapport et les affiche sauf --quiet.
+
+
+class RunMetrics:
+    def __init__(self, labels: Optional[Dict[str, str]] = None, echo: bool = True) -> None:
+        self.t0 = _time.perf_counter()
+        self.labels: Dict[str, str] = dict(labels or {})
+        self.echo = echo
+        self.phases: Dict[str, float] = {}      # nom -> secondes (cumulées)
+        self.sections: Dict[str, Dict] = {}     # "model", "solver", ...
+        self.timeline: List[Dict] = []          # {t, objective?, bound?}
+        self.events: List[Dict] = []            # {t, message}
+
+    def log(self, msg: str) -> None:
+        """Message de progression : ajouté au rapport, affiché si echo."""
+        self.events.append({"t": round(self.elapsed(), 3), "message": msg.strip()})
+        if self.echo:
+            print(msg, flush=True)
+
+    def elapsed(self) -> float:
+        return _time.perf_counter() - self.t0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t = _time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, _time.perf_counter() - t)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def laps(self, prefix: str) -> Callable[[str], None]:
+        """lap(name) : enregistre prefix.name = temps écoulé depuis le tour précédent."""
+        last = [_time.perf_counter()]
+        def lap(name: str) -> None:
+            now = _time.perf_counter()
+            self.add_phase(f"{prefix}.{name}", now - last[0])
+            last[0] = now
+        return lap
+
+    def set(self, section: str, **values) -> None:
+        self.sections.setdefault(section, {}).update(values)
+
+    def point(self, objective: Optional[int] = None, bound: Optional[float] = None) -> None:
+        row: Dict = {"t": round(self.elapsed(), 3)}
+        if objective is not None:
+            row["objective"] = objective
+        if bound is not None:
+            row["bound"] = bound
+        self.timeline.append(row)
+
+    def record_solver(self, solver: cp_model.CpSolver, status_name: str) -> None:
+        """Statistiques d'une résolution CP-SAT terminée (cumulées si plusieurs)."""
+        prev = self.sections.get("solver", {})
+        self.set(
+            "solver",
+            solves=prev.get("solves", 0) + 1,
+            status=status_name,
+            wall_s=prev.get("wall_s", 0.0) + solver.WallTime(),
+            user_s=prev.get("user_s", 0.0) + solver.UserTime(),
+            conflicts=prev.get("conflicts", 0) + solver.NumConflicts(),
+            branches=prev.get("branches", 0) + solver.NumBranches(),
+            response_stats=solver.ResponseStats(),
+        )
+
+    def report(self) -> Dict:
+        return {
+            "labels": self.labels,
+            "total_s": round(self.elapsed(), 3),
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            **self.sections,
+            "timeline": self.timeline,
+            "events": self.events,
+        }
+
+    def write_json(self, path: str) -> None:
+        atomic_write_text(path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str, prefix: str = "airtime") -> None:
+        """Fichier textfile Prometheus (écrit atomiquement, comme l'exige node_exporter)."""
+        base = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(self.labels.items()))
+        def sample(name: str, value, extra: str = "") -> str:
+            labels = ",".join(x for x in (base, extra) if x)
+            return f"{prefix}_{name}{{{labels}}} {value}" if labels else f"{prefix}_{name} {value}"
+
+        lines = [f"# TYPE {prefix}_phase_seconds gauge"]
+        lines += [sample("phase_seconds", round(v, 4), f'phase="{_escape(k)}"') for k, v in self.phases.items()]
+        lines += [f"# TYPE {prefix}_run_seconds gauge", sample("run_seconds", round(self.elapsed(), 3))]
+        for section in ("model", "solver", "result"):
+            for k, v in self.sections.get(section, {}).items():
+                if isinstance(v, bool) or not isinstance(v, (int, float)):
+                    continue
+                lines += [f"# TYPE {prefix}_{section}_{k} gauge", sample(f"{section}_{k}", v)]
+        atomic_write_text(path, "\n".join(lines) + "\n")
+
+
+class TimelineCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Callback de base : ajoute (objectif, borne) à metrics.timeline à chaque
+    solution, puis appelle on_incumbent() (à surcharger).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.metrics: Optional[RunMetrics] = None
+
+    def on_solution_callback(self) -> None:
+        if self.metrics is not None:
+            self.metrics.point(int(self.ObjectiveValue()), self.BestObjectiveBound())
+        self.on_incumbent()
+
+    def on_incumbent(self) -> None:
+        pass
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _read_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# lu une fois : os.umask() ne se consulte qu'en le modifiant, ce qui n'est pas
+# sûr pendant que le callback de CP-SAT écrit depuis son thread
+_UMASK = _read_umask()
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """
+    Fichier temporaire du même répertoire, puis renommage sur path. Le
+    fichier garde les droits de path s'il existe, sinon ceux d'un open()
+    ordinaire (mkstemp crée en 0600).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
@@ -3,12 +3,22 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
-from typing import List, Tuple
+from typing import IO, Any, Callable, Dict, Iterable, List, Tuple
 
 import minizinc
+import numpy as np
 
-from .config import DAYS_FR, SLOTS_PER_DAY, TOTAL_WEEKLY_BUDGET, LEGAL_MIN_EURO_PERCENT, LEGAL_MIN_FR_PERCENT
+from .config import (
+    DAYS_FR, TOTAL_WEEKLY_BUDGET, GENRE_GROUPS, MAX_AD_MIN_PER_HOUR,
+    LEGAL_MIN_EURO_PERCENT, LEGAL_MIN_FR_PERCENT, LEGAL_MIN_INDEP_PERCENT,
+)
+from .ortools_solver import SERIES_GENRES, SOCIETY_SUBGENRES, ModelIndex, Targets, ad_terms, genre_bounds
 from .preprocess import Precomputed
+from .timeline import timeline
+
+# Modèles MiniZinc : "dense" déclare x sur D×S×P, "sparse" une variable par
+# entrée de pre.candidates (données en CSR, écrites au fil de l'eau)
+MZN_MODELS = {"dense": "src/minizinc_model.mzn", "sparse": "src/minizinc_sparse.mzn"}
 
 
 @dataclass
@@ -20,7 +30,7 @@ class MznResult:
 
 def _write_dzn(pre: Precomputed, dzn_path: str) -> None:
     D = 7
-    S = SLOTS_PER_DAY
+    S = pre.candidates.slots_per_day
     P = len(pre.programs)
 
     # arrays 1-based for MiniZinc
@@ -37,10 +47,10 @@ def _write_dzn(pre: Precomputed, dzn_path: str) -> None:
     allowed = [[[False for _ in range(P)] for _ in range(S)] for _ in range(D)]
     score = [[[0 for _ in range(P)] for _ in range(S)] for _ in range(D)]
 
-    for (d, s), plist in pre.allowed_starts.items():
-        for p in plist:
-            allowed[d][s][p] = True
-            score[d][s][p] = int(pre.score[(d, s, p)])
+    cand = pre.candidates
+    for d, s, p, aud in zip(*cand.entries(), cand.audience.tolist()):
+        allowed[d][s][p] = True
+        score[d][s][p] = aud
 
     def mzn_list(xs):
         return "[" + ", ".join(str(x) for x in xs) + "]"
@@ -60,7 +70,6 @@ def _write_dzn(pre: Precomputed, dzn_path: str) -> None:
     lines += [f"is_fr={mzn_list(is_fr)};"]
 
     # fixed_prog: D x S
-    fixed_rows = ["| " + ", ".join(str(fixed[d][s]) for s in range(S)) for d in range(D)]
     lines += ["fixed_prog = array2d(1..D,1..S,[ " + ", ".join(str(fixed[d][s]) for d in range(D) for s in range(S)) + " ]);"]
 
     # allowed: D x S x P
@@ -78,28 +87,188 @@ def _write_dzn(pre: Precomputed, dzn_path: str) -> None:
     Path(dzn_path).write_text("\n".join(lines), encoding="utf-8")
 
 
-def solve_minizinc(pre: Precomputed, model_path: str, workdir: str, timeout_s: int = 60) -> MznResult:
+def _dzn_array(f: IO[str], name: str, values, chunk: int = 1 << 16) -> None:
+    values = np.asarray(values, dtype=np.int64)
+    f.write(f"{name} = [")
+    for a in range(0, len(values), chunk):
+        if a:
+            f.write(",")
+        f.write(",".join(map(str, values[a:a + chunk].tolist())))
+    f.write("];\n")
+
+
+def _csr(groups: Iterable[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(start, idx) 1-based : les entrées du groupe k sont idx[start[k] .. start[k+1]-1]."""
+    groups = list(groups)
+    start = np.cumsum([1] + [len(g) for g in groups])
+    idx = np.concatenate([np.zeros(0, dtype=np.int64), *(np.asarray(g, dtype=np.int64) for g in groups)]) + 1
+    return start, idx
+
+
+def sparse_data(pre: Precomputed, targets: Targets = Targets()) -> Dict[str, Any]:
+    """Données de minizinc_sparse.mzn : entiers, ensembles et tableaux numpy (indices 1-based)."""
+    D = len(DAYS_FR)
+    S = pre.candidates.slots_per_day
+    H = -(-S // timeline(pre.slot_minutes).slots_per_hour)
+    G = max(pre.genre_id, default=0) + 1
+    cand = pre.candidates
+    idx = ModelIndex.build(pre)
+    empty = np.zeros(0, dtype=np.int64)
+    def per_prog(values) -> np.ndarray:
+        return np.asarray(values, dtype=np.int64)[idx.prog]
+
+    genre_names = {}
+    for p, g in enumerate(pre.genre_id):
+        genre_names.setdefault(g, pre.programs[p].genre)
+    fixed = [cand.find(d, s, p) for (d, s), p in sorted(pre.fixed_start.items())]
+    if min(fixed, default=0) < 0:
+        raise RuntimeError("Fixed start outside the candidates")
+    soc_mag = [
+        j for j in range(len(cand))
+        if targets.society_magazine and pre.programs[int(idx.prog[j])].genre == "Magazine"
+        and (pre.programs[int(idx.prog[j])].subgenre or "").lower() in SOCIETY_SUBGENRES
+    ]
+    bounds = targets.genres if targets.genres is not None else genre_bounds(targets.minutes)
+    quota_groups = [
+        np.concatenate([empty] + [v for g, v in idx.by_genre.items() if genre_names[g] in GENRE_GROUPS[group]])
+        for group in bounds
+    ]
+    # C.1 : clés 1-based des slots ayant des candidats, c1_start : positions dans c1_slot
+    nuit_start = timeline(pre.slot_minutes).night_start
+    c1 = [
+        np.array([d * S + s for s in range(nuit_start) if cand.span(d, s)[1] > cand.span(d, s)[0]], dtype=np.int64)
+        for d in range(D)
+    ]
+    series = [p for p in sorted(idx.by_prog) if pre.programs[p].genre in SERIES_GENRES]
+    episodes = [idx.by_prog[p] for p in series]
+    j_ad, coef, by_hour = ad_terms(pre, idx)
+    ad_groups = [by_hour.get(d * S + h, empty) for d in range(D) for h in range(H)]
+
+    data: Dict[str, Any] = {
+        "D": D, "S": S, "N": len(cand), "G": G, "H": H,
+        "weekly_budget": targets.budget, "total_minutes": targets.minutes,
+        "min_eu_percent": int(LEGAL_MIN_EURO_PERCENT * 100),
+        "min_fr_percent": int(LEGAL_MIN_FR_PERCENT * 100),
+        "min_indep_percent": int(LEGAL_MIN_INDEP_PERCENT * 100),
+        "cand_minutes": per_prog([int(p.duration_minutes) for p in pre.programs]),
+        "cand_cost": per_prog([int(p.cost) for p in pre.programs]),
+        "cand_profit": cand.profit.astype(np.int64),
+        "cand_eu": per_prog(pre.is_european),
+        "cand_fr": per_prog(pre.is_french),
+        "cand_indep": per_prog(pre.is_independent),
+        "cand_fiction": per_prog(pre.is_fiction),
+        "slot_start": cand.offsets + 1,
+        "fixed_idx": np.asarray(fixed, dtype=np.int64) + 1,
+        "min_genres_per_day": 4,
+        "doc_genres": {g + 1 for g, name in genre_names.items() if name == "Documentaire"},
+        "soc_mag_idx": np.asarray(soc_mag, dtype=np.int64) + 1,
+        "Q": len(bounds),
+        "q_lo": np.array([lo for lo, _ in bounds.values()], dtype=np.int64),
+        "q_hi": np.array([hi for _, hi in bounds.values()], dtype=np.int64),
+        "c1_slot": np.concatenate([empty, *c1]) + 1,
+        "c1_start": np.cumsum([1] + [len(c) for c in c1]),
+        "E": len(episodes),
+        "ep_limit": np.array([pre.copies(p) for p in series], dtype=np.int64),
+        "ad_coef": np.concatenate([empty, *(coef[pos] for pos in ad_groups)]),
+        "max_ad_milli_per_hour": MAX_AD_MIN_PER_HOUR * 1000,
+    }
+    for name, groups in (
+        ("cov", (idx.covers.get((d, t), empty) for d in range(D) for t in range(S))),
+        ("dg", (idx.by_day_genre.get((d, g), empty) for d in range(D) for g in range(G))),
+        ("q", quota_groups),
+        ("ep", episodes),
+        ("ad", (j_ad[pos] for pos in ad_groups)),
+    ):
+        data[f"{name}_start"], data[f"{name}_idx"] = _csr(groups)
+    return data
+
+
+def _write_dzn_data(data: Dict[str, Any], dzn_path: str) -> None:
+    # tableau par tableau, par morceaux : jamais de chaîne de la taille du fichier
+    with open(dzn_path, "w", encoding="utf-8") as f:
+        for name, value in data.items():
+            if isinstance(value, np.ndarray):
+                _dzn_array(f, name, value)
+            elif isinstance(value, (set, frozenset)):
+                f.write(f"{name} = {{" + ",".join(map(str, sorted(value))) + "};\n")
+            else:
+                f.write(f"{name} = {value};\n")
+
+
+def _write_dzn_sparse(pre: Precomputed, dzn_path: str, targets: Targets = Targets()) -> None:
+    _write_dzn_data(sparse_data(pre, targets), dzn_path)
+
+
+def available_backends(tags: List[str]) -> List[str]:
+    """Solveurs MiniZinc installés parmi tags (aucun si le binaire minizinc est absent)."""
+    if minizinc.default_driver is None:
+        return []
+    out = []
+    for tag in tags:
+        try:
+            minizinc.Solver.lookup(tag)
+        except LookupError:
+            continue
+        out.append(tag)
+    return out
+
+
+def solve_minizinc(
+    pre: Precomputed, model_path: str | None = None, workdir: str = "mzn_work", timeout_s: int = 60,
+    solver: str = "gecode", formulation: str = "dense", data_mode: str = "instance",
+    fzn_cache_dir: str | None = None, log: Callable[[str], None] = print,
+) -> MznResult:
+    """
+    formulation : "dense" ou "sparse" (MZN_MODELS) ; model_path remplace le modèle par défaut.
+    data_mode : données du modèle sparse passées via l'API Instance ("instance")
+    ou écrites en .dzn ("dzn") ; le modèle dense lit toujours un .dzn.
+    fzn_cache_dir : réutilise la FlatZinc compilée pour la même instance.
+    """
+    if formulation not in MZN_MODELS:
+        raise ValueError(f"Unknown MiniZinc formulation: {formulation}")
+    model_path = model_path or MZN_MODELS[formulation]
     work = Path(workdir)
     work.mkdir(parents=True, exist_ok=True)
-    dzn_path = str(work / "instance.dzn")
-    _write_dzn(pre, dzn_path)
-
-    mzn_model = minizinc.Model(model_path)
-    gecode = minizinc.Solver.lookup("gecode")  # ou "chuffed" si dispo
-    inst = minizinc.Instance(gecode, mzn_model)
-    inst.add_file(dzn_path)
+    dzn_path = work / "instance.dzn"
 
-    result = inst.solve(timeout=timedelta(seconds=timeout_s))
+    backend = minizinc.Solver.lookup(solver)  # gecode, chuffed, cp-sat...
+    inst = minizinc.Instance(backend, minizinc.Model(model_path))
+    if formulation == "sparse":
+        data = sparse_data(pre)
+        key_data = list(data.items())
+        if data_mode == "dzn":
+            _write_dzn_data(data, str(dzn_path))
+            inst.add_file(dzn_path, parse_data=False)
+        else:
+            for name, value in data.items():
+                inst[name] = value.tolist() if isinstance(value, np.ndarray) else value
+    else:
+        _write_dzn(pre, str(dzn_path))
+        key_data = [("dzn", dzn_path)]
+        # parse_data=False : MiniZinc lit le fichier, pas de re-parsing côté Python
+        inst.add_file(dzn_path, parse_data=False)
 
-    status = str(result.status)
-    objective = int(result["obj"]) if "obj" in result else 0
+    if fzn_cache_dir:
+        from .flatzinc_cache import cached_flatzinc, fzn_key, solve_flatzinc
+        entry = cached_flatzinc(inst, Path(fzn_cache_dir) / fzn_key(model_path, backend, key_data), log=log)
+        status, objective, values = solve_flatzinc(entry, backend, timeout_s)
+        x = values.get("x") if values else None
+    else:
+        result = inst.solve(timeout=timedelta(seconds=timeout_s))
+        status = str(result.status)
+        objective = int(result["obj"]) if "obj" in result else 0
+        x = result["x"] if "x" in result else None
 
-    # x est D x S x P bool
     starts: List[Tuple[int, int, int]] = []
-    if "x" in result:
-        x = result["x"]
+    if x is not None and formulation == "sparse":
+        # x est aligné sur les entrées de pre.candidates
+        chosen = np.flatnonzero(np.asarray(x, dtype=bool))
+        day, slot, prog = (np.asarray(a) for a in pre.candidates.entries())
+        starts = list(zip(day[chosen].tolist(), slot[chosen].tolist(), prog[chosen].tolist()))
+    elif x is not None:
+        # x est D x S x P bool
         for d in range(7):
-            for s in range(SLOTS_PER_DAY):
+            for s in range(pre.candidates.slots_per_day):
                 for p in range(len(pre.programs)):
                     if x[d][s][p]:
                         starts.append((d, s, p))
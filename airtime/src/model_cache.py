@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import ortools
+from ortools.sat.python import cp_model
+from ortools.sat.python import cp_model_helper
+
+from . import ortools_solver
+from .cache import catalog_digest, config_digest, evict, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_DAYS
+from .metrics import RunMetrics
+from .ortools_solver import ModelBuild, ModelIndex, build_model, model_stats
+from .preprocess import Precomputed
+
+
+# Cache disque du CpModel construit (semaine entière, Targets par défaut),
+# pour relancer la même instance avec d'autres --time-limit / --gap / --hint
+# sans repasser par build_model. Une entrée :
+# - model.pb.txt.gz : le proto au format texte (l'API Python d'OR-Tools ne
+#   relit pas le binaire)
+# - keys.npy : (d, s, p, indice de variable) de chaque x, aligné sur pre.candidates
+# - programs.json : id de chaque programme, pour relire un schedule.json en hint
+# Les hints et paramètres ne font pas partie du modèle sauvegardé.
+
+# À incrémenter si le contenu d'une entrée change
+MODEL_FORMAT = 1
+
+
+def model_key(pre: Precomputed, formulation: str) -> str:
+    """Empreinte de l'instance : candidats, catalogue, fixes, config, code du modèle."""
+    h = hashlib.sha256()
+    for part in (
+        str(MODEL_FORMAT), formulation, ortools.__version__,
+        catalog_digest(pre.programs), config_digest(),
+        repr(sorted(pre.fixed_start.items())),
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"|")
+    cand = pre.candidates
+    for arr in (cand.offsets, cand.prog, cand.audience, cand.profit):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    # toute modification de build_model invalide les entrées
+    h.update(Path(ortools_solver.__file__).read_bytes())
+    return h.hexdigest()[:32]
+
+
+def model_keys(built: ModelBuild) -> np.ndarray:
+    """(d, s, p, indice de variable) de chaque x, aligné sur pre.candidates."""
+    idx = built.index
+    var_index = np.array([v.Index() for v in built.xs], dtype=np.int64)
+    return np.stack([idx.day, idx.slot, idx.prog, var_index], axis=1)
+
+
+def save_model(entry: Path, built: ModelBuild, pre: Precomputed, formulation: str) -> None:
+    # même schéma que le cache des précalculs : répertoire temporaire puis renommage
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+    try:
+        built.model.ExportToFile(str(tmp / "model.pb.txt"))
+        with open(tmp / "model.pb.txt", "rb") as src, gzip.open(tmp / "model.pb.txt.gz", "wb", compresslevel=1) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(tmp / "model.pb.txt")
+        np.save(tmp / "keys.npy", model_keys(built))
+        ids = [p.id for p in pre.programs]
+        (tmp / "programs.json").write_text(json.dumps(ids, ensure_ascii=False), encoding="utf-8")
+        meta = {"format": MODEL_FORMAT, "formulation": formulation, "n_x": len(built.xs)}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_model(entry: Path) -> Optional[Tuple[cp_model.CpModel, np.ndarray, List[str]]]:
+    """(modèle, clés (d, s, p, indice), ids des programmes), ou None si l'entrée est absente/invalide."""
+    try:
+        meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format") != MODEL_FORMAT:
+            return None
+        keys = np.load(entry / "keys.npy")
+        ids = json.loads((entry / "programs.json").read_text(encoding="utf-8"))
+        with gzip.open(entry / "model.pb.txt.gz", "rt", encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, ValueError):
+        return None
+    proto = cp_model_helper.CpModelProto()
+    if not proto.parse_text_format(text):
+        return None
+    os.utime(entry)  # date d'accès pour l'éviction LRU
+    return cp_model.CpModel(proto), keys, ids
+
+
+def as_build(model: cp_model.CpModel, keys: np.ndarray, index: Optional[ModelIndex] = None) -> ModelBuild:
+    xs = [model.GetBoolVarFromProtoIndex(i) for i in keys[:, 3].tolist()]
+    x = dict(zip(zip(keys[:, 0].tolist(), keys[:, 1].tolist(), keys[:, 2].tolist()), xs))
+    return ModelBuild(model=model, xs=xs, x=x, index=index)
+
+
+def to_payload(built: ModelBuild) -> Tuple[str, np.ndarray]:
+    """ModelBuild picklable (un CpModel ne l'est pas) : proto au format texte et clés."""
+    return str(built.model.Proto()), model_keys(built)
+
+
+def from_payload(payload: Tuple[str, np.ndarray]) -> ModelBuild:
+    """ModelBuild de to_payload, sans index."""
+    text, keys = payload
+    proto = cp_model_helper.CpModelProto()
+    if not proto.parse_text_format(text):
+        raise ValueError("Invalid CpModel payload")
+    return as_build(cp_model.CpModel(proto), keys)
+
+
+def cached_model(
+    pre: Precomputed,
+    formulation: str,
+    cache_dir: str,
+    log: Callable[[str], None] = print,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    metrics: Optional[RunMetrics] = None,
+) -> ModelBuild:
+    """build_model(pre, formulation) avec cache disque, clé model_key."""
+    t = time.perf_counter()
+    entry = Path(cache_dir) / model_key(pre, formulation)
+    loaded = load_model(entry)
+    if loaded is not None:
+        model, keys, _ = loaded
+        log(f"    Model loaded from {entry}")
+        built = as_build(model, keys, ModelIndex.build(pre, with_covers=False))
+        if metrics is not None:
+            metrics.add_phase("model_cache.load", time.perf_counter() - t)
+            metrics.set("model", formulation=formulation, cached=True, **model_stats(built, pre))
+        return built
+
+    built = build_model(pre, formulation=formulation, log=log, metrics=metrics)
+    save_model(entry, built, pre, formulation)
+    evict(cache_dir, max_bytes=max_bytes, max_age_days=max_age_days)
+    return built
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+import time as _time
+from datetime import date
+from typing import Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import SLOT_MINUTES
+from .greedy import _Rules, _repair, greedy_restarts
+from .loader import Program
+from .metrics import RunMetrics
+from .ortools_solver import SolveResult, build_model, solve_built
+from .preprocess import Precomputed, build_precomputed
+
+
+# Résolution grossière puis fine. Phase 1 : le même modèle CP-SAT sur une
+# grille de coarse_minutes (durées de duration_slots arrondies, environ
+# 3 fois moins de slots et de candidats à 15 min). Phase 2 : sur la grille
+# de base, seules restent les entrées qui partent à au plus `radius` slots
+# d'un départ grossier ; la grille grossière y est projetée (DP par jour
+# favorisant ses programmes, puis réparation gloutonne) et sert de hint.
+# La borne de la phase 2 ne vaut que pour les fenêtres : best_bound = 0,
+# comme pour LNS. Si la phase 2 ne trouve rien, le modèle complet repart
+# du meilleur hint ; à défaut, ce hint (s'il est faisable) est le résultat.
+
+COARSE_MINUTES = 15
+
+
+def coarse_precomputed(
+    programs: List[Program], week_start: date, pre: Precomputed,
+    slot_minutes: int = COARSE_MINUTES, engine: str = "numpy",
+) -> Precomputed:
+    """Semaine de pre recalculée sur la grille grossière, regroupée comme pre."""
+    coarse = build_precomputed(programs, week_start, engine=engine, slot_minutes=slot_minutes)
+    if pre.members:
+        from .aggregate import aggregate
+        coarse = aggregate(coarse)
+    return coarse
+
+
+def window_candidates(pre: Precomputed, starts: List[Tuple[int, int, int]], factor: int, radius: int) -> Precomputed:
+    """pre réduit aux entrées qui partent à au plus radius slots d'un départ grossier (plus les départs fixes)."""
+    cand = pre.candidates
+    S = cand.slots_per_day
+    near = np.zeros(cand.n_days * S, dtype=bool)
+    for d, c, _ in starts:
+        s = c * factor
+        near[d * S + max(0, s - radius):d * S + min(S, s + radius + 1)] = True
+    for d, s in pre.fixed_start:
+        near[d * S + s] = True
+    return dataclasses.replace(pre, candidates=cand.select(near[cand.slot_keys()]))
+
+
+def project(
+    rules: _Rules, starts: List[Tuple[int, int, int]], factor: int, radius: int,
+) -> Optional[List[List[int]]]:
+    """
+    Pavages fins de chaque jour au plus près de la grille grossière : une
+    entrée reçoit un bonus (qui l'emporte sur tout profit) si son programme
+    part ce jour-là à moins de radius slots de son départ grossier. None si
+    un jour n'a aucun pavage.
+    """
+    idx, S, P = rules.idx, rules.S, len(rules.pre.programs)
+    rep = rules.pre.representative()
+    coarse = np.array([(d * S + c * factor) * P + rep.get(p, p) for d, c, p in starts], dtype=np.int64)
+    near = np.zeros(rules.n, dtype=bool)
+    for o in range(-radius, radius + 1):
+        near |= np.isin((idx.day * S + idx.slot + o) * P + idx.prog, coarse)
+    profit = rules.profit.astype(np.float64)
+    bonus = (np.abs(profit).max(initial=0.0) + 1.0) * S
+    _, days = rules.dp.week(profit + bonus * near)
+    return None if any(day is None for day in days) else days
+
+
+def solve_multires(
+    pre: Precomputed,
+    programs: List[Program],
+    week_start: date,
+    time_limit_s: float = 600,
+    coarse_minutes: int = COARSE_MINUTES,
+    radius: Optional[int] = None,
+    coarse_share: float = 0.5,
+    gap: float = 0.0,
+    formulation: str = "coverage",
+    workers: int = 8,
+    engine: str = "numpy",
+    seed: int = 0,
+    log: Callable[[str], None] = print,
+    metrics: Optional[RunMetrics] = None,
+) -> SolveResult:
+    """
+    programs, week_start : ceux de pre, pour recalculer la semaine sur la
+    grille grossière. radius : demi-largeur des fenêtres de la phase 2, en
+    slots de base (défaut : un slot grossier). coarse_share : part de
+    time_limit_s donnée à la phase 1.
+    """
+    t0 = _time.perf_counter()
+    deadline = t0 + time_limit_s
+    def _elapsed(): return f"{_time.perf_counter() - t0:.1f}s"
+    def _remaining(): return max(0.0, deadline - _time.perf_counter())
+    quiet = lambda msg: None
+    factor = coarse_minutes // SLOT_MINUTES
+    radius = factor if radius is None else radius
+    hint_s = max(1.0, 0.05 * time_limit_s)   # grilles gloutonnes et réparation, par phase
+
+    # ---- phase 1 : grille grossière ----
+    t = _time.perf_counter()
+    coarse = coarse_precomputed(programs, week_start, pre, coarse_minutes, engine)
+    built = build_model(coarse, formulation=formulation, log=quiet)
+    greedy = greedy_restarts(coarse, hint_s, seed)
+    hints = set(greedy.starts) if greedy is not None else None
+    res = solve_built(built, max(1.0, coarse_share * time_limit_s - (_time.perf_counter() - t)), gap=gap, workers=workers, hints=hints)
+    if metrics is not None:
+        metrics.add_phase("multires.coarse", _time.perf_counter() - t)
+        metrics.set("multires", coarse_minutes=coarse_minutes, coarse_candidates=len(coarse.candidates), coarse_objective=res.objective)
+    log(f"    [{_elapsed()}] Coarse {coarse_minutes} min: {res.status} objective={res.objective} "
+        f"({len(coarse.candidates)} entries)")
+
+    # ---- phase 2 : fenêtres de la grille de base ----
+    t = _time.perf_counter()
+    fallback: Optional[SolveResult] = None   # grille fine faisable connue, hint de CP-SAT
+    window = pre
+    if res.starts:
+        window = window_candidates(pre, res.starts, factor, radius)
+        rules = _Rules(window)
+        days = project(rules, res.starts, factor, radius)
+        if days is None:
+            log(f"    [{_elapsed()}] Coarse schedule does not fit the windows, full fine model")
+            window = pre
+        else:
+            days, _ = _repair(rules, days, random.Random(seed), min(deadline, _time.perf_counter() + hint_s), 0.1)
+            chosen = np.array(sorted(j for day in days for j in day), dtype=np.int64)
+            if not rules.violations(chosen):
+                idx = rules.idx
+                starts = sorted(zip(idx.day[chosen].tolist(), idx.slot[chosen].tolist(), idx.prog[chosen].tolist()))
+                fallback = SolveResult("FEASIBLE", int(rules.profit[chosen].sum()), 0, starts)
+                log(f"    [{_elapsed()}] Projected hint: objective={fallback.objective}")
+    if fallback is None:
+        fallback = greedy_restarts(window, hint_s, seed)
+    fine_hint: Optional[Set[Tuple[int, int, int]]] = set(fallback.starts) if fallback is not None else None
+    built = build_model(window, formulation=formulation, log=quiet)
+    best = solve_built(built, _remaining(), gap=gap, workers=workers, hints=fine_hint)
+    if metrics is not None:
+        metrics.add_phase("multires.fine", _time.perf_counter() - t)
+        metrics.set("multires", fine_candidates=len(window.candidates))
+    log(f"    [{_elapsed()}] Fine windows (±{radius} slots): {best.status} objective={best.objective} "
+        f"({len(window.candidates)} entries)")
+    if window is not pre:
+        if best.starts:
+            return dataclasses.replace(best, status="FEASIBLE", best_bound=0)
+        if _remaining() > 1.0:
+            # fenêtres trop étroites : modèle complet, depuis le meilleur hint
+            best = solve_built(
+                build_model(pre, formulation=formulation, log=quiet), _remaining(), gap=gap, workers=workers, hints=fine_hint,
+            )
+            log(f"    [{_elapsed()}] Full fine model: {best.status} objective={best.objective}")
+    if not best.starts and fallback is not None:
+        return fallback
+    return best
@@ -1,19 +1,46 @@
 from __future__ import annotations
 
+import time as _time
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
 from ortools.sat.python import cp_model
 
 from .config import (
-    DAYS_FR, SLOTS_PER_DAY, SLOT_MINUTES,
+    DAYS_FR,
     TOTAL_WEEKLY_BUDGET,
     LEGAL_MIN_EURO_PERCENT, LEGAL_MIN_FR_PERCENT, LEGAL_MIN_INDEP_PERCENT,
     GENRE_GROUPS, GENRE_QUOTAS_WEEK,
     MAX_AD_MIN_PER_HOUR,
 )
-from .preprocess import Precomputed
-from .timeutils import slot_index_from_time
+from .metrics import RunMetrics, TimelineCallback
+from .preprocess import Precomputed, SOCIETY_SUBGENRES
+from .timeline import timeline
+
+
+# "coverage" : une égalité par (jour, slot) sur l'index covers (défaut)
+# "intervals" : intervalles optionnels + NoOverlap + durée totale par jour
+FORMULATIONS = ("coverage", "intervals")
+
+SERIES_GENRES = {"Série", "Series", "Séries"}
+
+
+def genre_bounds(total_minutes: int) -> Dict[str, Tuple[int, int]]:
+    """Bornes (min, max) de GENRE_QUOTAS_WEEK, en centièmes de minute."""
+    return {
+        group: (int(mn * 100) * total_minutes, int(mx * 100) * total_minutes)
+        for group, (mn, mx) in GENRE_QUOTAS_WEEK.items()
+    }
+
+
+@dataclass(frozen=True)
+class Targets:
+    """Seuils des contraintes hebdomadaires (par défaut : la semaine entière)."""
+    budget: int = TOTAL_WEEKLY_BUDGET
+    minutes: int = 7 * 20 * 60       # temps d'antenne servant de base aux quotas légaux
+    genres: Optional[Dict[str, Tuple[int, int]]] = None  # None : genre_bounds(minutes)
+    society_magazine: bool = True    # exiger le magazine de société
 
 
 @dataclass
@@ -24,86 +51,216 @@ class SolveResult:
     starts: List[Tuple[int, int, int]]  # (day, start_slot, prog_idx)
 
 
-def solve_ortools(
+def _group(keys: np.ndarray) -> Dict[int, np.ndarray]:
+    """clé -> positions (croissantes) des éléments de keys ayant cette clé."""
+    if not len(keys):
+        return {}
+    order = np.argsort(keys, kind="stable")
+    k = keys[order]
+    start = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    return dict(zip(k[start].tolist(), np.split(order, start[1:])))
+
+
+def _spread(start: np.ndarray, length: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(élément, start + k) pour k dans [0, length) : intervalles mis à plat."""
+    owner = np.repeat(np.arange(len(start)), length)
+    first = np.repeat(np.cumsum(length) - length, length)
+    return owner, np.repeat(start, length) + np.arange(len(owner)) - first
+
+
+@dataclass
+class ModelIndex:
+    """
+    Index sur les entrées de pre.candidates (positions CSR), construits une
+    seule fois : chaque famille de contraintes lit son groupe au lieu de
+    parcourir toutes les variables x.
+    """
+    day: np.ndarray                               # jour de chaque entrée
+    slot: np.ndarray                              # slot de départ
+    prog: np.ndarray                              # programme
+    by_prog: Dict[int, np.ndarray]
+    by_genre: Dict[int, np.ndarray]
+    by_day_genre: Dict[Tuple[int, int], np.ndarray]
+    covers: Dict[Tuple[int, int], np.ndarray]     # (d, t) -> entrées dont le programme couvre t
+    n_covers: int
+    length: np.ndarray                            # slots occupés (durée tronquée en fin de journée)
+
+    @classmethod
+    def build(cls, pre: Precomputed, with_covers: bool = True) -> "ModelIndex":
+        cand = pre.candidates
+        S = cand.slots_per_day
+        key = cand.slot_keys()
+        day, slot = key // S, key % S
+        prog = cand.prog.astype(np.int64)
+        genre = np.asarray(pre.genre_id, dtype=np.int64)[prog]
+        G = max(pre.genre_id, default=0) + 1
+
+        # couverture : l'entrée (d, s, p) couvre [s, min(s + L, S))
+        dur = np.asarray(pre.duration_slots, dtype=np.int64)[prog]
+        length = np.minimum(slot + dur, S) - slot
+        covers: Dict[int, np.ndarray] = {}
+        owner = np.zeros(0, dtype=np.int64)
+        if with_covers:
+            owner, t = _spread(slot, length)
+            covers = _group(day[owner] * S + t)
+        return cls(
+            day=day,
+            slot=slot,
+            prog=prog,
+            by_prog=_group(prog),
+            by_genre=_group(genre),
+            by_day_genre={divmod(k, G): v for k, v in _group(day * G + genre).items()},
+            covers={divmod(k, S): owner[v] for k, v in covers.items()},
+            n_covers=len(owner),
+            length=length,
+        )
+
+
+def ad_terms(pre: Precomputed, idx: ModelIndex) -> Tuple[np.ndarray, np.ndarray, Dict[int, np.ndarray]]:
+    """
+    Termes des contraintes de pub horaires (C.12) : entrée, coefficient
+    (taux × slots de l'entrée dans l'heure) et positions groupées par
+    d * slots_per_day + heure.
+    """
+    slots_per_hour = timeline(pre.slot_minutes).slots_per_hour
+    rate = np.array([int(r * pre.slot_minutes) for r in pre.ad_rate_milli], dtype=np.int64)[idx.prog]
+    end = idx.slot + idx.length
+    with_ads = np.flatnonzero((rate != 0) & (end > idx.slot))
+    h0 = idx.slot[with_ads] // slots_per_hour
+    h1 = (end[with_ads] - 1) // slots_per_hour
+    owner, hour = _spread(h0, h1 - h0 + 1)
+    j_ad = with_ads[owner]
+    overlap = (
+        np.minimum(end[j_ad], (hour + 1) * slots_per_hour)
+        - np.maximum(idx.slot[j_ad], hour * slots_per_hour)
+    )
+    return j_ad, rate[j_ad] * overlap, _group(idx.day[j_ad] * pre.candidates.slots_per_day + hour)
+
+
+def _weighted(xs: Sequence[cp_model.IntVar], coeffs: np.ndarray) -> cp_model.LinearExpr:
+    """Somme pondérée sur les entrées de coefficient non nul."""
+    nz = np.flatnonzero(coeffs)
+    return cp_model.LinearExpr.WeightedSum([xs[j] for j in nz.tolist()], coeffs[nz].tolist())
+
+
+def _sum(xs: Sequence[cp_model.IntVar], idx: np.ndarray) -> cp_model.LinearExpr:
+    return cp_model.LinearExpr.Sum([xs[j] for j in idx.tolist()])
+
+
+@dataclass
+class ModelBuild:
+    model: cp_model.CpModel
+    xs: List[cp_model.IntVar]                         # aligné sur pre.candidates
+    x: Dict[Tuple[int, int, int], cp_model.IntVar]    # (d, s, p) -> x
+    index: Optional[ModelIndex]                       # None : modèle rechargé sans Precomputed (replay)
+
+
+def build_model(
     pre: Precomputed,
-    time_limit_s: int = 900,
-    hint_file: str | None = None,
-    gap: float = 0.0,
-) -> SolveResult:
+    formulation: str = "coverage",
+    days: Optional[Iterable[int]] = None,
+    targets: Targets = Targets(),
+    log: Callable[[str], None] = print,
+    metrics: Optional[RunMetrics] = None,
+) -> ModelBuild:
+    """
+    days : jours modélisés (par défaut toute la semaine) ; pre.candidates ne
+    doit contenir que des entrées de ces jours. targets : seuils des
+    contraintes hebdomadaires, à réduire pour un sous-problème. metrics :
+    durée de chaque famille de contraintes (phases build.*).
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Unknown formulation: {formulation}")
     model = cp_model.CpModel()
-    D = 7
-    S = SLOTS_PER_DAY
+    D = len(DAYS_FR)
+    S = pre.candidates.slots_per_day
     P = len(pre.programs)
+    days = list(range(D)) if days is None else sorted(days)
 
-    import time as _time
     _t0 = _time.perf_counter()
-    def _elapsed(): return f"{_time.perf_counter()-_t0:.1f}s"
+    lap = metrics.laps("build") if metrics is not None else None
+    def _log(msg, phase=None):
+        log(f"    [{_time.perf_counter()-_t0:.1f}s] {msg}")
+        if lap is not None and phase:
+            lap(phase)
 
     # start variables x[d,s,p]
-    x: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
-    for (d, s), plist in pre.allowed_starts.items():
-        for p in plist:
-            x[(d, s, p)] = model.NewBoolVar(f"x_{d}_{s}_{p}")
-    print(f"    [{_elapsed()}] {len(x)} x-variables created", flush=True)
-
-    # Precompute covers[d,t] = list of (d,s,p) keys whose programme spans slot t
-    covers: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
-    for (d, s, p) in x:
-        L = pre.duration_slots[p]
-        for t in range(s, min(s + L, S)):
-            covers.setdefault((d, t), []).append((d, s, p))
-    print(f"    [{_elapsed()}] covers index built ({sum(len(v) for v in covers.values())} entries)", flush=True)
+    # (ordre des entrées CSR : xs[j] correspond à l'entrée j de pre.candidates)
+    cand = pre.candidates
+    idx = ModelIndex.build(pre, with_covers=(formulation == "coverage"))
+    keys = list(zip(idx.day.tolist(), idx.slot.tolist(), idx.prog.tolist()))
+    xs = [model.NewBoolVar(f"x_{d}_{s}_{p}") for d, s, p in keys]
+    x = dict(zip(keys, xs))
+    _log(f"{len(xs)} x-variables created", "x_vars")
+    if formulation == "coverage":
+        _log(f"covers index built ({idx.n_covers} entries)")
+
+    # coefficients par programme, projetés sur les entrées
+    minutes = np.array([int(p.duration_minutes) for p in pre.programs], dtype=np.int64)
+    cost = np.array([int(p.cost) for p in pre.programs], dtype=np.int64)
+    entry_minutes = minutes[idx.prog]
 
     # helper: start_indicator y[d,s] = 1 if some program starts at slot s
-    y: Dict[Tuple[int, int], cp_model.IntVar] = {}
-    for d in range(D):
+    for d in days:
         for s in range(S):
-            vars_here = [x[(d, s, p)] for p in pre.allowed_starts.get((d, s), []) if (d, s, p) in x]
-            y[(d, s)] = model.NewBoolVar(f"y_{d}_{s}")
-            if vars_here:
-                model.Add(sum(vars_here) == y[(d, s)])
+            a, b = cand.span(d, s)
+            y = model.NewBoolVar(f"y_{d}_{s}")
+            if b > a:
+                model.Add(cp_model.LinearExpr.Sum(xs[a:b]) == y)
             else:
-                model.Add(y[(d, s)] == 0)
-
-    print(f"    [{_elapsed()}] y-variables done", flush=True)
-
-    # Coverage exact: each slot covered by exactly 1 started interval
-    for d in range(D):
-        for t in range(S):
-            cover_terms = [x[key] for key in covers.get((d, t), [])]
-            model.Add(sum(cover_terms) == 1)
-
-    print(f"    [{_elapsed()}] Coverage constraints done", flush=True)
+                model.Add(y == 0)
+
+    _log("y-variables done", "y_vars")
+
+    empty = np.zeros(0, dtype=np.int64)
+    if formulation == "coverage":
+        # Coverage exact: each slot covered by exactly 1 started interval
+        for d in days:
+            for t in range(S):
+                model.Add(_sum(xs, idx.covers.get((d, t), empty)) == 1)
+    else:
+        # Intervalles optionnels sans chevauchement dont la durée totale vaut
+        # la journée : chaque slot est alors couvert exactement une fois.
+        for d in days:
+            a, b = int(cand.offsets[d * S]), int(cand.offsets[(d + 1) * S])
+            intervals = [
+                model.NewOptionalFixedSizeIntervalVar(s, L, xs[j], f"iv_{d}_{s}_{j}")
+                for j, s, L in zip(range(a, b), idx.slot[a:b].tolist(), idx.length[a:b].tolist())
+            ]
+            model.AddNoOverlap(intervals)
+            model.Add(cp_model.LinearExpr.WeightedSum(xs[a:b], idx.length[a:b].tolist()) == S)
+
+    _log(f"Coverage constraints done ({formulation})", "coverage")
 
     # Fixes (JT+Meteo blocs inclus dans pre.fixed_start)
     for (d, s), pfix in pre.fixed_start.items():
+        if d not in days:
+            continue
         if (d, s, pfix) not in x:
             raise RuntimeError(f"Fix impossible: {pre.programs[pfix].id} at {d},{s}")
         model.Add(x[(d, s, pfix)] == 1)
 
     # Budget hebdo
-    model.Add(
-        sum(int(pre.programs[p].cost) * var for (d, s, p), var in x.items()) <= TOTAL_WEEKLY_BUDGET
-    )
+    model.Add(_weighted(xs, cost[idx.prog]) <= targets.budget)
 
-    print(f"    [{_elapsed()}] Fixes done", flush=True)
+    _log("Fixes done", "fixes_budget")
 
     # Quotas EU/FR/Indep (C.11)
-    total_minutes = 7 * 20 * 60
-    eu = sum(int(pre.programs[p].duration_minutes) * int(pre.is_european[p]) * var for (d, s, p), var in x.items())
-    fr = sum(int(pre.programs[p].duration_minutes) * int(pre.is_french[p]) * var for (d, s, p), var in x.items())
-    indep = sum(int(pre.programs[p].duration_minutes) * int(pre.is_independent[p]) * var for (d, s, p), var in x.items())
-
-    model.Add(eu * 100 >= int(LEGAL_MIN_EURO_PERCENT * 100) * total_minutes)
-    model.Add(fr * 100 >= int(LEGAL_MIN_FR_PERCENT * 100) * total_minutes)
-    model.Add(indep * 100 >= int(LEGAL_MIN_INDEP_PERCENT * 100) * total_minutes)
+    total_minutes = targets.minutes
+    for flags, pct in (
+        (pre.is_european, LEGAL_MIN_EURO_PERCENT),
+        (pre.is_french, LEGAL_MIN_FR_PERCENT),
+        (pre.is_independent, LEGAL_MIN_INDEP_PERCENT),
+    ):
+        share = _weighted(xs, entry_minutes * np.asarray(flags, dtype=np.int64)[idx.prog])
+        model.Add(share * 100 >= int(pct * 100) * total_minutes)
 
-    print(f"    [{_elapsed()}] Quotas EU/FR/Indep done", flush=True)
+    _log("Quotas EU/FR/Indep done", "legal_quotas")
 
     # Identité de chaîne : au moins 30% FR (C.1) – redondant avec 40% légal, mais on garde si tu veux
     # -> déjà couvert par 40% FR légal. Si tu veux 30% seulement, supprime la contrainte 40% FR.
 
-    print(f"    [{_elapsed()}] About to build C.2 variété", flush=True)
+    _log("About to build C.2 variété")
 
     # ------------------------------------------------------------
     # C.2 Variété quotidienne
@@ -113,63 +270,59 @@ def solve_ortools(
     # ------------------------------------------------------------
     genres = sorted(set(pre.genre_id))
     G = len(genres)
+    genre_names: Dict[int, str] = {}
+    for p in range(P):
+        genre_names.setdefault(pre.genre_id[p], pre.programs[p].genre)
 
     # genre_present[d,g]
     genre_present: Dict[Tuple[int, int], cp_model.IntVar] = {}
-    for d in range(D):
+    for d in days:
         for g in range(G):
             genre_present[(d, g)] = model.NewBoolVar(f"gp_{d}_{g}")
-            starts_of_g = []
-            for s in range(S):
-                for p in pre.allowed_starts.get((d, s), []):
-                    if pre.genre_id[p] == g and (d, s, p) in x:
-                        starts_of_g.append(x[(d, s, p)])
-            if starts_of_g:
-                model.AddMaxEquality(genre_present[(d, g)], starts_of_g)
+            starts_of_g = idx.by_day_genre.get((d, g), empty)
+            if len(starts_of_g):
+                model.AddMaxEquality(genre_present[(d, g)], [xs[j] for j in starts_of_g.tolist()])
             else:
                 model.Add(genre_present[(d, g)] == 0)
         model.Add(sum(genre_present[(d, g)] for g in range(G)) >= 4)
 
     # 1 documentaire/jour
-    for d in range(D):
-        doc_starts = []
-        for s in range(S):
-            for p in pre.allowed_starts.get((d, s), []):
-                if pre.programs[p].genre == "Documentaire" and (d, s, p) in x:
-                    doc_starts.append(x[(d, s, p)])
-        model.Add(sum(doc_starts) >= 1)
+    doc_genres = [g for g, name in genre_names.items() if name == "Documentaire"]
+    for d in days:
+        doc_starts = [idx.by_day_genre.get((d, g), empty) for g in doc_genres]
+        model.Add(_sum(xs, np.concatenate([empty, *doc_starts])) >= 1)
 
     # 1 magazine de société / semaine
-    soc_mag = []
-    for (d, s, p), var in x.items():
-        if pre.programs[p].genre == "Magazine" and (pre.programs[p].subgenre or "").lower() in {"societe", "société", "magazine de société"}:
-            soc_mag.append(var)
-    if soc_mag:
-        model.Add(sum(soc_mag) >= 1)
+    soc_mag = [
+        j
+        for g, name in genre_names.items() if name == "Magazine"
+        for j in idx.by_genre.get(g, empty).tolist()
+        if (pre.programs[int(idx.prog[j])].subgenre or "").lower() in SOCIETY_SUBGENRES
+    ]
+    if soc_mag and targets.society_magazine:
+        model.Add(cp_model.LinearExpr.Sum([xs[j] for j in soc_mag]) >= 1)
 
-    print(f"    [{_elapsed()}] C.2 done (genre variety / doc / magazine)", flush=True)
+    _log("C.2 done (genre variety / doc / magazine)", "C2_variety")
 
     # ------------------------------------------------------------
     # C.4 Quotas de genres hebdo (temps)
     # ------------------------------------------------------------
-    for group, (mn, mx) in GENRE_QUOTAS_WEEK.items():
+    bounds = targets.genres if targets.genres is not None else genre_bounds(total_minutes)
+    for group, (lo, hi) in bounds.items():
         genres_in = GENRE_GROUPS[group]
-        minutes_in_group = sum(
-            int(pre.programs[p].duration_minutes) * var
-            for (d, s, p), var in x.items()
-            if pre.programs[p].genre in genres_in
-        )
-        model.Add(minutes_in_group * 100 >= int(mn * 100) * total_minutes)
-        model.Add(minutes_in_group * 100 <= int(mx * 100) * total_minutes)
+        in_group = np.array([int(genre_names.get(g) in genres_in) for g in range(G)], dtype=np.int64)
+        minutes_in_group = _weighted(xs, entry_minutes * in_group[np.asarray(pre.genre_id)[idx.prog]])
+        model.Add(minutes_in_group * 100 >= lo)
+        model.Add(minutes_in_group * 100 <= hi)
 
-    print(f"    [{_elapsed()}] C.4 genre quotas done", flush=True)
+    _log("C.4 genre quotas done", "C4_genre_quotas")
 
     # ------------------------------------------------------------
     # C.3 Habitudes: séries récurrentes au même horaire
     # -> déjà filtré en preprocess via usual_time/usual_day
     # ------------------------------------------------------------
 
-    print(f"    [{_elapsed()}] C.3 done", flush=True)
+    _log("C.3 done")
 
     # ------------------------------------------------------------
     # C.1 Cohérence de grille
@@ -187,30 +340,32 @@ def solve_ortools(
 
     # 1. Build fic_at[d,s] auxiliary variables (BoolVar ou constante)
     fic_at: Dict[Tuple[int, int], object] = {}   # BoolVar, True, or False
-    for (d, s), plist in pre.allowed_starts.items():
-        progs_in_x = [p for p in plist if (d, s, p) in x]
-        if not progs_in_x:
-            continue
-        fic_progs  = [p for p in progs_in_x if pre.is_fiction[p]]
-        nfic_progs = [p for p in progs_in_x if not pre.is_fiction[p]]
-
-        if fic_progs and nfic_progs:
-            fv = model.NewBoolVar(f"fic_{d}_{s}")
-            fic_at[(d, s)] = fv
-            for p in fic_progs:
-                model.AddImplication(x[(d, s, p)], fv)
-            for p in nfic_progs:
-                model.AddImplication(x[(d, s, p)], fv.Not())
-        elif fic_progs:
-            fic_at[(d, s)] = True      # only fiction can start here
-        else:
-            fic_at[(d, s)] = False     # only non-fiction can start here
+    entry_fic = np.asarray(pre.is_fiction, dtype=bool)[idx.prog].tolist()
+    for d in days:
+        for s in range(S):
+            a, b = cand.span(d, s)
+            if a == b:
+                continue
+            fic_js = [j for j in range(a, b) if entry_fic[j]]
+            nfic_js = [j for j in range(a, b) if not entry_fic[j]]
+
+            if fic_js and nfic_js:
+                fv = model.NewBoolVar(f"fic_{d}_{s}")
+                fic_at[(d, s)] = fv
+                for j in fic_js:
+                    model.AddImplication(xs[j], fv)
+                for j in nfic_js:
+                    model.AddImplication(xs[j], fv.Not())
+            elif fic_js:
+                fic_at[(d, s)] = True      # only fiction can start here
+            else:
+                fic_at[(d, s)] = False     # only non-fiction can start here
 
     # 2. No 4 consecutive same fiction type (fenêtre glissante sur start-slots)
     # On applique uniquement sur la plage 06:00-00:30 (hors Nuit profonde) car
     # le catalogue ne propose que des Jeunesse (fiction) en 01:30-02:00, ce qui
     # rendrait la contrainte infaisable pour cette tranche horaire.
-    nuit_start = slot_index_from_time("00:30")  # slot 222 (228 min from 06:00)
+    nuit_start = timeline(pre.slot_minutes).night_start  # slot 222 à 5 min (1110 min après 06:00)
 
     def _fic_to_expr(v):
         """Convert fic_at value (True/False/BoolVar) to a CP-SAT linear expression."""
@@ -221,56 +376,49 @@ def solve_ortools(
         return v  # BoolVar
 
     n_c1 = 0
-    for d in range(D):
-        # Trier les start-slots du jour (hors Nuit profonde)
-        day_slots = sorted(s for (dd, s) in fic_at if dd == d and s < nuit_start)
+    for d in days:
+        # start-slots du jour (hors Nuit profonde), dans l'ordre
+        day_slots = [s for s in range(min(nuit_start, S)) if (d, s) in fic_at]
         for i in range(len(day_slots) - 3):
-            window_vals = [fic_at.get((d, day_slots[i + k])) for k in range(4)]
-            if any(v is None for v in window_vals):
-                continue
-            w = [_fic_to_expr(v) for v in window_vals]
+            w = [_fic_to_expr(fic_at[(d, day_slots[i + k])]) for k in range(4)]
             # Not all 4 fiction: sum(w) <= 3
             model.Add(sum(w) <= 3)
             # Not all 4 non-fiction: sum(w) >= 1
             model.Add(sum(w) >= 1)
             n_c1 += 2
 
-    print(f"    [{_elapsed()}] C.1 no-4-consecutive-same-fiction-type done ({n_c1} constraints)", flush=True)
+    _log(f"C.1 no-4-consecutive-same-fiction-type done ({n_c1} constraints)", "C1_fiction_alternation")
 
     # ------------------------------------------------------------
     # C.6 Fréquence
     # - séries : 1 épisode / semaine max
-    # -> on applique par "id" (un épisode = un programme)
+    # -> on applique par "id" (un épisode = un programme), ou par classe
+    # d'épisodes interchangeables (src/aggregate.py) : pre.copies(p) au plus
     # Si tu as un champ "season/series_id", on regroupe.
     # ------------------------------------------------------------
-    for p in range(P):
-        if pre.programs[p].genre in {"Série", "Series", "Séries"}:
-            occ = [var for (d, s, pp), var in x.items() if pp == p]
-            model.Add(sum(occ) <= 1)
+    for p, occ in idx.by_prog.items():
+        if pre.programs[p].genre in SERIES_GENRES:
+            model.Add(_sum(xs, occ) <= pre.copies(p))
 
-    print(f"    [{_elapsed()}] C.6 frequency done", flush=True)
+    _log("C.6 frequency done", "C6_frequency")
 
     # ------------------------------------------------------------
     # C.12 Publicité (approx):
     # - max 12 min de pub / heure
     # On calcule une audience/pub “répartie” par minute via ad_rate_milli[p].
-    # Pour chaque heure (fenêtre de 60 min = 12 slots de 5 min):
+    # Pour chaque heure (fenêtre de 60 min = 12 slots de 5 min sur la grille de base):
     # sum(ad_minutes_in_window) <= 12
+    # Coefficient d'une entrée = taux × nombre de ses slots dans l'heure.
     # ------------------------------------------------------------
-    slots_per_hour = 60 // SLOT_MINUTES  # 12
-    for d in range(D):
-        for hstart in range(0, S, slots_per_hour):
-            hend = min(S, hstart + slots_per_hour)
-            terms = []
-            for t in range(hstart, hend):
-                for key in covers.get((d, t), []):
-                    _, s, p = key
-                    rate = int(pre.ad_rate_milli[p] * SLOT_MINUTES)
-                    if rate:
-                        terms.append(rate * x[key])
-            model.Add(sum(terms) <= MAX_AD_MIN_PER_HOUR * 1000)
-
-    print(f"    [{_elapsed()}] C.12 ads done", flush=True)
+    slots_per_hour = timeline(pre.slot_minutes).slots_per_hour  # 12 à 5 min
+    j_ad, coef, by_hour = ad_terms(pre, idx)
+    for d in days:
+        for h in range(0, (S + slots_per_hour - 1) // slots_per_hour):
+            pos = by_hour.get(d * S + h, empty)
+            terms = cp_model.LinearExpr.WeightedSum([xs[j] for j in j_ad[pos].tolist()], coef[pos].tolist())
+            model.Add(terms <= MAX_AD_MIN_PER_HOUR * 1000)
+
+    _log("C.12 ads done", "C12_ads")
 
     # ------------------------------------------------------------
     # C.5 Progression audience (souhaitée)
@@ -278,51 +426,119 @@ def solve_ortools(
     # contraint pour le solveur. L'objectif de maximisation d'audience
     # encourage naturellement la progression.
     # ------------------------------------------------------------
-    n_c5 = 0
 
     # ------------------------------------------------------------
     # Objectif: max audience globale (ou mix)
     # ------------------------------------------------------------
-    print(f"    [{_elapsed()}] C.5 audience progression done", flush=True)
+    _log("C.5 audience progression done")
 
     # Objective: maximize total profit (ad_revenue - cost)
-    model.Maximize(sum(int(pre.profit[(d, s, p)]) * var for (d, s, p), var in x.items()))
-
-    print(f"    [{_elapsed()}] Objective set. Launching solver...", flush=True)
-
-    # ---- Warm-start hints from previous schedule.json ----
-    if hint_file:
-        import json, os
-        if os.path.isfile(hint_file):
-            try:
-                prev = json.load(open(hint_file, encoding='utf-8'))
-                # Build program_id -> index lookup
-                id_to_idx = {pre.programs[i].id: i for i in range(P)}
-                hint_set: set[tuple[int, int, int]] = set()
-                for d_idx, day_data in enumerate(prev.get('days', [])):
-                    for item in day_data.get('items', []):
-                        pid = item.get('program_id')
-                        s = item.get('start_slot')
-                        p = id_to_idx.get(pid)
-                        if p is not None and s is not None:
-                            hint_set.add((d_idx, s, p))
-                n_hints = 0
-                for key, var in x.items():
-                    model.AddHint(var, 1 if key in hint_set else 0)
-                    n_hints += 1
-                print(f"    [{_elapsed()}] Warm-start: {len(hint_set)} hints from {hint_file}", flush=True)
-            except Exception as e:
-                print(f"    [{_elapsed()}] Warning: could not load hints: {e}", flush=True)
+    model.Maximize(_weighted(xs, cand.profit))
+
+    _log("Objective set.", "objective")
+    built = ModelBuild(model=model, xs=xs, x=x, index=idx)
+    if metrics is not None:
+        metrics.set("model", formulation=formulation, **model_stats(built, pre))
+    return built
+
+
+def model_stats(built: ModelBuild, pre: Precomputed) -> Dict[str, float]:
+    proto = built.model.Proto()
+    per_slot = np.diff(pre.candidates.offsets)
+    return {
+        "x_variables": len(built.xs),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "covers_entries": built.index.n_covers if built.index is not None else 0,
+        "candidates": len(pre.candidates),
+        "slots_with_candidates": int((per_slot > 0).sum()),
+        "candidates_per_slot_mean": round(float(per_slot.mean()), 2) if len(per_slot) else 0.0,
+        "candidates_per_slot_max": int(per_slot.max()) if len(per_slot) else 0,
+    }
+
+
+def load_hints(pre: Precomputed, hint_file: str | None) -> Optional[Set[Tuple[int, int, int]]]:
+    """
+    Départs (d, s, p) d'un schedule.json précédent, ou None s'il est absent.
+    Un programme regroupé (src/aggregate.py) est remplacé par son représentant.
+    """
+    hints = hints_from_schedule([p.id for p in pre.programs], hint_file)
+    if hints is None or not pre.members:
+        return hints
+    rep = pre.representative()
+    return {(d, s, rep.get(p, p)) for d, s, p in hints}
+
+
+def hints_from_schedule(program_ids: List[str], hint_file: str | None) -> Optional[Set[Tuple[int, int, int]]]:
+    """load_hints à partir des seuls ids de programmes (indice p -> id)."""
+    if not hint_file:
+        return None
+    import json, os
+    if not os.path.isfile(hint_file):
+        return None
+    prev = json.load(open(hint_file, encoding='utf-8'))
+    # Build program_id -> index lookup
+    id_to_idx = {pid: i for i, pid in enumerate(program_ids)}
+    hint_set: Set[Tuple[int, int, int]] = set()
+    for d_idx, day_data in enumerate(prev.get('days', [])):
+        for item in day_data.get('items', []):
+            pid = item.get('program_id')
+            s = item.get('start_slot')
+            p = id_to_idx.get(pid)
+            if p is not None and s is not None:
+                hint_set.add((d_idx, s, p))
+    return hint_set
+
+
+def solve_built(
+    built: ModelBuild,
+    time_limit_s: float,
+    gap: float = 0.0,
+    workers: int = 8,
+    hints: Optional[Set[Tuple[int, int, int]]] = None,
+    repair_hint: bool = False,
+    first_solution: bool = False,
+    params: str | None = None,
+    callback: Optional[cp_model.CpSolverSolutionCallback] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> SolveResult:
+    """
+    params : SatParameters supplémentaires au format texte ("linearization_level:2 ...").
+    callback : appelé à chaque solution améliorante.
+    metrics : phase "cpsat", statistiques du solveur, objectif et borne au cours du temps.
+    """
+    model, x = built.model, built.x
+    if hints is not None:
+        for key, var in x.items():
+            model.AddHint(var, 1 if key in hints else 0)
 
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = float(time_limit_s)
-    solver.parameters.num_search_workers = 8
+    solver.parameters.num_search_workers = workers
     if gap > 0:
         solver.parameters.relative_gap_limit = gap
-        print(f"    [{_elapsed()}] Optimality gap set to {gap:.1%}", flush=True)
-
-    status = solver.Solve(model)
+    if repair_hint:
+        # OR-Tools 9.15 plante sur repair_hint en multi-worker
+        solver.parameters.repair_hint = True
+        solver.parameters.num_search_workers = 1
+    if first_solution:
+        solver.parameters.stop_after_first_solution = True
+    if params and not solver.parameters.merge_text_format(params):
+        raise ValueError(f"Invalid SatParameters: {params}")
+
+    if metrics is not None:
+        if callback is None:
+            callback = TimelineCallback()
+        if isinstance(callback, TimelineCallback):
+            callback.metrics = metrics
+        solver.best_bound_callback = lambda bound: metrics.point(bound=bound)
+
+    t = _time.perf_counter()
+    status = solver.Solve(model, callback)
     status_name = solver.StatusName(status)
+    if metrics is not None:
+        metrics.add_phase("cpsat", _time.perf_counter() - t)
+        metrics.record_solver(solver, status_name)
 
     starts: List[Tuple[int, int, int]] = []
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
@@ -336,3 +552,59 @@ def solve_ortools(
         best_bound=int(solver.BestObjectiveBound()) if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else 0,
         starts=sorted(starts),
     )
+
+
+def solve_ortools(
+    pre: Precomputed,
+    time_limit_s: int = 900,
+    hint_file: str | None = None,
+    gap: float = 0.0,
+    formulation: str = "coverage",
+    model_cache_dir: str | None = None,
+    progress=None,
+    metrics: Optional[RunMetrics] = None,
+    greedy_hint: bool = True,
+    workers: int = 8,
+    log: Callable[[str], None] = print,
+) -> SolveResult:
+    """
+    progress : ProgressWriter (src/streaming.py) recevant chaque incumbent.
+    greedy_hint : sans hint faisable, CP-SAT part d'une grille gloutonne (src/greedy.py).
+    """
+    _t0 = _time.perf_counter()
+    def _elapsed(): return f"{_time.perf_counter()-_t0:.1f}s"
+
+    if model_cache_dir:
+        from .model_cache import cached_model
+        built = cached_model(pre, formulation, model_cache_dir, log=log, metrics=metrics)
+    else:
+        built = build_model(pre, formulation=formulation, log=log, metrics=metrics)
+    log(f"    [{_elapsed()}] Model built. Launching solver...")
+
+    # ---- Warm-start hints from previous schedule.json ----
+    hints = None
+    try:
+        hints = load_hints(pre, hint_file)
+        if hints is not None:
+            log(f"    [{_elapsed()}] Warm-start: {len(hints)} hints from {hint_file}")
+    except Exception as e:
+        log(f"    [{_elapsed()}] Warning: could not load hints: {e}")
+    if greedy_hint:
+        from .greedy import full_hint
+        hints = full_hint(pre, hints, log=log, metrics=metrics, time_limit_s=max(1.0, 0.05 * time_limit_s))
+
+    if gap > 0:
+        log(f"    [{_elapsed()}] Optimality gap set to {gap:.1%}")
+    callback = None
+    if progress is not None:
+        from .streaming import StreamingCallback
+        callback = StreamingCallback(built, progress)
+    res = solve_built(built, time_limit_s, gap=gap, workers=workers, hints=hints, callback=callback, metrics=metrics)
+    if not res.starts:
+        # CP-SAT n'a rien trouvé dans le temps imparti : le hint, s'il est faisable
+        from .greedy import hint_result
+        fallback = hint_result(pre, hints)
+        if fallback is not None:
+            log(f"    [{_elapsed()}] CP-SAT {res.status}, returning the feasible hint: objective={fallback.objective}")
+            return fallback
+    return res
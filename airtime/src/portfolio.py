@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import queue
+import time as _time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .preprocess import Precomputed
+from .ortools_solver import ModelBuild, SolveResult, build_model, solve_built, load_hints
+from .minizinc_solver import available_backends, solve_minizinc
+from .lns import _fixed_model, _as_mask
+from .metrics import TimelineCallback
+from .model_cache import cached_model, from_payload, to_payload
+
+
+# Portefeuille : plusieurs solveurs lancés en parallèle (un processus chacun),
+# le coordinateur garde le meilleur incumbent et arrête tout le monde à
+# l'échéance ou dès que l'écart à la meilleure borne CP-SAT atteint gap.
+# Les modèles CP-SAT sont construits une fois par formulation dans le
+# coordinateur. Avec fork, les membres en héritent ; avec spawn ou forkserver
+# (macOS, Windows, Linux à partir de Python 3.14), ils reçoivent le proto au
+# format texte (src/model_cache.py, to_payload) et le relisent.
+# Les solutions MiniZinc (le modèle dense est plus lâche, objectif en audience)
+# sont re-scorées en profit et vérifiées sur le modèle CP-SAT avant d'être retenues.
+
+
+@dataclass(frozen=True)
+class Member:
+    name: str
+    backend: str                   # "cp-sat" | "minizinc"
+    formulation: str = "coverage"  # cp-sat
+    params: str = ""               # cp-sat : SatParameters au format texte
+    mzn_solver: str = ""           # minizinc : gecode, chuffed, cp-sat...
+
+
+CPSAT_MEMBERS = [
+    Member("cpsat-default", "cp-sat"),
+    Member("cpsat-intervals", "cp-sat", formulation="intervals"),
+    Member("cpsat-seed1", "cp-sat", params="random_seed:1 randomize_search:true"),
+    Member("cpsat-lp2", "cp-sat", params="linearization_level:2"),
+]
+MZN_SOLVERS = ["gecode", "chuffed", "cp-sat"]
+
+
+def default_members() -> List[Member]:
+    """Configurations CP-SAT, plus les solveurs MiniZinc installés."""
+    return CPSAT_MEMBERS + [
+        Member(f"mzn-{tag}", "minizinc", mzn_solver=tag) for tag in available_backends(MZN_SOLVERS)
+    ]
+
+
+@dataclass
+class PortfolioResult(SolveResult):
+    winner: str = ""
+
+
+class _Report(TimelineCallback):
+    """Envoie chaque incumbent au coordinateur ; s'arrête quand il le demande."""
+
+    def __init__(self, name: str, built: ModelBuild, out: mp.Queue, stop) -> None:
+        super().__init__()
+        self._name, self._x, self._out, self._stop = name, built.x, out, stop
+
+    def on_incumbent(self) -> None:
+        if self._stop.is_set():
+            self.StopSearch()
+            return
+        starts = sorted(k for k, v in self._x.items() if self.Value(v))
+        self._out.put(("solution", self._name, int(self.ObjectiveValue()), int(self.BestObjectiveBound()), starts))
+
+
+def _run_member(
+    m: Member, pre: Precomputed, built: Union[ModelBuild, Tuple[str, np.ndarray], None], hints, deadline: float,
+    gap: float, workers: int, workdir: str, mzn: Dict, out: mp.Queue, stop,
+) -> None:
+    try:
+        if isinstance(built, tuple):
+            built = from_payload(built)
+        remaining = max(1.0, deadline - _time.monotonic())
+        if m.backend == "cp-sat":
+            res = solve_built(
+                built, remaining, gap=gap, workers=workers, hints=hints,
+                params=m.params or None, callback=_Report(m.name, built, out, stop),
+            )
+            out.put(("done", m.name, res.status, res.best_bound if res.starts else None, None))
+        else:
+            res = solve_minizinc(
+                pre, workdir=os.path.join(workdir, m.name),
+                timeout_s=int(remaining), solver=m.mzn_solver, **mzn,
+            )
+            if res.starts:
+                out.put(("solution", m.name, None, None, res.starts))
+            out.put(("done", m.name, res.status, None, None))
+    except Exception as e:
+        out.put(("error", m.name, repr(e), None, None))
+
+
+def _profit(pre: Precomputed, starts: List[Tuple[int, int, int]]) -> Optional[int]:
+    cand = pre.candidates
+    js = [cand.find(d, s, p) for d, s, p in starts]
+    if any(j < 0 for j in js):
+        return None
+    return int(cand.profit[js].sum())
+
+
+def solve_portfolio(
+    pre: Precomputed,
+    time_limit_s: int = 600,
+    hint_file: str | None = None,
+    gap: float = 0.0,
+    members: Optional[List[Member]] = None,
+    model_cache_dir: str | None = None,
+    workdir: str = "mzn_work",
+    mzn_formulation: str = "dense",
+    fzn_cache_dir: str | None = None,
+    mzn_data: str = "instance",
+    cpus: Optional[int] = None,
+    log: Callable[[str], None] = print,
+) -> PortfolioResult:
+    t0 = _time.monotonic()
+    deadline = t0 + time_limit_s
+    def _elapsed(): return f"{_time.monotonic()-t0:.1f}s"
+
+    members = members or default_members()
+    n_cpsat = sum(m.backend == "cp-sat" for m in members)
+    workers = max(1, (cpus or os.cpu_count() or 1) // max(1, n_cpsat))
+
+    builds: Dict[str, ModelBuild] = {}
+    for f in sorted({m.formulation for m in members if m.backend == "cp-sat"}):
+        if model_cache_dir:
+            builds[f] = cached_model(pre, f, model_cache_dir, log=lambda msg: None)
+        else:
+            builds[f] = build_model(pre, formulation=f, log=lambda msg: None)
+    try:
+        hints = load_hints(pre, hint_file)
+    except Exception as e:
+        log(f"    [{_elapsed()}] Warning: could not load hints: {e}")
+        hints = None
+    log(f"    [{_elapsed()}] Portfolio: {', '.join(m.name for m in members)} ({workers} workers per CP-SAT member)")
+
+    mzn = {"formulation": mzn_formulation, "data_mode": mzn_data, "fzn_cache_dir": fzn_cache_dir}
+    ctx = mp.get_context()
+    shared = builds if ctx.get_start_method() == "fork" else {f: to_payload(b) for f, b in builds.items()}
+    out: mp.Queue = ctx.Queue()
+    stop = ctx.Event()
+    procs = {
+        m.name: ctx.Process(
+            target=_run_member, daemon=True,
+            args=(m, pre, shared.get(m.formulation) if m.backend == "cp-sat" else None, hints,
+                  deadline, gap, workers, workdir, mzn, out, stop),
+        )
+        for m in members
+    }
+    for p in procs.values():
+        p.start()
+    backend = {m.name: m.backend for m in members}
+
+    best: Optional[PortfolioResult] = None
+    bound: Optional[int] = None   # meilleure borne supérieure CP-SAT
+    running = set(procs)
+
+    # messages : (kind, membre, objectif | statut | erreur, borne, départs)
+    def _handle(msg) -> None:
+        nonlocal best, bound
+        kind, name, a, b, starts = msg
+        if b is not None:
+            bound = b if bound is None else min(bound, b)
+        if kind == "error":
+            log(f"    [{_elapsed()}] {name} failed: {a}")
+            running.discard(name)
+        elif kind == "done":
+            running.discard(name)
+            log(f"    [{_elapsed()}] {name} finished: {a}")
+        elif kind == "solution":
+            if backend[name] != "cp-sat":
+                starts = _checked(pre, builds, starts)
+                a = _profit(pre, starts) if starts else None
+                if a is None:
+                    log(f"    [{_elapsed()}] {name}: solution rejected by the CP-SAT model")
+                    return
+            if best is None or a > best.objective:
+                best = PortfolioResult(status="FEASIBLE", objective=a, best_bound=0, starts=starts, winner=name)
+                log(f"    [{_elapsed()}] {name}: objective={a}" + (f" bound={bound}" if bound is not None else ""))
+
+    def _gap_reached() -> bool:
+        if best is None or bound is None:
+            return False
+        return bound - best.objective <= gap * abs(bound)
+
+    while running and _time.monotonic() < deadline and not _gap_reached():
+        try:
+            _handle(out.get(timeout=min(0.5, max(0.01, deadline - _time.monotonic()))))
+        except queue.Empty:
+            pass
+        for name in list(running):
+            if not procs[name].is_alive() and out.empty():
+                running.discard(name)
+
+    # arrêt : les membres CP-SAT s'arrêtent à leur prochaine solution, les
+    # autres (ou ceux encore en presolve) sont terminés après un court délai
+    stop.set()
+    grace = _time.monotonic() + 2.0
+    while any(p.is_alive() for p in procs.values()) and _time.monotonic() < grace:
+        try:
+            _handle(out.get(timeout=0.1))
+        except queue.Empty:
+            pass
+    for p in procs.values():
+        if p.is_alive():
+            p.terminate()
+        p.join()
+
+    if best is None:
+        log(f"    [{_elapsed()}] Portfolio: no solution")
+        return PortfolioResult(status="UNKNOWN", objective=0, best_bound=0, starts=[])
+    best.best_bound = bound or 0
+    if bound is not None and best.objective >= bound:
+        best.status = "OPTIMAL"
+    log(f"    [{_elapsed()}] Portfolio winner: {best.winner} objective={best.objective}")
+    return best
+
+
+def _checked(pre: Precomputed, builds: Dict[str, ModelBuild], starts) -> Optional[List[Tuple[int, int, int]]]:
+    """starts s'il satisfait le modèle CP-SAT complet (x figés), sinon None."""
+    built = builds.get("coverage")
+    if built is None:
+        built = builds["coverage"] = build_model(pre, log=lambda msg: None)
+    mask = _as_mask(built, set(starts))
+    if mask.sum() != len(set(starts)):
+        return None
+    res = solve_built(_fixed_model(built, np.zeros_like(mask), mask), 30, workers=1)
+    return res.starts or None
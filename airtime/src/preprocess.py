@@ -1,20 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import defaultdict
+from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from .config import (
-    DAYS_FR, SLOTS_PER_DAY, SLOT_MINUTES, TIME_BANDS, DAY_COEFF,
-    AGE_MIN_TIME, EUROPE_ORIGINS,
+    DAYS_FR, SLOT_MINUTES, DAY_COEFF,
+    EUROPE_ORIGINS,
     FICTION_GENRES, NONFICTION_GENRES,
     JT_BLOCKS,
     GENRE_GROUPS, GENRE_QUOTAS_WEEK,
     MAX_AD_MIN_PER_HOUR, AD_BREAK_MINUTES, ad_breaks_for_program,
     MAX_CANDIDATES_PER_SLOT,
 )
+from .candidates import AllowedStartsView, CandidateTable, CoefficientView
 from .loader import Program
-from .timeutils import slot_index_from_time, time_from_slot_index
+from .timeline import timeline
+from .timeutils import duration_slots as _duration_slots, slot_index_from_time
 
 
 @dataclass(frozen=True)
@@ -31,31 +35,47 @@ class Precomputed:
     is_fiction: List[int]
 
     fixed_start: Dict[Tuple[int, int], int]  # (day, slot) -> prog_idx
-    allowed_starts: Dict[Tuple[int, int], List[int]]
 
-    score: Dict[Tuple[int, int, int], int]
-    audience: Dict[Tuple[int, int, int], int]     # audience at (d,s,p) based on band at s
-    profit: Dict[Tuple[int, int, int], int]        # ad_revenue - cost at (d,s,p)
+    # candidats (d,s,p) + audience et profit (ad_revenue - cost), format CSR
+    candidates: CandidateTable
 
     ad_rate_milli: List[int]  # milli-minutes per minute (ad_min*1000/dur)
 
+    # programmes interchangeables regroupés (src/aggregate.py) : représentant
+    # -> membres (représentant compris) ; seul le représentant a des entrées
+    members: Dict[int, List[int]] = field(default_factory=dict)
 
-def _band_for_slot(slot: int) -> Dict:
-    t = time_from_slot_index(slot)
-    for b in TIME_BANDS:
-        s = slot_index_from_time(b["start"])
-        e = slot_index_from_time(b["end"])
-        if s <= slot < e:
-            return b
-    return TIME_BANDS[0]
+    # résolution de la grille (duration_slots, slots des candidats) :
+    # SLOT_MINUTES, ou la grille grossière de src/multires.py
+    slot_minutes: int = SLOT_MINUTES
 
+    def copies(self, p: int) -> int:
+        """Nombre de programmes que p représente (1 hors regroupement)."""
+        return len(self.members.get(p, ())) or 1
 
-def _min_start_slot_for_age(age_rating: str) -> int:
-    if age_rating in AGE_MIN_TIME:
-        return slot_index_from_time(AGE_MIN_TIME[age_rating])
-    return 0
+    def representative(self) -> Dict[int, int]:
+        """Programme regroupé -> son représentant."""
+        return {m: rep for rep, ps in self.members.items() for m in ps}
 
+    # Accès compatibles avec les anciens dicts indexés par tuples
+    @property
+    def allowed_starts(self) -> AllowedStartsView:
+        return AllowedStartsView(self.candidates)
 
+    @property
+    def audience(self) -> CoefficientView:
+        return CoefficientView(self.candidates, self.candidates.audience)
+
+    @property
+    def score(self) -> CoefficientView:
+        return self.audience
+
+    @property
+    def profit(self) -> CoefficientView:
+        return CoefficientView(self.candidates, self.candidates.profit)
+
+
+@lru_cache(maxsize=None)
 def _parse_date(s: str) -> date:
     return datetime.strptime(s, "%Y-%m-%d").date()
 
@@ -70,7 +90,8 @@ def _available(p: Program, week_start: date) -> bool:
     return True
 
 
-def _passes_rerun_rule(p: Program, week_start: date) -> bool:
+def _rerun_days(p: Program) -> int:
+    """Délai minimal de rediffusion en jours (0 : pas de règle) ; partagé avec src/catalog.py."""
     # C.6 : Films 90j, Documentaires 30j, Séries 1 ep/semaine max (géré en contrainte)
     # Si min_rerun_days est explicitement renseigné dans les données, il prend la priorité.
     # Sinon, on applique les règles par défaut par genre.
@@ -86,17 +107,112 @@ def _passes_rerun_rule(p: Program, week_start: date) -> bool:
             min_days = 1
         # Pour Séries, Magazine, Sport, Jeunesse, Divertissement :
         # pas de règle de délai fixe par défaut (géré au cas par cas via min_rerun_days dans les données)
+    return int(min_days or 0)
 
+
+def _passes_rerun_rule(p: Program, week_start: date) -> bool:
+    min_days = _rerun_days(p)
     if not p.last_broadcast_date or not min_days:
         return True
     try:
         last = _parse_date(p.last_broadcast_date)
     except ValueError:
         return True
-    return (week_start - last).days >= int(min_days)
+    return (week_start - last).days >= min_days
+
+
+SERIES_GENRES = {"Série", "Series", "Séries"}
+SOCIETY_SUBGENRES = {"societe", "société", "magazine de société"}
+SERIES_TOLERANCE_SLOTS = 4  # ±20 min autour de usual_time (C.3)
 
 
-def build_precomputed(programs: List[Program], week_start: date) -> Precomputed:
+@dataclass(frozen=True)
+class ProgramRule:
+    """
+    Créneaux de départ autorisés d'un programme pour une semaine donnée.
+    slots[d] = intervalles [début, fin) de slots ; vide si le jour est exclu.
+    """
+    slots: Tuple[Tuple[Tuple[int, int], ...], ...]
+
+    def n_starts(self) -> int:
+        return sum(b - a for day in self.slots for a, b in day)
+
+
+def _week_eligible(p: Program, week_start: date) -> bool:
+    # disponibilité (C.14)
+    if not _available(p, week_start):
+        return False
+
+    # rerun (C.6)
+    if not _passes_rerun_rule(p, week_start):
+        return False
+
+    # exclusivités (C.7) : 6 mois ~ 180 jours
+    if p.is_exclusive and p.last_broadcast_date:
+        try:
+            last = _parse_date(p.last_broadcast_date)
+            if (week_start - last).days < 180:
+                return False
+        except Exception:
+            pass
+    return True
+
+
+def _start_bounds(p: Program, slot_minutes: int = SLOT_MINUTES) -> Tuple[int, int, Optional[int]]:
+    """
+    Partie indépendante de la semaine : intervalle [lo, hi) des slots de
+    départ et jour imposé (None = tous les jours).
+    """
+    tl = timeline(slot_minutes)
+    L = _duration_slots(p.duration_minutes, slot_minutes)
+    lo = 0
+    hi = tl.slots_per_day - L + 1  # le programme doit finir dans la journée
+
+    # signalétique (C.10)
+    lo = max(lo, tl.age_min_slot.get(p.age_rating, 0))
+
+    # nouveautés (C.7) : Access Prime / Prime obligatoire
+    if p.is_new:
+        lo = max(lo, tl.new_window[0])
+        hi = min(hi, tl.new_window[1])
+
+    # séries récurrentes au même horaire (C.3)
+    # On tolère une plage de ±4 slots (±20 min) autour de l'horaire habituel
+    # pour éviter le sur-contraignement lorsque plusieurs séries sont
+    # assignées au même créneau exact dans le catalogue.
+    day: Optional[int] = None
+    if p.genre in SERIES_GENRES and p.usual_time:
+        usual_s = slot_index_from_time(p.usual_time, slot_minutes)
+        tol = -(-SERIES_TOLERANCE_SLOTS * SLOT_MINUTES // slot_minutes)   # au moins ±20 min
+        lo = max(lo, usual_s - tol)
+        hi = min(hi, usual_s + tol + 1)
+        if p.usual_day and p.usual_day in DAYS_FR:
+            day = DAYS_FR.index(p.usual_day)
+    return lo, hi, day
+
+
+def compile_rule(p: Program, week_start: date, slot_minutes: int = SLOT_MINUTES) -> ProgramRule:
+    """
+    Traduit les règles d'un programme (disponibilité, rerun, exclusivité,
+    signalétique, nouveautés, horaires des séries) en intervalles de slots.
+    Ces règles ne dépendent que du programme et de week_start : elles sont
+    évaluées une seule fois au lieu d'être testées pour chaque (jour, slot).
+    """
+    if not _week_eligible(p, week_start):
+        return ProgramRule(slots=((),) * len(DAYS_FR))
+
+    lo, hi, day = _start_bounds(p, slot_minutes)
+    interval = ((lo, hi),) if lo < hi else ()
+    return ProgramRule(slots=tuple(
+        interval if day is None or d == day else () for d in range(len(DAYS_FR))
+    ))
+
+
+def compile_rules(programs: List[Program], week_start: date, slot_minutes: int = SLOT_MINUTES) -> List[ProgramRule]:
+    return [compile_rule(p, week_start, slot_minutes) for p in programs]
+
+
+def _with_fixed_blocks(programs: List[Program]) -> List[Program]:
     # On injecte 2 “pseudo-programmes” JT+Météo fixes (C.3)
     injected = []
     for b in JT_BLOCKS:
@@ -114,8 +230,25 @@ def build_precomputed(programs: List[Program], week_start: date) -> Precomputed:
             fixed_time=b["start"],
             fixed_days=DAYS_FR,  # tous les jours
         ))
-    programs = programs + injected
+    return programs + injected
+
 
+@dataclass(frozen=True)
+class _ProgramTables:
+    """Attributs par programme, indépendants du créneau (communs aux moteurs)."""
+    prog_index: Dict[str, int]
+    duration_slots: List[int]
+    is_european: List[int]
+    is_french: List[int]
+    is_independent: List[int]
+    genre_name: List[str]
+    genre_id: List[int]
+    is_fiction: List[int]
+    fixed_start: Dict[Tuple[int, int], int]
+    ad_rate_milli: List[int]
+
+
+def _program_tables(programs: List[Program], slot_minutes: int = SLOT_MINUTES) -> _ProgramTables:
     prog_index = {p.id: i for i, p in enumerate(programs)}
     duration_slots: List[int] = []
     is_european: List[int] = []
@@ -135,8 +268,7 @@ def build_precomputed(programs: List[Program], week_start: date) -> Precomputed:
 
     for i, p in enumerate(programs):
         # slots
-        slots = (p.duration_minutes + SLOT_MINUTES - 1) // SLOT_MINUTES
-        duration_slots.append(slots)
+        duration_slots.append(_duration_slots(p.duration_minutes, slot_minutes))
 
         fr = 1 if (p.origin or "").lower() == "france" else 0
         is_french.append(fr)
@@ -160,115 +292,199 @@ def build_precomputed(programs: List[Program], week_start: date) -> Precomputed:
 
         # fixes
         if p.fixed_time and p.fixed_days:
-            s = slot_index_from_time(p.fixed_time)
+            s = slot_index_from_time(p.fixed_time, slot_minutes)
             for dname in p.fixed_days:
                 if dname in DAYS_FR:
                     d = DAYS_FR.index(dname)
                     fixed_start[(d, s)] = i
 
+    return _ProgramTables(
+        prog_index=prog_index,
+        duration_slots=duration_slots,
+        is_european=is_european,
+        is_french=is_french,
+        is_independent=is_independent,
+        genre_name=genre_name,
+        genre_id=genre_id,
+        is_fiction=is_fiction,
+        fixed_start=fixed_start,
+        ad_rate_milli=ad_rate_milli,
+    )
+
+
+def _assemble(
+    programs: List[Program], tables: _ProgramTables, candidates: CandidateTable, slot_minutes: int = SLOT_MINUTES,
+) -> Precomputed:
+    return Precomputed(
+        programs=programs,
+        prog_index=tables.prog_index,
+        duration_slots=tables.duration_slots,
+        is_european=tables.is_european,
+        is_french=tables.is_french,
+        is_independent=tables.is_independent,
+        genre_name=tables.genre_name,
+        genre_id=tables.genre_id,
+        is_fiction=tables.is_fiction,
+        fixed_start=tables.fixed_start,
+        candidates=candidates,
+        ad_rate_milli=tables.ad_rate_milli,
+        slot_minutes=slot_minutes,
+    )
+
+
+def _dominance_classes(programs: List[Program], tables: _ProgramTables) -> Tuple[List[int], List[bool]]:
+    """
+    (classe, limité) de chaque programme. Deux programmes de même classe ont
+    les mêmes coefficients dans toutes les contraintes du modèle hors budget :
+    durée, genre (variété, quotas), fiction (C.1), origine et indépendance
+    (quotas légaux), taux de pub (C.12), magazine de société. Un programme
+    limité (série : une fois par semaine, C.6) ne peut pas en remplacer un
+    autre ; un programme à horaire fixe est seul dans sa classe.
+    """
+    fixed = set(tables.fixed_start.values())
+    classes: Dict[tuple, int] = {}
+    cls: List[int] = []
+    for i, p in enumerate(programs):
+        soc = p.genre == "Magazine" and (p.subgenre or "").lower() in SOCIETY_SUBGENRES
+        key = (
+            tables.genre_id[i], p.duration_minutes, tables.duration_slots[i], tables.is_fiction[i],
+            tables.is_european[i], tables.is_french[i], tables.is_independent[i],
+            tables.ad_rate_milli[i], soc, i if i in fixed else None,
+        )
+        cls.append(classes.setdefault(key, len(classes)))
+    return cls, [p.genre in SERIES_GENRES for p in programs]
+
+
+def _drop_dominated(
+    plist: List[int], profit: Dict[int, int], programs: List[Program], cls: List[int], limited: List[bool],
+) -> List[int]:
+    """
+    plist sans les programmes dominés : B est retiré si un programme A non
+    limité de même classe a un profit >= et un coût <= (à égalité, le plus
+    petit indice reste). Remplacer B par A dans une grille la garde faisable
+    sans baisser le profit : la réduction ne perd aucune solution optimale.
+    profit : profit de chaque programme de plist à ce slot.
+    """
+    cheapest: Dict[int, int] = {}   # classe -> plus petit coût d'un programme non limité déjà vu
+    dropped: set[int] = set()
+    for i in sorted(plist, key=lambda i: (cls[i], -profit[i], int(programs[i].cost), i)):
+        cost, c = int(programs[i].cost), cheapest.get(cls[i])
+        if c is not None and c <= cost:
+            dropped.add(i)
+        elif not limited[i]:
+            cheapest[cls[i]] = cost
+    return [i for i in plist if i not in dropped]
+
+
+def _trim_candidates(
+    plist: List[int], score: Dict[int, int], programs: List[Program], fixed_p: Optional[int],
+) -> List[int]:
+    """
+    Sélection diversifiée par genre + coût pour maintenir la faisabilité,
+    limitée à MAX_CANDIDATES_PER_SLOT (+ le programme fixe du slot).
+    score : audience de chaque programme de plist à ce slot.
+    """
+    # Regrouper par genre
+    by_genre: Dict[str, List[int]] = defaultdict(list)
+    for i in plist:
+        by_genre[programs[i].genre].append(i)
+
+    kept_set: set[int] = set()
+
+    for g in by_genre:
+        # Garder le meilleur par audience ET le moins cher par genre
+        by_score = sorted(by_genre[g], key=lambda i: score.get(i, 0), reverse=True)
+        by_cost = sorted(by_genre[g], key=lambda i: programs[i].cost)
+        kept_set.add(by_score[0])  # meilleur audience
+        kept_set.add(by_cost[0])   # moins cher
+        if len(by_score) > 1:
+            kept_set.add(by_score[1])  # 2e meilleur audience
+
+    # Remplir le reste par score global
+    remaining = sorted(
+        [i for i in plist if i not in kept_set],
+        key=lambda i: score.get(i, 0), reverse=True
+    )
+    for i in remaining:
+        if len(kept_set) >= MAX_CANDIDATES_PER_SLOT:
+            break
+        kept_set.add(i)
+    # Ajouter le programme fixe si nécessaire
+    if fixed_p is not None and fixed_p in score:
+        kept_set.add(fixed_p)
+    return [i for i in plist if i in kept_set]
+
+
+def build_precomputed(
+    programs: List[Program], week_start: date, engine: str = "python", catalog=None,
+    slot_minutes: int = SLOT_MINUTES,
+) -> Precomputed:
+    """
+    engine="python" : boucle de référence (d, s, p).
+    engine="numpy"  : calcul vectorisé (src/preprocess_numpy.py), résultat identique.
+    catalog : forme colonnaire de `programs` (src/catalog.py), utilisée par le moteur numpy.
+    slot_minutes : résolution de la grille, un multiple de SLOT_MINUTES.
+    """
+    if engine == "numpy":
+        from .preprocess_numpy import build_precomputed_numpy
+        return build_precomputed_numpy(programs, week_start, catalog=catalog, slot_minutes=slot_minutes)
+    if engine != "python":
+        raise ValueError(f"Unknown precompute engine: {engine}")
+
+    programs = _with_fixed_blocks(programs)
+    tables = _program_tables(programs, slot_minutes)
+    fixed_start = tables.fixed_start
+    cls, limited = _dominance_classes(programs, tables)
+
     allowed_starts: Dict[Tuple[int, int], List[int]] = {}
     score: Dict[Tuple[int, int, int], int] = {}
     audience: Dict[Tuple[int, int, int], int] = {}
     profit: Dict[Tuple[int, int, int], int] = {}
 
+    # candidats par (jour, slot) : expansion des intervalles compilés,
+    # dans l'ordre croissant des programmes
+    tl = timeline(slot_minutes)
+    S = tl.slots_per_day
+    buckets: List[List[int]] = [[] for _ in range(len(DAYS_FR) * S)]
+    for i, rule in enumerate(compile_rules(programs, week_start, slot_minutes)):
+        for d, intervals in enumerate(rule.slots):
+            for a, b in intervals:
+                for s in range(a, b):
+                    buckets[d * S + s].append(i)
+
+    bands = [tl.band_of(s) for s in range(S)]
+    ad_min = [ad_breaks_for_program(p.genre, p.duration_minutes) * AD_BREAK_MINUTES for p in programs]
+
     for d, dname in enumerate(DAYS_FR):
         day_coeff = DAY_COEFF[dname]
-        for s in range(SLOTS_PER_DAY):
+        for s in range(S):
             key = (d, s)
-            band = _band_for_slot(s)
-            plist: List[int] = []
-            for i, p in enumerate(programs):
-                L = duration_slots[i]
-                if s + L > SLOTS_PER_DAY:
-                    continue
-
-                # disponibilité (C.14)
-                if not _available(p, week_start):
-                    continue
-
-                # rerun (C.6)
-                if not _passes_rerun_rule(p, week_start):
-                    continue
-
-                # signalétique (C.10)
-                if s < _min_start_slot_for_age(p.age_rating):
-                    continue
-
-                # nouveautés (C.7) : Access Prime / Prime obligatoire
-                if p.is_new:
-                    access_s = slot_index_from_time("18:00")
-                    prime_e = slot_index_from_time("22:30")
-                    if not (access_s <= s < prime_e):
-                        continue
-
-                # exclusivités (C.7) : 6 mois ~ 180 jours
-                if p.is_exclusive and p.last_broadcast_date:
-                    try:
-                        last = _parse_date(p.last_broadcast_date)
-                        if (week_start - last).days < 180:
-                            continue
-                    except Exception:
-                        pass
-
-                # séries récurrentes au même horaire (C.3)
-                # On tolère une plage de ±4 slots (±20 min) autour de l'horaire habituel
-                # pour éviter le sur-contraignement lorsque plusieurs séries sont
-                # assignées au même créneau exact dans le catalogue.
-                if p.genre in {"Série", "Series", "Séries"} and p.usual_time:
-                    usual_s = slot_index_from_time(p.usual_time)
-                    if not (usual_s - 4 <= s <= usual_s + 4):
-                        continue
-                    if p.usual_day and p.usual_day in DAYS_FR and d != DAYS_FR.index(p.usual_day):
-                        continue
-
-                plist.append(i)
-
+            band = bands[s]
+            plist = buckets[d * S + s]
+            for i in plist:
+                p = programs[i]
                 aud = int(p.base_audience * band["aud_mult"] * day_coeff)
                 # Ad revenue estimate
-                breaks = ad_breaks_for_program(p.genre, p.duration_minutes)
-                ad_min = breaks * AD_BREAK_MINUTES
-                revenue = int(aud / 1000 * band["cpm"] * ad_min)
+                revenue = int(aud / 1000 * band["cpm"] * ad_min[i])
                 prog_profit = revenue - int(p.cost)
 
                 score[(d, s, i)] = aud
                 audience[(d, s, i)] = aud
                 profit[(d, s, i)] = prog_profit
 
-            # Limiter les candidats par slot pour réduire la taille du modèle
-            # Sélection diversifiée par genre + coût pour maintenir la faisabilité
-            if len(plist) > MAX_CANDIDATES_PER_SLOT:
-                fixed_p = fixed_start.get(key)
-                # Regrouper par genre
-                from collections import defaultdict
-                by_genre: dict[str, list] = defaultdict(list)
+            # Réduction sans perte (dominance), puis plafond heuristique optionnel
+            kept = _drop_dominated(plist, {i: profit[(d, s, i)] for i in plist}, programs, cls, limited)
+            if len(kept) < len(plist):
+                kept_set = set(kept)
                 for i in plist:
-                    by_genre[programs[i].genre].append(i)
-
-                kept_set: set[int] = set()
-
-                for g in by_genre:
-                    # Garder le meilleur par audience ET le moins cher par genre
-                    by_score = sorted(by_genre[g], key=lambda i: score.get((d, s, i), 0), reverse=True)
-                    by_cost = sorted(by_genre[g], key=lambda i: programs[i].cost)
-                    kept_set.add(by_score[0])  # meilleur audience
-                    kept_set.add(by_cost[0])   # moins cher
-                    if len(by_score) > 1:
-                        kept_set.add(by_score[1])  # 2e meilleur audience
-
-                # Remplir le reste par score global
-                remaining = sorted(
-                    [i for i in plist if i not in kept_set],
-                    key=lambda i: score.get((d, s, i), 0), reverse=True
-                )
-                for i in remaining:
-                    if len(kept_set) >= MAX_CANDIDATES_PER_SLOT:
-                        break
-                    kept_set.add(i)
-                # Ajouter le programme fixe si nécessaire
-                if fixed_p is not None:
-                    kept_set.add(fixed_p)
-                new_plist = [i for i in plist if i in kept_set]
+                    if i not in kept_set:
+                        del score[(d, s, i)], audience[(d, s, i)], profit[(d, s, i)]
+                plist = kept
+            if MAX_CANDIDATES_PER_SLOT is not None and len(plist) > MAX_CANDIDATES_PER_SLOT:
+                slot_score = {i: score[(d, s, i)] for i in plist}
+                new_plist = _trim_candidates(plist, slot_score, programs, fixed_start.get(key))
                 # Nettoyer les scores des programmes exclus
+                kept_set = set(new_plist)
                 for i in plist:
                     if i not in kept_set:
                         score.pop((d, s, i), None)
@@ -278,20 +494,5 @@ def build_precomputed(programs: List[Program], week_start: date) -> Precomputed:
 
             allowed_starts[key] = plist
 
-    return Precomputed(
-        programs=programs,
-        prog_index=prog_index,
-        duration_slots=duration_slots,
-        is_european=is_european,
-        is_french=is_french,
-        is_independent=is_independent,
-        genre_name=genre_name,
-        genre_id=genre_id,
-        is_fiction=is_fiction,
-        fixed_start=fixed_start,
-        allowed_starts=allowed_starts,
-        score=score,
-        audience=audience,
-        profit=profit,
-        ad_rate_milli=ad_rate_milli,
-    )
+    candidates = CandidateTable.from_dicts(len(DAYS_FR), S, allowed_starts, audience, profit)
+    return _assemble(programs, tables, candidates, slot_minutes)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    DAYS_FR, SLOT_MINUTES, DAY_COEFF,
+    AD_BREAK_MINUTES, ad_breaks_for_program,
+    MAX_CANDIDATES_PER_SLOT,
+)
+from .candidates import CandidateTable
+from .loader import Program
+from .preprocess import (
+    Precomputed,
+    _ProgramTables, _with_fixed_blocks, _program_tables, _assemble,
+    _start_bounds, _week_eligible, _dominance_classes,
+)
+from .timeline import timeline
+
+if TYPE_CHECKING:
+    from .catalog import Catalog
+
+
+def _rule_vectors(
+    programs: List[Program], week_start: date, catalog: Optional[Catalog] = None,
+    slot_minutes: int = SLOT_MINUTES,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Règles compilées sous forme de vecteurs : départs autorisés sur [lo, hi)
+    le jour `day` (-1 = tous les jours) ; lo = hi = 0 si le programme est
+    indisponible cette semaine. Si un catalogue colonnaire couvre les premiers
+    programmes, leurs vecteurs sont calculés en bloc (dates déjà en ordinaux) ;
+    ses bornes sont sur la grille de base, il est ignoré à une autre résolution.
+    """
+    if slot_minutes != SLOT_MINUTES:
+        catalog = None
+    P = len(programs)
+    lo = np.zeros(P, dtype=np.int64)
+    hi = np.zeros(P, dtype=np.int64)
+    day = np.full(P, -1, dtype=np.int64)
+    n_cat = 0
+    if catalog is not None:
+        n_cat = len(catalog)
+        ok = catalog.week_eligible(week_start)
+        lo[:n_cat] = np.where(ok, catalog.columns["start_lo"], 0)
+        hi[:n_cat] = np.where(ok, catalog.columns["start_hi"], 0)
+        day[:n_cat] = catalog.columns["start_day"]
+    for i in range(n_cat, P):
+        p = programs[i]
+        if _week_eligible(p, week_start):
+            a, b, d = _start_bounds(p, slot_minutes)
+            lo[i], hi[i] = a, b
+            day[i] = -1 if d is None else d
+    return lo, hi, day
+
+
+def _mask_rows(
+    rules: Tuple[np.ndarray, np.ndarray, np.ndarray], days: np.ndarray, slots: np.ndarray,
+) -> np.ndarray:
+    """Éligibilité (len(days) x P) des programmes aux (jour, slot) donnés."""
+    lo, hi, day = rules
+    d = days[:, None]
+    s = slots[:, None]
+    return (s >= lo) & (s < hi) & ((day < 0) | (day == d))
+
+
+def _eligibility_mask(
+    programs: List[Program], week_start: date, catalog: Optional[Catalog] = None, slot_minutes: int = SLOT_MINUTES,
+) -> np.ndarray:
+    """Masque D x S x P des départs autorisés (équivalent à compile_rules)."""
+    D, S = len(DAYS_FR), timeline(slot_minutes).slots_per_day
+    days, slots = np.divmod(np.arange(D * S), S)
+    return _mask_rows(_rule_vectors(programs, week_start, catalog, slot_minutes), days, slots).reshape(D, S, -1)
+
+
+def _rank_in_blocks(M: np.ndarray, block_start: np.ndarray, block_len: np.ndarray) -> np.ndarray:
+    """
+    Rang (1, 2, ...) de chaque True de M parmi les True de son bloc de colonnes,
+    ligne par ligne. Les blocs sont contigus et couvrent toutes les colonnes.
+    """
+    c = np.cumsum(M, axis=1, dtype=np.int32)
+    before = np.zeros((M.shape[0], len(block_start)), dtype=np.int32)
+    nz = block_start > 0
+    before[:, nz] = c[:, block_start[nz] - 1]
+    return c - np.repeat(before, block_len, axis=1)
+
+
+def _blocks(keys_sorted: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    start = np.flatnonzero(np.r_[True, keys_sorted[1:] != keys_sorted[:-1]])
+    return start, np.diff(np.r_[start, len(keys_sorted)])
+
+
+def _trim_dense(
+    mask: np.ndarray, score: np.ndarray, band: np.ndarray,
+    genre: np.ndarray, cost: np.ndarray, fixed_start: Dict[Tuple[int, int], int],
+) -> np.ndarray:
+    """
+    Même sélection que la boucle Python de build_precomputed :
+    2 meilleures audiences + le moins cher par genre, complété par score global
+    jusqu'à MAX_CANDIDATES_PER_SLOT, plus le programme fixe du slot.
+
+    Travaille sur le masque dense D x S x P sans trier les entrées : l'ordre
+    par score ne dépend que de (jour, tranche) et l'ordre par coût est global,
+    on permute donc les colonnes une fois par (jour, tranche) et on classe par
+    sommes cumulées. Les égalités sont départagées par indice de programme,
+    comme le tri stable de la version Python.
+    score[d, b, p] : audience du programme p le jour d dans la tranche b.
+    """
+    if MAX_CANDIDATES_PER_SLOT is None:
+        return mask
+    D, S, P = mask.shape
+    over = mask.sum(axis=2) > MAX_CANDIDATES_PER_SLOT
+    if not over.any():
+        return mask
+
+    keep = mask.copy()
+    prog = np.arange(P)
+
+    by_cost = np.lexsort((prog, cost, genre))
+    cost_blocks = _blocks(genre[by_cost])
+
+    for d in range(D):
+        for b in np.unique(band):
+            rows = np.flatnonzero((band == b) & over[d])
+            if not len(rows):
+                continue
+            M = mask[d, rows]
+            sc = score[d, b]
+
+            # le moins cher par genre
+            kept = np.zeros_like(M)
+            Mp = M[:, by_cost]
+            kept[:, by_cost] = Mp & (_rank_in_blocks(Mp, *cost_blocks) == 1)
+
+            # 2 meilleures audiences par genre
+            by_gscore = np.lexsort((prog, -sc, genre))
+            Mp = M[:, by_gscore]
+            kept[:, by_gscore] |= Mp & (_rank_in_blocks(Mp, *_blocks(genre[by_gscore])) <= 2)
+
+            # remplissage par score global jusqu'au plafond
+            by_score = np.lexsort((prog, -sc))
+            quota = MAX_CANDIDATES_PER_SLOT - kept.sum(axis=1)
+            Mp = (M & ~kept)[:, by_score]
+            filler = np.zeros_like(M)
+            filler[:, by_score] = Mp & (np.cumsum(Mp, axis=1, dtype=np.int32) <= quota[:, None])
+
+            keep[d, rows] = kept | filler
+
+    # le programme fixe est conservé s'il était éligible
+    for (d, s), pf in fixed_start.items():
+        keep[d, s, pf] = mask[d, s, pf]
+    return keep
+
+
+@dataclass(frozen=True)
+class _Coefficients:
+    """Entrées du calcul audience / profit, par (jour, tranche, programme)."""
+    band: np.ndarray      # S : tranche de chaque slot
+    score: np.ndarray     # D x B x P : audience
+    cpm: np.ndarray       # B
+    ad_min: np.ndarray    # P : minutes de pub
+    cost: np.ndarray      # P
+    genre: np.ndarray     # P : genre_id
+
+
+def _coefficients(programs: List[Program], genre_id: List[int], slot_minutes: int = SLOT_MINUTES) -> _Coefficients:
+    # audience par (jour, tranche, programme) : même calcul flottant que la boucle
+    tl = timeline(slot_minutes)
+    day_coeff = np.array([DAY_COEFF[dn] for dn in DAYS_FR], dtype=np.float64)
+    base_aud = np.array([p.base_audience for p in programs], dtype=np.float64)
+    score = (base_aud[None, None, :] * tl.aud_mult[None, :, None] * day_coeff[:, None, None]).astype(np.int64)
+    ad_min = np.array(
+        [ad_breaks_for_program(p.genre, p.duration_minutes) * AD_BREAK_MINUTES for p in programs],
+        dtype=np.float64,
+    )
+    return _Coefficients(
+        band=tl.band,
+        score=score,
+        cpm=tl.cpm,
+        ad_min=ad_min,
+        cost=np.array([int(p.cost) for p in programs], dtype=np.int64),
+        genre=np.asarray(genre_id, dtype=np.int64),
+    )
+
+
+def _entries(keep: np.ndarray, co: _Coefficients) -> Tuple[np.ndarray, ...]:
+    """(slot_key, prog, audience, profit) des entrées conservées, triées par (d, s, p)."""
+    d_e, s_e, p_e = np.nonzero(keep)
+    b_e = co.band[s_e]
+    aud = co.score[d_e, b_e, p_e]
+    revenue = (aud / 1000 * co.cpm[b_e] * co.ad_min[p_e]).astype(np.int64)
+    return d_e * keep.shape[1] + s_e, p_e, aud, revenue - co.cost[p_e]
+
+
+def _dominated_dense(mask: np.ndarray, co: _Coefficients, cls: np.ndarray, limited: np.ndarray) -> np.ndarray:
+    """
+    Même réduction que preprocess._drop_dominated, sur le masque dense. Le
+    profit ne dépend que de (jour, tranche, programme) : les colonnes sont
+    triées une fois par (jour, tranche) par (classe, -profit, coût, indice),
+    et une entrée est dominée si un programme non limité placé avant elle
+    dans sa classe, présent sur la ligne, coûte autant ou moins. Ce coût
+    minimal est un minimum cumulé sur la ligne ; chaque classe est décalée
+    de `big` vers le bas pour que le minimum d'une classe ne déborde pas
+    sur la suivante.
+    """
+    D, S, P = mask.shape
+    keep = mask.copy()
+    if not P:
+        return keep
+    prog = np.arange(P)
+    cost0 = co.cost - co.cost.min()
+    big = int(cost0.max()) + 2
+    for d in range(D):
+        profit = (co.score[d] / 1000 * co.cpm[:, None] * co.ad_min[None, :]).astype(np.int64) - co.cost
+        for b in np.unique(co.band):
+            rows = np.flatnonzero(co.band == b)
+            M = mask[d, rows]
+            if not M.any():
+                continue
+            order = np.lexsort((prog, co.cost, -profit[b], cls))
+            start, length = _blocks(cls[order])
+            shift = np.repeat(np.arange(len(start), dtype=np.int64) * big, length)
+            cost = cost0[order] - shift
+            Mp = M[:, order]
+            run = np.minimum.accumulate(np.where(Mp & ~limited[order], cost, big - 1 - shift), axis=1)
+            before = np.concatenate([np.full((len(rows), 1), big), run[:, :-1]], axis=1)
+            out = np.zeros_like(M)
+            out[:, order] = Mp & (before > cost)
+            keep[d, rows] = out
+    return keep
+
+
+def _reduce(mask: np.ndarray, co: _Coefficients, programs: List[Program], tables: _ProgramTables) -> np.ndarray:
+    """Entrées conservées : dominance (sans perte), puis plafond MAX_CANDIDATES_PER_SLOT s'il est fixé."""
+    cls, limited = _dominance_classes(programs, tables)
+    keep = _dominated_dense(mask, co, np.asarray(cls, dtype=np.int64), np.asarray(limited, dtype=bool))
+    return _trim_dense(keep, co.score, co.band, co.genre, co.cost, tables.fixed_start)
+
+
+def build_precomputed_numpy(
+    programs: List[Program], week_start: date, catalog: Optional[Catalog] = None, slot_minutes: int = SLOT_MINUTES,
+) -> Precomputed:
+    """catalog : forme colonnaire de `programs` (src/catalog.py), optionnelle."""
+    programs = _with_fixed_blocks(programs)
+    tables = _program_tables(programs, slot_minutes)
+
+    mask = _eligibility_mask(programs, week_start, catalog, slot_minutes)
+    co = _coefficients(programs, tables.genre_id, slot_minutes)
+    keep = _reduce(mask, co, programs, tables)
+
+    # coefficients des seules entrées conservées
+    candidates = CandidateTable.from_arrays(len(DAYS_FR), mask.shape[1], *_entries(keep, co))
+    return _assemble(programs, tables, candidates, slot_minutes)
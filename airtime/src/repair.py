@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import time as _time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import DAYS_FR, SLOT_MINUTES
+from .lns import _as_mask, _fixed_model
+from .loader import Program
+from .metrics import RunMetrics
+from .model_cache import cached_model
+from .ortools_solver import SolveResult, build_model, load_hints, solve_built
+from .preprocess import Precomputed
+from .timeline import timeline
+from .timeutils import slot_index_from_time
+
+
+# Réparation locale d'une grille après un imprévu : programme retiré, créneau
+# réservé (pseudo-programme à horaire fixe, comme les JT), coût modifié. Les
+# placements du schedule.json précédent restent figés hors d'une fenêtre de
+# window_minutes autour des placements touchés, élargie aux bords des
+# placements qu'elle entame ; CP-SAT ne ré-optimise que les départs de la
+# fenêtre, l'ancienne grille en hint. Si la fenêtre n'admet aucune grille
+# (budget, quotas hebdomadaires), elle double jusqu'à couvrir les journées
+# touchées, puis toute la semaine (résolution complète depuis le hint).
+
+RESERVED_PREFIX = "RESERVED_"
+
+
+@dataclass(frozen=True)
+class Reservation:
+    day: int
+    start: int    # slot de base
+    end: int      # slot de base, exclu
+    title: str = "Créneau réservé"
+    genre: str = "JT"
+
+    @property
+    def program_id(self) -> str:
+        return f"{RESERVED_PREFIX}{DAYS_FR[self.day]}_{self.start}"
+
+
+@dataclass(frozen=True)
+class Disruption:
+    removed: Tuple[str, ...] = ()
+    reserved: Tuple[Reservation, ...] = ()
+    cost: Dict[str, int] = field(default_factory=dict)
+
+    def apply(self, programs: List[Program]) -> List[Program]:
+        """Catalogue après l'imprévu : sans les programmes retirés, coûts mis à jour, un programme par créneau réservé."""
+        unknown = sorted((set(self.removed) | set(self.cost)) - {p.id for p in programs})
+        if unknown:
+            raise ValueError(f"Unknown program ids in disruption: {', '.join(unknown)}")
+        removed = set(self.removed)
+        out = [
+            dataclasses.replace(p, cost=self.cost[p.id]) if p.id in self.cost else p
+            for p in programs if p.id not in removed
+        ]
+        tl = timeline(SLOT_MINUTES)
+        for r in self.reserved:
+            out.append(Program(
+                id=r.program_id,
+                title=r.title,
+                genre=r.genre,
+                subgenre=r.title,
+                duration_minutes=(r.end - r.start) * SLOT_MINUTES,
+                cost=0,
+                base_audience=0,
+                origin="France",
+                year=2026,
+                age_rating="Tout public",
+                fixed_time=tl.time[r.start],
+                fixed_days=[DAYS_FR[r.day]],
+            ))
+        return out
+
+
+def load_disruption(path: str) -> Disruption:
+    """
+    {"remove": [id, ...],
+     "reserve": [{"day": "Mardi", "start": "21:00", "end": "22:30", "title": ..., "genre": ...}],
+     "cost": {id: nouveau coût}}
+    """
+    spec = json.load(open(path, encoding="utf-8"))
+    S = timeline(SLOT_MINUTES).slots_per_day
+    reserved = []
+    for r in spec.get("reserve", []):
+        if r["day"] not in DAYS_FR:
+            raise ValueError(f"Unknown day in reserved block: {r['day']!r}")
+        s, e = slot_index_from_time(r["start"]), slot_index_from_time(r["end"])
+        if not 0 <= s < e <= S:
+            raise ValueError(f"Invalid reserved block {r['day']} {r['start']}-{r['end']}")
+        reserved.append(Reservation(
+            DAYS_FR.index(r["day"]), s, e, r.get("title", Reservation.title), r.get("genre", Reservation.genre),
+        ))
+    return Disruption(
+        removed=tuple(spec.get("remove", [])),
+        reserved=tuple(reserved),
+        cost={pid: int(c) for pid, c in spec.get("cost", {}).items()},
+    )
+
+
+@dataclass
+class RepairResult(SolveResult):
+    changes: Dict = field(default_factory=dict)
+
+
+def _placements(pre: Precomputed, schedule_file: str) -> Tuple[List[Tuple[int, int, int, int]], Dict]:
+    """(jour, début, fin, programme ou -1 s'il n'est plus au catalogue) de chaque placement, et le meta du fichier."""
+    if not os.path.isfile(schedule_file):
+        raise FileNotFoundError(f"Schedule to repair not found: {schedule_file}")
+    prev = json.load(open(schedule_file, encoding="utf-8"))
+    rep = pre.representative()
+    out = []
+    for d, day in enumerate(prev.get("days", [])):
+        for item in day.get("items", []):
+            p = pre.prog_index.get(item["program_id"], -1)
+            out.append((d, item["start_slot"], item["end_slot"], rep.get(p, p)))
+    return out, prev.get("meta", {})
+
+
+def _seeds(pre: Precomputed, old: List[Tuple[int, int, int, int]], disruption: Disruption) -> np.ndarray:
+    """Slots D x S touchés : placements retirés, devenus invalides, recouvrant un créneau réservé ou au coût modifié, trous de la grille."""
+    cand = pre.candidates
+    rep = pre.representative()
+    changed = {rep.get(pre.prog_index[pid], pre.prog_index[pid]) for pid in disruption.cost if pid in pre.prog_index}
+    reserved = np.zeros((cand.n_days, cand.slots_per_day), dtype=bool)
+    for r in disruption.reserved:
+        reserved[r.day, r.start:r.end] = True
+    seeds = reserved.copy()
+    covered = np.zeros_like(reserved)
+    for d, s, e, p in old:
+        covered[d, s:e] = True
+        if p < 0 or p in changed or reserved[d, s:e].any() or cand.find(d, s, p) < 0:
+            seeds[d, s:e] = True
+    return seeds | ~covered
+
+
+def _zone(old: List[Tuple[int, int, int, int]], seeds: np.ndarray, radius: int) -> np.ndarray:
+    """Slots libérés : seeds à radius slots près, étendus aux placements qu'ils entament."""
+    raw = seeds.copy()
+    for o in range(1, min(radius, seeds.shape[1]) + 1):
+        raw[:, o:] |= seeds[:, :-o]
+        raw[:, :-o] |= seeds[:, o:]
+    zone = raw.copy()
+    for d, s, e, _ in old:
+        if raw[d, s:e].any():
+            zone[d, s:e] = True
+    return zone
+
+
+def _check_reserved(pre: Precomputed, disruption: Disruption) -> None:
+    for r in disruption.reserved:
+        pr = pre.prog_index[r.program_id]
+        for (d, s), p in pre.fixed_start.items():
+            if d == r.day and p != pr and s < r.end and r.start < s + pre.duration_slots[p]:
+                raise ValueError(f"Reserved block {r.program_id} overlaps fixed block {pre.programs[p].id}")
+        if pre.fixed_start.get((r.day, r.start)) != pr:
+            raise ValueError(f"Reserved block {r.program_id} starts with another fixed block")
+
+
+def _changes(
+    pre: Precomputed, old: List[Tuple[int, int, int, int]], starts: List[Tuple[int, int, int]], zone: np.ndarray,
+) -> Dict:
+    """Écart entre l'ancienne et la nouvelle grille : placements gardés, retirés, ajoutés, minutes d'antenne changées."""
+    shape = zone.shape
+    before = np.full(shape, -1, dtype=np.int64)
+    for d, s, e, p in old:
+        before[d, s:e] = p
+    after = np.full(shape, -1, dtype=np.int64)
+    for d, s, p in starts:
+        after[d, s:s + pre.duration_slots[p]] = p
+    old_set = {(d, s, p) for d, s, _, p in old if p >= 0}
+    kept = len(old_set & set(starts))
+    changed = before != after
+    return {
+        "kept": kept,
+        "dropped": len(old) - kept,
+        "added": len(starts) - kept,
+        "changed_minutes": int(changed.sum()) * pre.slot_minutes,
+        "changed_days": [DAYS_FR[d] for d in np.flatnonzero(changed.any(axis=1)).tolist()],
+        "window_minutes": int(zone.sum()) * pre.slot_minutes,
+    }
+
+
+def solve_repair(
+    pre: Precomputed,
+    schedule_file: str,
+    disruption: Disruption,
+    window_minutes: int = 60,
+    time_limit_s: float = 60,
+    gap: float = 0.0,
+    formulation: str = "coverage",
+    workers: int = 8,
+    model_cache_dir: str | None = None,
+    log: Callable[[str], None] = print,
+    metrics: Optional[RunMetrics] = None,
+) -> RepairResult:
+    """
+    pre : semaine recalculée sur disruption.apply(programs). schedule_file :
+    la grille à réparer (schedule.json). window_minutes : marge de part et
+    d'autre des placements touchés.
+    """
+    t0 = _time.perf_counter()
+    deadline = t0 + time_limit_s
+    def _elapsed(): return f"{_time.perf_counter() - t0:.1f}s"
+    def _remaining(): return max(0.0, deadline - _time.perf_counter())
+    quiet = lambda msg: None
+
+    _check_reserved(pre, disruption)
+    S = pre.candidates.slots_per_day
+    old, prev_meta = _placements(pre, schedule_file)
+    seeds = _seeds(pre, old, disruption)
+    hints = load_hints(pre, schedule_file)
+    log(f"    [{_elapsed()}] {len(old)} placements, {int(seeds.sum()) * pre.slot_minutes} min touched "
+        f"on {int(seeds.any(axis=1).sum())} day(s)")
+
+    # modèle complet : les fenêtres de C.1 portent sur les départs candidats,
+    # un modèle réduit aux seules entrées de la fenêtre serait plus contraint
+    if model_cache_dir:
+        built = cached_model(pre, formulation, model_cache_dir, log=quiet, metrics=metrics)
+    else:
+        built = build_model(pre, formulation=formulation, log=quiet, metrics=metrics)
+    idx = built.index
+    key = idx.day * S + idx.slot
+    # un créneau réservé ne part que de son horaire
+    movable = ~np.isin(idx.prog, [pre.prog_index[r.program_id] for r in disruption.reserved])
+    movable |= np.array([pre.fixed_start.get((d, s)) == p for d, s, p in built.x], dtype=bool)
+    log(f"    [{_elapsed()}] Model built ({len(built.xs)} x-variables)")
+
+    t = _time.perf_counter()
+    radius = -(-window_minutes // pre.slot_minutes)
+    while True:
+        if radius < S:
+            zone, scope = _zone(old, seeds, radius), f"±{radius} slots"
+        elif radius < 2 * S:
+            zone, scope = np.repeat(seeds.any(axis=1, keepdims=True), S, axis=1), "touched days"
+        else:
+            zone, scope = np.ones_like(seeds), "whole week"
+        # libres : les entrées entièrement dans la zone ; les placements hors zone restent à 1, le reste à 0
+        cum = np.r_[0, np.cumsum(zone.ravel())]
+        free = (cum[key + idx.length] - cum[key] == idx.length) & movable
+        current = _as_mask(built, {(d, s, p) for d, s, e, p in old if not zone[d, s:e].any()})
+        final = bool(zone.all())
+        budget = _remaining() if final else max(1.0, 0.5 * _remaining())
+        res = solve_built(_fixed_model(built, free, current), budget, gap=gap, workers=workers, hints=hints)
+        log(f"    [{_elapsed()}] Window {scope} ({int(zone.sum()) * pre.slot_minutes} min, "
+            f"{int(free.sum())} free entries): {res.status} objective={res.objective}")
+        if res.starts or final or _remaining() < 1.0:
+            break
+        radius = max(1, 2 * radius)
+    if metrics is not None:
+        metrics.add_phase("repair.solve", _time.perf_counter() - t)
+
+    changes = _changes(pre, old, res.starts, zone) if res.starts else {}
+    if changes:
+        changes["previous_objective"] = prev_meta.get("objective")
+        log(f"    [{_elapsed()}] Changes: {changes['kept']} kept, {changes['dropped']} dropped, {changes['added']} added, "
+            f"{changes['changed_minutes']} min of airtime changed ({', '.join(changes['changed_days'])})")
+    if metrics is not None:
+        metrics.set("repair", scope=scope, **{k: v for k, v in changes.items() if k != "changed_days"})
+    # la borne ne vaut que pour la fenêtre, sauf si elle couvre toute la semaine
+    status = res.status if zone.all() or not res.starts else "FEASIBLE"
+    return RepairResult(status, res.objective, res.best_bound if zone.all() else 0, res.starts, changes)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import time as _time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .export import starts_to_schedule
+from .metrics import TimelineCallback, atomic_write_text
+from .ortools_solver import ModelBuild
+from .preprocess import Precomputed
+
+
+# Écriture au fil de l'eau : chaque nouvel incumbent remplace schedule.json
+# (écriture atomique, la grille lue par l'exploitation est toujours complète)
+# et ajoute une ligne JSON au fichier de progression.
+
+
+def atomic_write_json(path: str, obj) -> None:
+    atomic_write_text(path, json.dumps(obj, ensure_ascii=False, indent=2))
+
+
+class ProgressWriter:
+    """
+    write() à chaque amélioration : grille dans out_path (et, si versioned,
+    dans une copie <nom>.<n>.json), ligne {t, objective, bound, gap} dans
+    progress_path. meta : champs fixes du bloc "meta" (solveur, semaine...).
+    """
+
+    def __init__(
+        self, pre: Precomputed, out_path: str, meta: Dict,
+        progress_path: Optional[str] = None, versioned: bool = False,
+    ) -> None:
+        self.pre, self.out_path, self.meta = pre, out_path, meta
+        self.progress_path, self.versioned = progress_path, versioned
+        self.t0 = _time.perf_counter()
+        self.n = 0
+        if progress_path:
+            open(progress_path, "w", encoding="utf-8").close()
+
+    def write(self, starts: List[Tuple[int, int, int]], objective: int, bound: int) -> None:
+        self.n += 1
+        elapsed = round(_time.perf_counter() - self.t0, 2)
+        sched = starts_to_schedule(self.pre, starts)
+        sched["meta"] = {
+            **self.meta, "status": "FEASIBLE", "objective": objective, "best_bound": bound,
+            "elapsed_s": elapsed, "incumbent": self.n,
+        }
+        atomic_write_json(self.out_path, sched)
+        if self.versioned:
+            p = Path(self.out_path)
+            atomic_write_json(str(p.with_name(f"{p.stem}.{self.n}{p.suffix}")), sched)
+        if self.progress_path:
+            gap = (bound - objective) / abs(bound) if bound else None
+            line = {"t": elapsed, "incumbent": self.n, "objective": objective, "bound": bound, "gap": gap}
+            with open(self.progress_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line) + "\n")
+
+
+class StreamingCallback(TimelineCallback):
+    def __init__(self, built: ModelBuild, writer: ProgressWriter) -> None:
+        super().__init__()
+        self._x, self._writer = built.x, writer
+
+    def on_incumbent(self) -> None:
+        starts = sorted(k for k, v in self._x.items() if self.Value(v))
+        self._writer.write(starts, int(self.ObjectiveValue()), int(self.BestObjectiveBound()))
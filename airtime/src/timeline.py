@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .config import SLOT_MINUTES, TIME_BANDS, AGE_MIN_TIME
+from .timeutils import slot_index_from_time, slots_per_day, time_from_slot_index
+
+
+# Tables par slot d'une grille, construites une seule fois par résolution
+# (timeline() est mise en cache) : tranche horaire et heure
+# "HH:MM" de chaque slot, audience et CPM par tranche, premier slot permis
+# par signalétique. Précalcul, solveurs et export les indexent au lieu de
+# reconvertir les heures de config.py à chaque appel.
+
+NEW_WINDOW = ("18:00", "22:30")   # nouveautés : Access Prime / Prime (C.7)
+NIGHT_START = "00:30"             # C.1 ne s'applique pas en Nuit profonde
+
+
+@dataclass(frozen=True)
+class Timeline:
+    slot_minutes: int
+    slots_per_day: int
+    slots_per_hour: int             # fenêtres de pub (C.12)
+    band: np.ndarray                # S : indice dans TIME_BANDS de la tranche de chaque slot
+    time: Tuple[str, ...]           # S + 1 : heure de début de chaque slot (time[S] : fin de journée)
+    aud_mult: np.ndarray            # B : multiplicateur d'audience de chaque tranche
+    cpm: np.ndarray                 # B
+    age_min_slot: Dict[str, int]    # signalétique -> premier slot de départ (C.10)
+    new_window: Tuple[int, int]     # [début, fin) des départs de nouveautés
+    night_start: int
+
+    def band_of(self, slot: int) -> Dict:
+        """Entrée de TIME_BANDS du slot."""
+        return TIME_BANDS[int(self.band[slot])]
+
+
+@lru_cache(maxsize=None)
+def timeline(slot_minutes: int = SLOT_MINUTES) -> Timeline:
+    S = slots_per_day(slot_minutes)
+    # tranche : la première qui contient le slot, TIME_BANDS[0] sinon
+    band = np.zeros(S, dtype=np.int64)
+    found = np.zeros(S, dtype=bool)
+    for k, b in enumerate(TIME_BANDS):
+        s = slot_index_from_time(b["start"], slot_minutes)
+        e = slot_index_from_time(b["end"], slot_minutes)
+        inside = ~found & (np.arange(S) >= s) & (np.arange(S) < e)
+        band[inside] = k
+        found |= inside
+    band.flags.writeable = False
+    return Timeline(
+        slot_minutes=slot_minutes,
+        slots_per_day=S,
+        slots_per_hour=60 // slot_minutes,
+        band=band,
+        time=tuple(time_from_slot_index(s, slot_minutes) for s in range(S + 1)),
+        aud_mult=np.array([b["aud_mult"] for b in TIME_BANDS], dtype=np.float64),
+        cpm=np.array([b["cpm"] for b in TIME_BANDS], dtype=np.float64),
+        age_min_slot={r: slot_index_from_time(t, slot_minutes) for r, t in AGE_MIN_TIME.items()},
+        new_window=(slot_index_from_time(NEW_WINDOW[0], slot_minutes), slot_index_from_time(NEW_WINDOW[1], slot_minutes)),
+        night_start=min(slot_index_from_time(NIGHT_START, slot_minutes), S),
+    )
+
@@ -3,7 +3,13 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Tuple
 
-from .config import SLOT_MINUTES, SCHEDULE_START
+from .config import SLOT_MINUTES, SLOTS_PER_DAY, SCHEDULE_START
+
+
+# Toutes les conversions acceptent une résolution slot_minutes (par défaut
+# SLOT_MINUTES) : la grille grossière de src/multires.py en est un multiple
+# qui divise l'heure, pour que les fenêtres horaires de pub (C.12) tombent
+# sur des bords de slots.
 
 
 def parse_hhmm(h: str) -> Tuple[int, int]:
@@ -26,13 +32,33 @@ def minutes_from_schedule_start(hhmm: str) -> int:
     return cur - start
 
 
-def slot_index_from_time(hhmm: str) -> int:
-    return minutes_from_schedule_start(hhmm) // SLOT_MINUTES
+def slots_per_day(slot_minutes: int = SLOT_MINUTES) -> int:
+    if slot_minutes <= 0 or slot_minutes % SLOT_MINUTES or 60 % slot_minutes:
+        raise ValueError(f"slot_minutes must be a multiple of {SLOT_MINUTES} dividing 60: {slot_minutes}")
+    return SLOTS_PER_DAY * SLOT_MINUTES // slot_minutes
+
+
+def duration_slots(minutes: int, slot_minutes: int = SLOT_MINUTES) -> int:
+    """
+    Slots occupés par un programme de `minutes` minutes : arrondi au-dessus
+    sur la grille de base, puis, sur une grille plus grossière, durée de
+    base arrondie au plus proche (au moins 1 slot) pour ne pas décaler
+    systématiquement les départs vers le soir.
+    """
+    base = (minutes + SLOT_MINUTES - 1) // SLOT_MINUTES
+    if slot_minutes == SLOT_MINUTES:
+        return base
+    f = slot_minutes // SLOT_MINUTES
+    return max(1, (base + f // 2) // f)
+
+
+def slot_index_from_time(hhmm: str, slot_minutes: int = SLOT_MINUTES) -> int:
+    return minutes_from_schedule_start(hhmm) // slot_minutes
 
 
-def time_from_slot_index(slot: int) -> str:
+def time_from_slot_index(slot: int, slot_minutes: int = SLOT_MINUTES) -> str:
     sh, sm = parse_hhmm(SCHEDULE_START)
-    total = sh * 60 + sm + slot * SLOT_MINUTES
+    total = sh * 60 + sm + slot * slot_minutes
     total %= 24 * 60
     hh = total // 60
     mm = total % 60
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import os
+from typing import List
+
+import pytest
+
+from src.loader import Program, load_programs
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data", "programs.json")
+
+
+@pytest.fixture(scope="session")
+def programs() -> List[Program]:
+    """Catalogue de référence (data/programs.json), à ne pas modifier en place."""
+    return load_programs(DATA)
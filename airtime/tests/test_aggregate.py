@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.aggregate import aggregate, assign_members
+from src.greedy import HINT_MOVES, check, greedy_restarts
+from src.ortools_solver import SERIES_GENRES
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def weeks(programs):
+    """
+    Semaine du catalogue avec une copie exacte de 30 séries, brute et
+    regroupée. (Les copies des autres programmes sont déjà retirées par la
+    dominance ; une série, limitée, ne domine pas sa copie.)
+    """
+    copies = [
+        dataclasses.replace(p, id=f"{p.id}-bis", title=f"{p.title} (bis)")
+        for p in programs if p.genre in SERIES_GENRES
+    ][:30]
+    pre = build_precomputed(list(programs) + copies, WEEK, engine="numpy")
+    return pre, aggregate(pre)
+
+
+def _signature(pre, p):
+    cand = pre.candidates
+    rows = cand.prog == p
+    return int(pre.programs[p].cost), cand.slot_keys()[rows].tobytes(), cand.audience[rows].tobytes(), cand.profit[rows].tobytes()
+
+
+def test_identical_copies_are_folded(weeks):
+    pre, agg = weeks
+    rep = agg.representative()
+    by_id = {p.id: i for i, p in enumerate(pre.programs)}
+    identical = 0
+    for p in pre.programs:
+        if p.id.endswith("-bis"):
+            copy, original = by_id[p.id], by_id[p.id[:-len("-bis")]]
+            if (pre.candidates.prog == copy).any() and _signature(pre, copy) == _signature(pre, original):
+                identical += 1
+                assert rep.get(copy) == rep.get(original, original)
+    assert identical
+    # une classe ne réunit que des programmes aux entrées identiques
+    for r, ps in agg.members.items():
+        assert r == ps[0]
+        assert all(_signature(pre, p) == _signature(pre, r) for p in ps)
+    folded = [p for ps in agg.members.values() for p in ps[1:]]
+    assert not np.isin(agg.candidates.prog, folded).any()
+    assert len(agg.candidates) == len(pre.candidates) - int(np.isin(pre.candidates.prog, folded).sum())
+
+
+def test_aggregate_is_idempotent(weeks):
+    _, agg = weeks
+    again = aggregate(agg)
+    assert again.members == agg.members
+    np.testing.assert_array_equal(again.candidates.prog, agg.candidates.prog)
+
+
+def test_assign_members_round_trip(weeks):
+    pre, agg = weeks
+    res = greedy_restarts(agg, budget_s=10.0, max_moves=HINT_MOVES)
+    assert res is not None
+    starts = assign_members(agg, res.starts)
+    assert len(starts) == len(res.starts)
+    assert all(0 <= p < len(pre.programs) for _, _, p in starts)
+    # grille concrète faisable sur la semaine non regroupée, même profit
+    assert check(pre, starts) == []
+    cand = pre.candidates
+    assert sum(int(cand.profit[cand.find(d, s, p)]) for d, s, p in starts) == res.objective
+
+
+def test_assign_members_spreads_starts_over_members():
+    pre = SimpleNamespace(members={0: [0, 5, 7]})
+    starts = [(1, 2, 0), (0, 5, 0), (0, 1, 0), (1, 3, 0), (0, 9, 4)]
+    assert assign_members(pre, starts) == [(0, 1, 0), (0, 5, 5), (0, 9, 4), (1, 2, 7), (1, 3, 0)]
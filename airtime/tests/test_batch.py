@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import os
+from datetime import date, timedelta
+
+from src.batch import run_weeks
+from src.catalog import compile_catalog
+
+
+def _probe(catalog, programs, ws, args, workers):
+    return {"week_start": str(ws), "programs": len(programs), "first": programs[0].id, "workers": workers}
+
+
+def test_run_weeks_shares_catalog_and_splits_cpus(programs):
+    weeks = [date(2026, 10, 19) + timedelta(weeks=k) for k in range(3)]
+    rows = run_weeks(compile_catalog(programs), weeks, _probe, None, processes=2)
+    assert [r["week_start"] for r in rows] == [str(w) for w in weeks]
+    assert all(r["programs"] == len(programs) and r["first"] == programs[0].id for r in rows)
+    assert {r["workers"] for r in rows} == {max(1, (os.cpu_count() or 1) // 2)}
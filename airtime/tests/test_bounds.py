@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import date
+
+from src.daydp import upper_bound
+from src.lagrangian import solve_lagrangian
+from src.ortools_solver import Targets, build_model, solve_built
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+def test_bounds_majorize_cp_sat(programs):
+    # semaine de 60 min : infaisable avec les quotas de genres, d'où leur
+    # retrait ; CP-SAT n'y prouve pas l'optimum en temps de test, mais toute
+    # grille qu'il trouve doit rester sous les deux bornes
+    pre = build_precomputed(programs, WEEK, slot_minutes=60)
+    targets = Targets(genres={}, society_magazine=False)
+    res = solve_built(build_model(pre, targets=targets, log=lambda msg: None), 10, workers=1)
+    assert res.status in ("OPTIMAL", "FEASIBLE")
+
+    lag = solve_lagrangian(pre, targets, time_limit_s=5.0, log=lambda msg: None)
+    assert res.objective <= lag.best_bound <= upper_bound(pre)
+    if lag.status in ("OPTIMAL", "FEASIBLE"):
+        assert lag.objective <= res.best_bound
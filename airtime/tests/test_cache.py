@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from src import config
+from src.cache import cache_key, cached_precomputed, evict
+from src.preprocess import build_precomputed
+from test_precompute import assert_same
+
+WEEK = date(2026, 10, 19)
+
+
+def _entries(cache_dir) -> list:
+    return sorted(e.name for e in cache_dir.iterdir() if not e.name.startswith(".tmp-"))
+
+
+def test_hit_loads_the_saved_entry(programs, tmp_path):
+    first = cached_precomputed(programs, WEEK, str(tmp_path))
+    assert not isinstance(first.candidates.prog, np.memmap)
+    again = cached_precomputed(programs, WEEK, str(tmp_path))
+    assert isinstance(again.candidates.prog, np.memmap)   # relu du disque
+    assert _entries(tmp_path) == [cache_key(programs, WEEK)]
+    assert_same(again, build_precomputed(programs, WEEK, engine="numpy"))
+
+
+def test_catalog_edit_is_a_new_entry(programs, tmp_path):
+    cached_precomputed(programs, WEEK, str(tmp_path))
+    edited = list(programs)
+    edited[3] = dataclasses.replace(edited[3], cost=edited[3].cost + 10_000, base_audience=edited[3].base_audience * 2)
+    assert cache_key(edited, WEEK) != cache_key(programs, WEEK)
+    pre = cached_precomputed(edited, WEEK, str(tmp_path))
+    assert len(_entries(tmp_path)) == 2
+    assert_same(pre, build_precomputed(edited, WEEK, engine="numpy"))
+
+
+def test_key_covers_week_grid_and_config(programs, monkeypatch):
+    key = cache_key(programs, WEEK)
+    assert cache_key(programs, date(2026, 10, 26)) != key
+    assert cache_key(programs, WEEK, slot_minutes=60) != key
+    monkeypatch.setattr(config, "MAX_CANDIDATES_PER_SLOT", config.MAX_CANDIDATES_PER_SLOT + 1)
+    assert cache_key(programs, WEEK) != key
+
+
+def test_coarse_grid_entry(programs, tmp_path):
+    cached_precomputed(programs, WEEK, str(tmp_path))
+    cached_precomputed(programs, WEEK, str(tmp_path), slot_minutes=60)
+    pre = cached_precomputed(programs, WEEK, str(tmp_path), slot_minutes=60)
+    assert len(_entries(tmp_path)) == 2
+    assert pre.slot_minutes == 60
+    assert_same(pre, build_precomputed(programs, WEEK, engine="numpy", slot_minutes=60))
+
+
+def test_evict_by_age_then_size(tmp_path):
+    now = time.time()
+    for k, age_days in enumerate([40, 3, 2, 1]):
+        entry = tmp_path / f"e{k}"
+        entry.mkdir()
+        (entry / "data.npy").write_bytes(b"x" * 1000)
+        os.utime(entry, (now - age_days * 86400,) * 2)
+    (tmp_path / ".tmp-partial").mkdir()
+
+    assert evict(str(tmp_path), max_bytes=10_000, max_age_days=30) == 1
+    assert _entries(tmp_path) == ["e1", "e2", "e3"]
+    # au-delà de la taille : les moins récemment utilisées partent d'abord
+    assert evict(str(tmp_path), max_bytes=2_000, max_age_days=30) == 1
+    assert _entries(tmp_path) == ["e2", "e3"]
+    assert (tmp_path / ".tmp-partial").is_dir()
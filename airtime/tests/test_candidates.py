@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+
+from src.candidates import CandidateTable
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+def test_csr_table_round_trips_through_the_dict_views(programs):
+    pre = build_precomputed(programs, WEEK, slot_minutes=60)
+    cand = pre.candidates
+    allowed = dict(pre.allowed_starts)
+    audience = dict(pre.audience.items())
+    profit = dict(pre.profit.items())
+    assert len(audience) == len(profit) == len(cand)
+    assert sum(map(len, allowed.values())) == len(cand)
+
+    again = CandidateTable.from_dicts(cand.n_days, cand.slots_per_day, allowed, audience, profit)
+    for name in ("offsets", "prog", "audience", "profit"):
+        np.testing.assert_array_equal(getattr(again, name), getattr(cand, name), err_msg=name)
+
+    for j, key in enumerate(zip(*cand.entries())):
+        assert cand.find(*key) == j
+        assert key[2] in allowed[key[:2]]
+    d, s, p = next(iter(audience))
+    assert cand.find(d, s, len(pre.programs)) == -1
+    assert cand.find(cand.n_days, 0, p) == -1
+
+
+def test_select_keeps_the_order_and_the_coefficients(programs):
+    cand = build_precomputed(programs, WEEK, slot_minutes=60).candidates
+    keep = cand.profit % 2 == 0
+    sub = cand.select(keep)
+    assert len(sub) == int(keep.sum())
+    kept = [e for e, k in zip(zip(*cand.entries()), keep.tolist()) if k]
+    assert list(zip(*sub.entries())) == kept
+    np.testing.assert_array_equal(sub.profit, cand.profit[keep])
+    np.testing.assert_array_equal(sub.audience, cand.audience[keep])
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+
+from src.config import TOTAL_WEEKLY_BUDGET
+from src.decompose import _split, day_subproblems
+from src.ortools_solver import SERIES_GENRES, Targets, genre_bounds
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+def test_split_rounds_towards_the_safe_side():
+    assert sum(_split(100, [1, 1, 1], round_up=True)) >= 100
+    assert sum(_split(100, [1, 1, 1], round_up=False)) <= 100
+    assert _split(10, [0, 0], round_up=True) == [0, 0]
+
+
+def test_day_targets_add_up_to_the_week(programs):
+    # 7 jours qui respectent leurs cibles doivent former une semaine faisable
+    pre = build_precomputed(programs, WEEK)
+    subs = day_subproblems(pre)
+    assert len(subs) == 7
+    targets = [t for _, t in subs]
+    assert sum(t.budget for t in targets) <= TOTAL_WEEKLY_BUDGET
+    assert sum(t.minutes for t in targets) == Targets().minutes
+    assert sum(t.society_magazine for t in targets) == 1
+    for group, (lo, hi) in genre_bounds(Targets().minutes).items():
+        assert sum(t.genres[group][0] for t in targets) >= lo
+        assert sum(t.genres[group][1] for t in targets) <= hi
+
+    # chaque sous-problème ne garde que son jour, et une série n'a qu'un jour
+    cand = pre.candidates
+    series_days = {}
+    for d, (sub, _) in enumerate(subs):
+        days = sub.candidates.slot_keys() // cand.slots_per_day
+        assert set(days.tolist()) == {d}
+        for p in set(sub.candidates.prog.tolist()):
+            if pre.programs[p].genre in SERIES_GENRES:
+                assert series_days.setdefault(p, d) == d
+    # hors séries, aucune entrée n'est perdue
+    is_series = np.array([prog.genre in SERIES_GENRES for prog in pre.programs])
+    kept = sum(int((~is_series[sub.candidates.prog]).sum()) for sub, _ in subs)
+    assert kept == int((~is_series[cand.prog]).sum())
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+
+import pytest
+
+import src.preprocess as pp
+from src.config import TOTAL_WEEKLY_BUDGET
+from src.loader import Program
+from src.ortools_solver import SERIES_GENRES, Targets, build_model, solve_built
+
+WEEK = date(2026, 10, 19)
+
+
+def _prog(i: int, cost: int) -> Program:
+    return Program(
+        id=f"T{i}", title=f"Test {i}", genre="Magazine", subgenre="Société", duration_minutes=60, cost=cost,
+        base_audience=1_000_000, origin="France", year=2024, age_rating="Tout public",
+    )
+
+
+def test_drop_dominated_keeps_the_non_dominated():
+    programs = [_prog(0, 10), _prog(1, 10), _prog(2, 5), _prog(3, 20), _prog(4, 10)]
+    cls = [0, 0, 0, 0, 1]
+    profit = {0: 100, 1: 90, 2: 80, 3: 100, 4: 10}
+    # 1 : même coût, moins de profit que 0 ; 3 : même profit que 0, plus cher ;
+    # 2 : moins rentable mais moins cher ; 4 : seul de sa classe
+    assert pp._drop_dominated([0, 1, 2, 3, 4], profit, programs, cls, [False] * 5) == [0, 2, 4]
+    # à égalité complète, le plus petit indice reste
+    assert pp._drop_dominated([0, 1], {0: 100, 1: 100}, programs, cls, [False] * 5) == [0]
+
+
+def test_limited_program_dominates_nothing():
+    programs = [_prog(0, 10), _prog(1, 10)]
+    assert pp._drop_dominated([0, 1], {0: 100, 1: 90}, programs, [0, 0], [True, False]) == [0, 1]
+
+
+def _optimum(programs, monkeypatch, dominance: bool):
+    """Optimum CP-SAT d'une journée sur la grille de 60 min, sans plafond par slot."""
+    with monkeypatch.context() as m:
+        m.setattr(pp, "MAX_CANDIDATES_PER_SLOT", None)
+        if not dominance:
+            m.setattr(pp, "_drop_dominated", lambda plist, *args: list(plist))
+        pre = pp.build_precomputed(programs, WEEK, engine="python", slot_minutes=60)
+    targets = Targets(budget=TOTAL_WEEKLY_BUDGET // 7, minutes=20 * 60, genres={}, society_magazine=False)
+    res = solve_built(build_model(pre, days=[0], targets=targets, log=lambda msg: None), 60, workers=1)
+    assert res.status == "OPTIMAL"
+    return res.objective, len(pre.candidates)
+
+
+def test_dominance_keeps_the_optimum(programs, monkeypatch):
+    # 40 programmes, plus pour 10 d'entre eux une copie plus chère et une
+    # copie moins regardée, que la dominance doit retirer
+    small = list(programs[:40])
+    plain = [p for p in small if p.genre not in SERIES_GENRES][:10]
+    for k, p in enumerate(plain):
+        small.append(dataclasses.replace(p, id=f"{p.id}-cher", cost=p.cost + 5_000))
+        small.append(dataclasses.replace(p, id=f"{p.id}-bas", base_audience=p.base_audience * 9 // 10))
+    with_dom, n_with = _optimum(small, monkeypatch, dominance=True)
+    without_dom, n_without = _optimum(small, monkeypatch, dominance=False)
+    assert n_with < n_without
+    assert with_dom == without_dom
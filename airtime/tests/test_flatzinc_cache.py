@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.flatzinc_cache import _parse_output, cached_flatzinc, fzn_key
+from src.minizinc_solver import MZN_MODELS
+
+GECODE = SimpleNamespace(id="org.gecode.gecode", version="6.3.0")
+
+
+def test_parse_output_keeps_the_last_solution():
+    text = "\n".join([
+        "% comment",
+        '{"x": [1, 0], "_objective": 10}',
+        "----------",
+        '{"x": [0, 1],',
+        ' "_objective": 12}',
+        "----------",
+        "==========",
+    ])
+    assert _parse_output(text) == ("OPTIMAL_SOLUTION", 12, {"x": [0, 1], "_objective": 12})
+    assert _parse_output('{"_objective": 3}\n----------\n') == ("SATISFIED", 3, {"_objective": 3})
+    assert _parse_output("=====UNSATISFIABLE=====\n") == ("UNSATISFIABLE", 0, None)
+
+
+def test_key_follows_model_data_and_solver(tmp_path):
+    data = [("N", 3), ("cost", np.array([1, 2, 3])), ("docs", {2, 1})]
+    key = fzn_key(MZN_MODELS["sparse"], GECODE, data)
+    assert fzn_key(MZN_MODELS["sparse"], GECODE, [("N", 3), ("cost", np.array([1, 2, 3])), ("docs", {1, 2})]) == key
+    assert fzn_key(MZN_MODELS["sparse"], GECODE, [("N", 3), ("cost", np.array([1, 2, 4])), ("docs", {1, 2})]) != key
+    assert fzn_key(MZN_MODELS["dense"], GECODE, data) != key
+    assert fzn_key(MZN_MODELS["sparse"], SimpleNamespace(id=GECODE.id, version="6.4.0"), data) != key
+
+    dzn = tmp_path / "data.dzn"
+    dzn.write_text("N = 3;\n")
+    with_file = fzn_key(MZN_MODELS["sparse"], GECODE, [("dzn", dzn)])
+    dzn.write_text("N = 4;\n")
+    assert fzn_key(MZN_MODELS["sparse"], GECODE, [("dzn", dzn)]) != with_file
+
+
+def test_existing_entry_is_not_recompiled(tmp_path):
+    entry = tmp_path / "abc"
+    entry.mkdir()
+    (entry / "meta.json").write_text("{}")
+    messages = []
+    # inst n'est pas utilisé sur un succès de cache
+    assert cached_flatzinc(None, entry, log=messages.append) == entry
+    assert messages == [f"    FlatZinc loaded from {entry}"]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from src.greedy import HINT_MOVES, check, solve_greedy
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def pre(programs):
+    return build_precomputed(programs, WEEK, engine="numpy")
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_greedy_grid_passes_the_checker(pre, seed):
+    res = solve_greedy(pre, time_limit_s=60.0, seed=seed, max_moves=HINT_MOVES, log=lambda msg: None)
+    assert res.status == "FEASIBLE"
+    assert check(pre, res.starts) == []
+
+    profit = dict(zip(zip(*pre.candidates.entries()), pre.candidates.profit.tolist()))
+    assert res.objective == sum(profit[key] for key in res.starts)
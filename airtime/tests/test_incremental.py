@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+from datetime import date
+
+import pytest
+
+from src.incremental import diff_programs, update_precomputed
+from src.preprocess import build_precomputed
+
+from test_precompute import assert_same
+
+WEEK = date(2026, 10, 19)
+RATINGS = ["Tout public", "-10", "-12", "-16", "-18"]
+
+
+def _edit(p, rng: random.Random):
+    kind = rng.choice(["cost", "audience", "rating", "new", "rights", "duration", "genre"])
+    if kind == "cost":
+        return dataclasses.replace(p, cost=int(p.cost * rng.uniform(0.3, 3.0)))
+    if kind == "audience":
+        return dataclasses.replace(p, base_audience=int(p.base_audience * rng.uniform(0.3, 3.0)))
+    if kind == "rating":
+        return dataclasses.replace(p, age_rating=rng.choice(RATINGS))
+    if kind == "new":
+        return dataclasses.replace(p, is_new=not p.is_new)
+    if kind == "rights":
+        return dataclasses.replace(p, rights_end=rng.choice(["2026-10-01", "2030-01-01", None]))
+    if kind == "duration":
+        return dataclasses.replace(p, duration_minutes=rng.choice([20, 30, 45, 60, 90, 120]))
+    return dataclasses.replace(p, genre=rng.choice(["Documentaire", "Magazine", "Film", "Divertissement"]))
+
+
+@pytest.fixture(scope="module")
+def week(programs):
+    return build_precomputed(programs, WEEK, engine="numpy")
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_update_after_random_edits_equals_rebuild(programs, week, seed):
+    rng = random.Random(seed)
+    edited = list(programs)
+    for i in rng.sample(range(len(programs)), 8):
+        edited[i] = _edit(edited[i], rng)
+    assert diff_programs(programs, edited)
+    assert_same(update_precomputed(week, edited, WEEK), build_precomputed(edited, WEEK, engine="numpy"))
+
+
+def test_update_without_edit_keeps_the_week(programs, week):
+    assert_same(update_precomputed(week, list(programs), WEEK), week)
+
+
+def test_update_after_removal_falls_back_to_rebuild(programs, week):
+    edited = programs[:10] + programs[11:]
+    assert diff_programs(programs, edited) is None
+    assert_same(update_precomputed(week, edited, WEEK), build_precomputed(edited, WEEK, engine="numpy"))
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import date
+
+from src.greedy import HINT_MOVES, check, greedy_restarts
+from src.lns import solve_lns
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+def test_lns_keeps_at_least_its_greedy_start(programs):
+    pre = build_precomputed(programs, WEEK)
+    # le point de départ de solve_lns (full_hint sans hint)
+    start = greedy_restarts(pre, 5.0, max_moves=HINT_MOVES, log=lambda msg: None)
+    assert start is not None
+
+    res = solve_lns(pre, time_limit_s=8, sub_time_s=2.0, workers=1, log=lambda msg: None)
+    assert res.status == "FEASIBLE"
+    assert check(pre, res.starts) == []
+    assert res.objective >= start.objective
+    profit = dict(zip(zip(*pre.candidates.entries()), pre.candidates.profit.tolist()))
+    assert res.objective == sum(profit[key] for key in res.starts)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+import stat
+
+from src.metrics import _UMASK, RunMetrics, atomic_write_text
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_atomic_write_uses_umask_for_new_files(tmp_path):
+    path = tmp_path / "schedule.json"
+    atomic_write_text(str(path), "{}")
+    assert path.read_text(encoding="utf-8") == "{}"
+    assert _mode(path) == 0o666 & ~_UMASK
+    assert os.listdir(tmp_path) == ["schedule.json"]
+
+
+def test_atomic_write_keeps_existing_mode(tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text("old", encoding="utf-8")
+    os.chmod(path, 0o640)
+    atomic_write_text(str(path), "new")
+    assert path.read_text(encoding="utf-8") == "new"
+    assert _mode(path) == 0o640
+
+
+def test_log_records_events(capsys):
+    metrics = RunMetrics(echo=False)
+    metrics.log("    [0.1s] Model built")
+    assert capsys.readouterr().out == ""
+    assert [e["message"] for e in metrics.report()["events"]] == ["[0.1s] Model built"]
+    RunMetrics().log("visible")
+    assert capsys.readouterr().out == "visible\n"
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import io
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.minizinc_solver import _dzn_array, sparse_data
+from src.preprocess import build_precomputed
+from src.timeline import timeline
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def pre(programs):
+    return build_precomputed(programs, WEEK, slot_minutes=60)
+
+
+def _groups(data, name):
+    """Groupes 0-based d'un couple (name_start, name_idx) 1-based."""
+    start, idx = data[f"{name}_start"], data[f"{name}_idx"] - 1
+    return [idx[a - 1:b - 1].tolist() for a, b in zip(start[:-1], start[1:])]
+
+
+def test_sparse_data_matches_the_candidates(pre):
+    data = sparse_data(pre)
+    cand = pre.candidates
+    D, S, N = data["D"], data["S"], data["N"]
+    assert N == len(cand)
+    np.testing.assert_array_equal(data["slot_start"], cand.offsets + 1)
+
+    days, slots, progs = cand.entries()
+    end = [min(s + pre.duration_slots[p], S) for s, p in zip(slots, progs)]
+    covers = [[] for _ in range(D * S)]
+    for j, (d, s) in enumerate(zip(days, slots)):
+        for t in range(s, end[j]):
+            covers[d * S + t].append(j)
+    assert _groups(data, "cov") == covers
+
+    for (d, s), p in pre.fixed_start.items():
+        assert cand.find(d, s, p) + 1 in data["fixed_idx"].tolist()
+
+    # C.12 : minutes de pub (milli) de chaque entrée dans chaque heure
+    H, per_hour = data["H"], timeline(pre.slot_minutes).slots_per_hour
+    ads = {}
+    for j, (d, s) in enumerate(zip(days, slots)):
+        rate = int(pre.ad_rate_milli[progs[j]] * pre.slot_minutes)
+        for t in range(s, end[j]):
+            if rate:
+                ads[(d * H + t // per_hour, j)] = ads.get((d * H + t // per_hour, j), 0) + rate
+    coef = iter(data["ad_coef"].tolist())
+    got = {(k, j): next(coef) for k, group in enumerate(_groups(data, "ad")) for j in group}
+    assert ads and got == ads
+
+
+def test_dzn_arrays_are_written_in_chunks():
+    values = np.arange(-5, 12)
+    for chunk in (1, 4, 17, 1 << 16):
+        f = io.StringIO()
+        _dzn_array(f, "a", values, chunk=chunk)
+        assert f.getvalue() == "a = [" + ",".join(map(str, values.tolist())) + "];\n"
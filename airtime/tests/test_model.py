@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+from typing import Dict, List, Tuple
+
+import pytest
+from ortools.sat.python import cp_model
+
+from src.config import (
+    GENRE_GROUPS, LEGAL_MIN_EURO_PERCENT, LEGAL_MIN_FR_PERCENT, LEGAL_MIN_INDEP_PERCENT,
+    MAX_AD_MIN_PER_HOUR, TOTAL_WEEKLY_BUDGET,
+)
+from src.ortools_solver import SERIES_GENRES, Targets, build_model, solve_built
+from src.preprocess import SOCIETY_SUBGENRES, Precomputed, build_precomputed
+from src.timeline import timeline
+
+WEEK = date(2026, 10, 19)
+TARGETS = Targets(budget=TOTAL_WEEKLY_BUDGET // 7, minutes=20 * 60, genres={}, society_magazine=False)
+
+
+def _reference_model(pre: Precomputed, days: List[int], targets: Targets) -> cp_model.CpModel:
+    """
+    Construction d'avant les index (boucles sur le dict x), restreinte à days
+    et à targets comme build_model : sert d'oracle indépendant des index CSR.
+    """
+    model = cp_model.CpModel()
+    S = pre.candidates.slots_per_day
+    P = len(pre.programs)
+    tl = timeline(pre.slot_minutes)
+    x: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    for d, s, p in zip(*pre.candidates.entries()):
+        x[(d, s, p)] = model.NewBoolVar(f"x_{d}_{s}_{p}")
+    covers: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
+    for (d, s, p) in x:
+        for t in range(s, min(s + pre.duration_slots[p], S)):
+            covers.setdefault((d, t), []).append((d, s, p))
+
+    for d in days:
+        for t in range(S):
+            model.Add(sum(x[key] for key in covers.get((d, t), [])) == 1)
+    for (d, s), pfix in pre.fixed_start.items():
+        if d in days:
+            model.Add(x[(d, s, pfix)] == 1)
+    model.Add(sum(int(pre.programs[p].cost) * var for (d, s, p), var in x.items()) <= targets.budget)
+
+    for flags, pct in (
+        (pre.is_european, LEGAL_MIN_EURO_PERCENT),
+        (pre.is_french, LEGAL_MIN_FR_PERCENT),
+        (pre.is_independent, LEGAL_MIN_INDEP_PERCENT),
+    ):
+        share = sum(int(pre.programs[p].duration_minutes) * int(flags[p]) * var for (d, s, p), var in x.items())
+        model.Add(share * 100 >= int(pct * 100) * targets.minutes)
+
+    for d in days:
+        present = []
+        for g in sorted(set(pre.genre_id)):
+            starts_of_g = [var for (dd, s, p), var in x.items() if dd == d and pre.genre_id[p] == g]
+            gp = model.NewBoolVar(f"gp_{d}_{g}")
+            if starts_of_g:
+                model.AddMaxEquality(gp, starts_of_g)
+            else:
+                model.Add(gp == 0)
+            present.append(gp)
+        model.Add(sum(present) >= 4)
+        model.Add(sum(var for (dd, s, p), var in x.items() if dd == d and pre.programs[p].genre == "Documentaire") >= 1)
+    soc_mag = [
+        var for (d, s, p), var in x.items()
+        if pre.programs[p].genre == "Magazine" and (pre.programs[p].subgenre or "").lower() in SOCIETY_SUBGENRES
+    ]
+    if soc_mag and targets.society_magazine:
+        model.Add(sum(soc_mag) >= 1)
+    for group, (lo, hi) in targets.genres.items():
+        in_group = sum(
+            int(pre.programs[p].duration_minutes) * var
+            for (d, s, p), var in x.items() if pre.programs[p].genre in GENRE_GROUPS[group]
+        )
+        model.Add(in_group * 100 >= lo)
+        model.Add(in_group * 100 <= hi)
+
+    # C.1 : fenêtres de 4 start-slots consécutifs, hors Nuit profonde
+    for d in days:
+        fic_at = {}
+        for s in range(min(tl.night_start, S)):
+            plist = [p for p in pre.allowed_starts.get((d, s), []) if (d, s, p) in x]
+            if not plist:
+                continue
+            fv = model.NewBoolVar(f"fic_{d}_{s}")
+            for p in plist:
+                model.AddImplication(x[(d, s, p)], fv if pre.is_fiction[p] else fv.Not())
+            fic_at[s] = fv
+        day_slots = sorted(fic_at)
+        for i in range(len(day_slots) - 3):
+            w = [fic_at[day_slots[i + k]] for k in range(4)]
+            model.Add(sum(w) <= 3)
+            model.Add(sum(w) >= 1)
+
+    for p in range(P):
+        if pre.programs[p].genre in SERIES_GENRES:
+            model.Add(sum(var for (d, s, pp_), var in x.items() if pp_ == p) <= pre.copies(p))
+
+    # C.12 : taux par slot couvert, sommé sur chaque heure
+    for d in days:
+        for hstart in range(0, S, tl.slots_per_hour):
+            terms = []
+            for t in range(hstart, min(S, hstart + tl.slots_per_hour)):
+                for key in covers.get((d, t), []):
+                    rate = int(pre.ad_rate_milli[key[2]] * pre.slot_minutes)
+                    if rate:
+                        terms.append(rate * x[key])
+            model.Add(sum(terms) <= MAX_AD_MIN_PER_HOUR * 1000)
+
+    model.Maximize(sum(c * var for c, var in zip(pre.candidates.profit.tolist(), x.values())))
+    return model
+
+
+@pytest.fixture(scope="module")
+def day(programs):
+    """Lundi seul, sur la grille de 60 min."""
+    pre = build_precomputed(programs[:40], WEEK, slot_minutes=60)
+    cand = pre.candidates
+    return dataclasses.replace(pre, candidates=cand.select(cand.slot_keys() // cand.slots_per_day == 0))
+
+
+# budget d'une journée, puis budget serré (la contrainte de coût devient active)
+@pytest.mark.parametrize("budget", [TARGETS.budget, 300_000])
+def test_index_model_matches_the_reference_optimum(day, budget):
+    targets = dataclasses.replace(TARGETS, budget=budget)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 60.0
+    solver.parameters.num_search_workers = 1
+    assert solver.Solve(_reference_model(day, [0], targets)) == cp_model.OPTIMAL
+    reference = int(solver.ObjectiveValue())
+
+    for formulation in ("coverage", "intervals"):
+        built = build_model(day, formulation, days=[0], targets=targets, log=lambda msg: None)
+        res = solve_built(built, 60, workers=1)
+        assert (res.status, res.objective) == ("OPTIMAL", reference), formulation
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+
+import pytest
+
+from src.model_cache import cached_model, model_key
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def pre(programs):
+    return build_precomputed(programs, WEEK, slot_minutes=60)
+
+
+def test_second_run_loads_the_same_model(pre, tmp_path):
+    messages = []
+    built = cached_model(pre, "coverage", str(tmp_path), log=messages.append)
+    assert not any("loaded" in m for m in messages)
+    entries = list(tmp_path.iterdir())
+    assert [e.name for e in entries] == [model_key(pre, "coverage")]
+
+    messages.clear()
+    loaded = cached_model(pre, "coverage", str(tmp_path), log=messages.append)
+    assert any("loaded" in m for m in messages)
+    assert str(loaded.model.Proto()) == str(built.model.Proto())
+    assert list(loaded.x) == list(built.x)
+    assert [v.Index() for v in loaded.xs] == [v.Index() for v in built.xs]
+
+
+def test_key_follows_the_instance(pre):
+    key = model_key(pre, "coverage")
+    assert model_key(pre, "intervals") != key
+    cand = pre.candidates
+    fewer = dataclasses.replace(pre, candidates=cand.select(cand.profit > 0))
+    assert model_key(fewer, "coverage") != key
+    fixes = dict(pre.fixed_start)
+    del fixes[next(iter(fixes))]
+    assert model_key(dataclasses.replace(pre, fixed_start=fixes), "coverage") != key
+
+
+def test_corrupt_entry_is_rebuilt(pre, tmp_path):
+    built = cached_model(pre, "coverage", str(tmp_path), log=lambda msg: None)
+    entry = tmp_path / model_key(pre, "coverage")
+    (entry / "model.pb.txt.gz").write_bytes(b"not gzip")
+    messages = []
+    again = cached_model(pre, "coverage", str(tmp_path), log=messages.append)
+    assert not any("loaded" in m for m in messages)
+    assert str(again.model.Proto()) == str(built.model.Proto())
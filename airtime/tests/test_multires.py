@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.greedy import HINT_MOVES, _repair, _Rules, check, greedy_restarts
+from src.multires import coarse_precomputed, project, window_candidates
+from src.preprocess import build_precomputed
+from src.timeutils import slots_per_day
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.mark.parametrize("minutes", [25, 40, 75, 80, 120])
+def test_coarse_grid_must_divide_the_hour(minutes):
+    # les fenêtres de pub (C.12) sont des heures entières de slots
+    with pytest.raises(ValueError):
+        slots_per_day(minutes)
+
+
+@pytest.fixture(scope="module")
+def fine(programs):
+    return build_precomputed(programs, WEEK, engine="numpy")
+
+
+def _starts(rules, days):
+    chosen = np.array(sorted(j for day in days for j in day), dtype=np.int64)
+    idx = rules.idx
+    return sorted(zip(idx.day[chosen].tolist(), idx.slot[chosen].tolist(), idx.prog[chosen].tolist()))
+
+
+def test_project_same_grid_is_identity(fine):
+    grid = greedy_restarts(fine, budget_s=10.0, max_moves=HINT_MOVES)
+    rules = _Rules(fine)
+    assert _starts(rules, project(rules, grid.starts, 1, 0)) == sorted(grid.starts)
+
+
+def test_coarse_grid_projects_onto_fine_windows(programs, fine):
+    coarse = coarse_precomputed(programs, WEEK, fine, 15)
+    assert coarse.candidates.slots_per_day * 3 == fine.candidates.slots_per_day
+    grid = greedy_restarts(coarse, budget_s=10.0, max_moves=HINT_MOVES)
+    assert check(coarse, grid.starts) == []
+
+    rules = _Rules(window_candidates(fine, grid.starts, 3, 3))
+    days = project(rules, grid.starts, 3, 3)
+    assert days is not None
+    starts = set(_starts(rules, days))
+    near = sum(any((d, c * 3 + o, p) in starts for o in range(-3, 4)) for d, c, p in grid.starts)
+    assert near >= 0.8 * len(grid.starts)
+
+    days, _ = _repair(rules, days, random.Random(0), time.perf_counter() + 30, 0.1, max_moves=HINT_MOVES)
+    assert check(rules.pre, _starts(rules, days)) == []
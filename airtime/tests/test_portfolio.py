@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+from datetime import date
+
+import pytest
+
+from src.config import TOTAL_WEEKLY_BUDGET
+from src.model_cache import from_payload, to_payload
+from src.ortools_solver import Targets, build_model, solve_built
+from src.portfolio import Member, _run_member
+from src.preprocess import build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def day_model(programs):
+    # une journée sur la grille de 60 min : résolue à l'optimum en quelques secondes
+    pre = build_precomputed(programs[:40], WEEK, engine="numpy", slot_minutes=60)
+    targets = Targets(budget=TOTAL_WEEKLY_BUDGET // 7, minutes=20 * 60, genres={}, society_magazine=False)
+    return pre, build_model(pre, days=[0], targets=targets, log=lambda msg: None)
+
+
+def test_payload_round_trip(day_model):
+    pre, built = day_model
+    copy = from_payload(to_payload(built))
+    assert list(copy.x) == list(built.x)
+    a, b = solve_built(built, 60, workers=1), solve_built(copy, 60, workers=1)
+    assert a.status == b.status == "OPTIMAL"
+    assert a.objective == b.objective
+
+
+def test_cpsat_member_under_spawn(day_model):
+    pre, built = day_model
+    expected = solve_built(built, 60, workers=1)
+    ctx = mp.get_context("spawn")
+    out, stop = ctx.Queue(), ctx.Event()
+    p = ctx.Process(target=_run_member, args=(
+        Member("cpsat-default", "cp-sat"), pre, to_payload(built), None,
+        time.monotonic() + 60, 0.0, 1, "", {}, out, stop,
+    ))
+    p.start()
+    messages = []
+    while not messages or messages[-1][0] == "solution":
+        try:
+            messages.append(out.get(timeout=90))
+        except queue.Empty:
+            break
+    p.join()
+    assert messages and messages[-1][:3] == ("done", "cpsat-default", "OPTIMAL")
+    solutions = [m for m in messages if m[0] == "solution"]
+    assert solutions[-1][2] == expected.objective
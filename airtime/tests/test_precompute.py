@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.catalog import compile_catalog
+from src.preprocess import Precomputed, build_precomputed
+
+WEEK = date(2026, 10, 19)
+
+
+def assert_same(a: Precomputed, b: Precomputed) -> None:
+    for name in ("offsets", "prog", "audience", "profit"):
+        np.testing.assert_array_equal(getattr(a.candidates, name), getattr(b.candidates, name), err_msg=name)
+    assert a.fixed_start == b.fixed_start
+    assert a.duration_slots == b.duration_slots
+    assert a.genre_id == b.genre_id
+
+
+@pytest.mark.parametrize("week_start", [WEEK, date(2026, 12, 21), date(2027, 3, 1)])
+def test_numpy_engine_matches_python(programs, week_start):
+    python = build_precomputed(programs, week_start, engine="python")
+    assert len(python.candidates) > 0
+    assert_same(build_precomputed(programs, week_start, engine="numpy"), python)
+
+
+def test_numpy_engine_with_catalog(programs):
+    catalog = compile_catalog(programs)
+    assert_same(
+        build_precomputed(programs, WEEK, engine="numpy", catalog=catalog),
+        build_precomputed(programs, WEEK, engine="python"),
+    )
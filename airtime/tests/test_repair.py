@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.aggregate import aggregate
+from src.export import starts_to_schedule
+from src.greedy import HINT_MOVES, check, greedy_restarts
+from src.preprocess import build_precomputed
+from src.repair import Disruption, Reservation, _changes, _zone, load_disruption, solve_repair
+from src.timeutils import slot_index_from_time
+
+WEEK = date(2026, 10, 19)
+
+
+def test_apply_removes_reprices_and_reserves(programs):
+    a, b = programs[0].id, programs[1].id
+    block = Reservation(day=2, start=slot_index_from_time("21:00"), end=slot_index_from_time("22:30"), title="Spéciale")
+    out = Disruption(removed=(a,), reserved=(block,), cost={b: 1234}).apply(programs)
+    ids = [p.id for p in out]
+    assert a not in ids and len(out) == len(programs)
+    assert out[ids.index(b)].cost == 1234
+    reserved = out[-1]
+    assert reserved.id == block.program_id
+    assert (reserved.duration_minutes, reserved.fixed_time, reserved.fixed_days) == (90, "21:00", ["Mercredi"])
+    assert (reserved.cost, reserved.base_audience) == (0, 0)
+    with pytest.raises(ValueError):
+        Disruption(removed=("nope",)).apply(programs)
+
+
+def test_load_disruption(tmp_path):
+    path = tmp_path / "d.json"
+    path.write_text(json.dumps({
+        "remove": ["P0001"], "cost": {"P0002": "5000"},
+        "reserve": [{"day": "Mardi", "start": "20:40", "end": "21:10"}],
+    }), encoding="utf-8")
+    d = load_disruption(str(path))
+    assert d.removed == ("P0001",) and d.cost == {"P0002": 5000}
+    assert d.reserved == (Reservation(1, slot_index_from_time("20:40"), slot_index_from_time("21:10")),)
+    path.write_text(json.dumps({"reserve": [{"day": "Mardi", "start": "21:10", "end": "20:40"}]}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_disruption(str(path))
+
+
+# grille à la main : 2 jours de 12 slots, 3 placements par jour
+OLD = [(0, 0, 3, 10), (0, 3, 6, 11), (0, 6, 12, 12), (1, 0, 4, 20), (1, 4, 8, 21), (1, 8, 12, 22)]
+
+
+def test_zone_extends_to_the_placements_it_cuts():
+    seeds = np.zeros((2, 12), dtype=bool)
+    seeds[0, 4] = True
+    assert np.flatnonzero(_zone(OLD, seeds, 0)[0]).tolist() == [3, 4, 5]
+    # ±2 slots entament le 1er placement (0-3) et le 3e (6-12) : ils sont libérés en entier
+    zone = _zone(OLD, seeds, 2)
+    assert zone[0].all() and not zone[1].any()
+    assert np.flatnonzero(_zone(OLD, seeds, 1)[0]).tolist() == [3, 4, 5]
+
+
+def test_changes_counts_kept_dropped_added():
+    pre = SimpleNamespace(duration_slots={10: 3, 11: 3, 12: 6, 13: 2, 14: 1, 20: 4, 21: 4, 22: 4}, slot_minutes=5)
+    zone = np.zeros((2, 12), dtype=bool)
+    zone[0, 3:6] = True
+    # placement 11 remplacé par 13 + 14, le reste inchangé
+    new = [(0, 0, 10), (0, 3, 13), (0, 5, 14), (0, 6, 12), (1, 0, 20), (1, 4, 21), (1, 8, 22)]
+    changes = _changes(pre, OLD, new, zone)
+    assert changes == {
+        "kept": 5, "dropped": 1, "added": 2, "changed_minutes": 15,
+        "changed_days": ["Lundi"], "window_minutes": 15,
+    }
+
+
+def test_repair_after_removal(programs, tmp_path):
+    pre = aggregate(build_precomputed(programs, WEEK, engine="numpy"))
+    grid = greedy_restarts(pre, budget_s=10.0, max_moves=HINT_MOVES)
+    assert grid is not None
+    path = tmp_path / "schedule.json"
+    schedule = starts_to_schedule(pre, grid.starts)
+    path.write_text(json.dumps(schedule), encoding="utf-8")
+
+    # retire un programme diffusé une seule fois, le lundi
+    placed = Counter(it["program_id"] for day in schedule["days"] for it in day["items"])
+    pid = next(it["program_id"] for it in schedule["days"][0]["items"] if placed[it["program_id"]] == 1)
+    disruption = Disruption(removed=(pid,))
+    after = aggregate(build_precomputed(disruption.apply(programs), WEEK, engine="numpy"))
+    res = solve_repair(after, str(path), disruption, window_minutes=60, time_limit_s=60, workers=1, log=lambda msg: None)
+
+    assert res.starts and check(after, res.starts) == []
+    assert pid not in {after.programs[q].id for _, _, q in res.starts}
+    assert 0 < res.changes["changed_minutes"] <= res.changes["window_minutes"]
+    assert res.changes["changed_days"] == ["Lundi"]
+    # hors du lundi, la grille est celle d'avant
+    ids = lambda pre_, starts: sorted((d_, s_, pre_.programs[q].id) for d_, s_, q in starts if d_ > 0)
+    assert ids(after, res.starts) == ids(pre, grid.starts)
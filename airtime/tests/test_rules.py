@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+
+from src.config import DAYS_FR, SLOTS_PER_DAY
+from src.loader import Program
+from src.preprocess import compile_rule, compile_rules
+from src.preprocess_numpy import _rule_vectors
+from src.timeutils import slot_index_from_time
+
+WEEK = date(2026, 10, 19)
+BASE = Program(
+    id="T1", title="Test", genre="Magazine", subgenre="Société", duration_minutes=60, cost=10_000,
+    base_audience=1_000_000, origin="France", year=2024, age_rating="Tout public",
+)
+L = 12   # 60 min en slots de 5 min
+
+
+def _every_day(lo: int, hi: int):
+    return (((lo, hi),),) * len(DAYS_FR)
+
+
+def test_unrestricted_program_fits_the_day():
+    assert compile_rule(BASE, WEEK).slots == _every_day(0, SLOTS_PER_DAY - L + 1)
+
+
+def test_age_rating_delays_the_first_start():
+    rule = compile_rule(dataclasses.replace(BASE, age_rating="-16"), WEEK)
+    assert rule.slots == _every_day(slot_index_from_time("22:30"), SLOTS_PER_DAY - L + 1)
+
+
+def test_new_program_stays_in_prime_time():
+    rule = compile_rule(dataclasses.replace(BASE, is_new=True), WEEK)
+    assert rule.slots == _every_day(slot_index_from_time("18:00"), slot_index_from_time("22:30"))
+
+
+def test_series_keeps_its_usual_day_and_time():
+    p = dataclasses.replace(BASE, genre="Série", usual_day="Mardi", usual_time="20:50")
+    s = slot_index_from_time("20:50")
+    expected = [()] * len(DAYS_FR)
+    expected[DAYS_FR.index("Mardi")] = ((s - 4, s + 5),)
+    assert compile_rule(p, WEEK).slots == tuple(expected)
+
+
+def test_unavailable_programs_have_no_start():
+    for p in (
+        dataclasses.replace(BASE, rights_end="2026-10-01"),
+        dataclasses.replace(BASE, rights_start="2026-11-01"),
+        dataclasses.replace(BASE, in_production=True),
+        dataclasses.replace(BASE, genre="Film", last_broadcast_date="2026-09-01"),   # rerun < 90 jours
+    ):
+        assert compile_rule(p, WEEK).n_starts() == 0, p
+
+
+def test_rule_vectors_match_compiled_rules(programs):
+    lo, hi, day = _rule_vectors(programs, WEEK)
+    for i, rule in enumerate(compile_rules(programs, WEEK)):
+        for d, intervals in enumerate(rule.slots):
+            vector = ((int(lo[i]), int(hi[i])),) if lo[i] < hi[i] and day[i] in (-1, d) else ()
+            assert intervals == vector, (programs[i].id, d)